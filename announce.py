@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+# Announcement Queue (Token Bucket – Bursty producers, steady Discord sends, never blocks callers)
+# Producers call announce() from anywhere on the loop; one worker drains the queue at `rate`
+# messages/sec (short bursts allowed) so tournaments/spawns can't trip Discord's rate limits.
+class Announcer:
+    def __init__(self, send, rate: float = 1.0, burst: int = 5, max_queue: int = 200):
+        self.send = send                # async send(channel_id, embed, view)
+        self.rate = rate
+        self.burst = burst
+        self.queue = asyncio.Queue(max_queue)
+        self.dropped = 0
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def announce(self, channel_id: int, embed, view=None) -> bool:
+        if not channel_id:
+            return False
+        try:
+            self.queue.put_nowait((channel_id, embed, view))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def run(self):
+        while True:
+            channel_id, embed, view = await self.queue.get()
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._tokens, self._last = 1.0, time.monotonic()
+            self._tokens -= 1
+            try:
+                await self.send(channel_id, embed, view)
+            except Exception as e:
+                print(f"Announce error ({channel_id}): {e}")
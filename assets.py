@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import zipfile
+
+# Asset Cache (Content-addressed – objects/<sha256>, index.json maps source URL -> digest & type)
+# Entity GIFs and the dashboard's CDN files are fetched once, on first request or from a bundle,
+# and then served from disk. An object's name is its digest, so it never changes and can be sent
+# with an immutable Cache-Control; the URL -> digest index is the only mutable part.
+ASSET_DIR = os.getenv('ASSET_DIR', 'assets')
+ASSET_BUNDLE = os.getenv('ASSET_BUNDLE', 'assets-bundle.zip')   # Pre-seeded on startup if present
+ASSET_MAX_BYTES = 20 * 1024 * 1024
+FETCH_TIMEOUT = 10
+FETCH_RETRY_SECONDS = 60   # A failed URL isn't retried (and doesn't hold up page loads) for this long
+CHUNK_SIZE = 1 << 16
+
+# Dashboard CDN files, served at /cdn/<name> (pinned versions, so a name keeps its content)
+CDN_ASSETS = {
+    'bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'chart.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js',
+}
+
+
+class AssetCache:
+    def __init__(self, root: str = ASSET_DIR):
+        self.root = os.path.abspath(root)  # Flask's send_file resolves relative paths against the app, not the cwd
+        self.objects = os.path.join(self.root, 'objects')
+        self.index_path = os.path.join(self.root, 'index.json')
+        os.makedirs(self.objects, exist_ok=True)
+        self.lock = threading.Lock()       # Guards index + fetching
+        self.fetching = {}                 # url -> Lock, so concurrent misses download once
+        self.failed = {}                   # url -> time of the next download attempt
+        self.index = self._load_index()    # url -> {'digest', 'content_type', 'size'}
+        self.types = {entry['digest']: entry['content_type'] for entry in self.index.values()}
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Entries whose object went missing are fetched again
+        return {url: entry for url, entry in index.items() if os.path.exists(self.object_path(entry['digest']))}
+
+    def _save_index(self):
+        fd, tmp = tempfile.mkstemp(suffix='.json', dir=self.root)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.index_path)
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects, digest)
+
+    def by_digest(self, digest: str):
+        # Entry for /assets/<digest>, or None for unknown digests
+        content_type = self.types.get(digest)
+        if content_type is None:
+            return None
+        return {'digest': digest, 'content_type': content_type, 'size': os.path.getsize(self.object_path(digest))}
+
+    def get(self, url: str) -> dict:
+        # Cached entry for url, downloading it on a miss. Raises OSError/ValueError if it can't be fetched
+        entry = self.index.get(url)
+        if entry is not None:
+            return entry
+        with self.lock:
+            url_lock = self.fetching.setdefault(url, threading.Lock())
+        try:
+            with url_lock:
+                entry = self.index.get(url)  # Another request may have finished it meanwhile
+                if entry is None:
+                    if time.monotonic() < self.failed.get(url, 0):
+                        raise OSError(f'{url} failed recently – retrying later')
+                    try:
+                        entry = self._fetch(url)
+                    except (OSError, ValueError):
+                        self.failed[url] = time.monotonic() + FETCH_RETRY_SECONDS
+                        raise
+                    self.failed.pop(url, None)
+        finally:
+            with self.lock:
+                self.fetching.pop(url, None)
+        return entry
+
+    def _fetch(self, url: str) -> dict:
+        if not url.startswith(('https://', 'http://')):
+            raise ValueError(f'not an http(s) URL: {url}')
+        request = urllib.request.Request(url, headers={'User-Agent': 'NexusVerse-Dashboard/1.0'})
+        with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+            content_type = (response.headers.get('Content-Type') or '').split(';')[0].strip()
+            content_type = content_type or mimetypes.guess_type(url)[0] or 'application/octet-stream'
+            return self._store(url, iter(lambda: response.read(CHUNK_SIZE), b''), content_type)
+
+    def _store(self, url: str, chunks, content_type: str, expected: str = None) -> dict:
+        # Streams to a temp file while hashing, then renames into place (same content -> same object)
+        digest, size = hashlib.sha256(), 0
+        fd, tmp = tempfile.mkstemp(dir=self.objects)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > ASSET_MAX_BYTES:
+                        raise ValueError(f'asset larger than {ASSET_MAX_BYTES} bytes: {url}')
+                    digest.update(chunk)
+                    f.write(chunk)
+            if expected is not None and digest.hexdigest() != expected:
+                raise ValueError(f'{url} does not match its digest')
+            os.replace(tmp, self.object_path(digest.hexdigest()))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        entry = {'digest': digest.hexdigest(), 'content_type': content_type, 'size': size}
+        with self.lock:
+            self.index[url] = entry
+            self.types[entry['digest']] = content_type
+            self._save_index()
+        return entry
+
+    def seed(self, bundle_path: str = ASSET_BUNDLE) -> int:
+        # Imports a bundle zip (index.json + objects/<digest>); every object is re-hashed before use.
+        # Returns the number of URLs added
+        added = 0
+        with zipfile.ZipFile(bundle_path) as bundle:
+            index = json.loads(bundle.read('index.json'))
+            for url, entry in index.items():
+                if url in self.index:
+                    continue
+                try:
+                    with bundle.open(f"objects/{entry['digest']}") as f:
+                        self._store(url, iter(lambda: f.read(CHUNK_SIZE), b''), entry['content_type'], expected=entry['digest'])
+                    added += 1
+                except (KeyError, ValueError) as e:
+                    print(f"⚠️ Asset bundle: {e} – skipped")
+        return added
+
+    def build_bundle(self, urls, bundle_path: str = ASSET_BUNDLE) -> dict:
+        # Fetches every URL (cached ones are reused) and writes them as a seedable bundle
+        index, failed = {}, []
+        for url in urls:
+            try:
+                index[url] = self.get(url)
+            except (OSError, ValueError) as e:
+                failed.append(url)
+                print(f"⚠️ {url}: {e}")
+        with zipfile.ZipFile(bundle_path, 'w', zipfile.ZIP_STORED) as bundle:  # GIFs/minified files don't compress
+            bundle.writestr('index.json', json.dumps(index, indent=1, sort_keys=True))
+            for digest in {entry['digest'] for entry in index.values()}:
+                bundle.write(self.object_path(digest), f'objects/{digest}')
+        return {'path': bundle_path, 'assets': len(index), 'failed': failed}
+
+
+def seed_from_bundle(cache: AssetCache, bundle_path: str = ASSET_BUNDLE):
+    if not os.path.exists(bundle_path):
+        return
+    try:
+        added = cache.seed(bundle_path)
+        print(f"📦 Asset bundle {bundle_path}: {added} new assets")
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        print(f"Asset bundle error: {e}")
+
+def bundle_urls(catalog) -> list:
+    return list(CDN_ASSETS.values()) + sorted({e.image_url for e in catalog if e.image_url})
+
+
+if __name__ == '__main__':
+    from catalog import load_catalog
+    command = sys.argv[1] if len(sys.argv) > 1 else 'bundle'
+    cache = AssetCache()
+    if command == 'bundle':
+        info = cache.build_bundle(bundle_urls(load_catalog()), sys.argv[2] if len(sys.argv) > 2 else ASSET_BUNDLE)
+        print(f"📦 {info['path']}: {info['assets']} assets, {len(info['failed'])} failed")
+    elif command == 'seed':
+        seed_from_bundle(cache, sys.argv[2] if len(sys.argv) > 2 else ASSET_BUNDLE)
+    else:
+        print('Usage: python assets.py bundle [out.zip] | seed [bundle.zip]')
+        sys.exit(1)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from bisect import bisect_left
+from collections import OrderedDict
+
+# Entity Autocomplete (Sorted key arrays – Per-user owned index, catalog fallback, no DB on keystrokes)
+# Every entity is findable by its full name and by each word in it ("man" -> Pac-Man). A user's
+# index is the catalog key array filtered to the ids they own, so it stays sorted without a sort
+# and is rebuilt only when the owned set changes, not on every count change.
+MAX_CHOICES = 25                 # Discord's autocomplete limit
+MAX_INDEXED_USERS = 50000        # LRU bound on per-user indexes
+
+
+def search_keys(name: str) -> list:
+    lowered = name.lower()
+    keys = [lowered]
+    for i, ch in enumerate(lowered):
+        if ch in ' -_.' and i + 1 < len(lowered) and lowered[i + 1] not in ' -_.':
+            keys.append(lowered[i + 1:])
+    return keys
+
+def _search(keys: list, ids: list, prefix: str, limit: int) -> list:
+    found, i = [], bisect_left(keys, prefix)
+    while i < len(keys) and keys[i].startswith(prefix) and len(found) < limit:
+        if ids[i] not in found:
+            found.append(ids[i])
+        i += 1
+    return found
+
+
+class EntityIndex:
+    def __init__(self, catalog, max_users: int = MAX_INDEXED_USERS):
+        self.max_users = max_users
+        self.users = OrderedDict()   # user_id -> (counts, keys, ids)
+        self.rebind(catalog)
+
+    def rebind(self, catalog):
+        # New catalog (config reload) – rebuild the global arrays, then every user's view of them
+        pairs = sorted((key, e.id) for e in catalog for key in search_keys(e.name))
+        self.catalog = catalog
+        self.keys = [key for key, _ in pairs]
+        self.ids = [entity_id for _, entity_id in pairs]
+        for user_id, (counts, _, _) in list(self.users.items()):
+            self._index(user_id, counts)
+
+    def _index(self, user_id: int, counts: dict):
+        keys, ids = [], []
+        for key, entity_id in zip(self.keys, self.ids):
+            if counts.get(entity_id):
+                keys.append(key)
+                ids.append(entity_id)
+        self.users[user_id] = (counts, keys, ids)
+        self.users.move_to_end(user_id)
+        while len(self.users) > self.max_users:
+            self.users.popitem(last=False)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.users
+
+    def set(self, user_id: int, counts: dict):
+        self._index(user_id, {i: n for i, n in counts.items() if n > 0})
+
+    def drop(self, user_id: int):
+        self.users.pop(user_id, None)
+
+    def clear(self):
+        self.users.clear()
+
+    def apply(self, user_id: int, delta: dict):
+        # Count changes from trades/market/claims; unindexed users are picked up on their next load
+        entry = self.users.get(user_id)
+        if entry is None:
+            return
+        counts = entry[0]
+        owned_before = counts.keys() & delta.keys()
+        for entity_id, change in delta.items():
+            left = counts.get(entity_id, 0) + change
+            if left > 0:
+                counts[entity_id] = left
+            else:
+                counts.pop(entity_id, None)
+        if owned_before != counts.keys() & delta.keys():
+            self._index(user_id, counts)
+
+    def count(self, user_id: int, entity_id: int) -> int:
+        entry = self.users.get(user_id)
+        return entry[0].get(entity_id, 0) if entry else 0
+
+    def suggest(self, user_id: int, prefix: str, limit: int = MAX_CHOICES) -> list:
+        # Owned entities matching the prefix; users not indexed yet get catalog matches instead
+        entry = self.users.get(user_id)
+        if entry is None:
+            return self.suggest_any(prefix, limit)
+        self.users.move_to_end(user_id)
+        return [self.catalog.get(i) for i in _search(entry[1], entry[2], prefix.strip().lower(), limit)]
+
+    def suggest_any(self, prefix: str, limit: int = MAX_CHOICES) -> list:
+        return [self.catalog.get(i) for i in _search(self.keys, self.ids, prefix.strip().lower(), limit)]
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Online Backups (SQLite Backup API – Copies N pages per step from one pinned snapshot, bot keeps writing)
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '14'))
+PAGES_PER_STEP = 256      # ~1 MB per step at the default 4 KB page size
+STEP_PAUSE = 0.005        # Yield between steps so the copy doesn't hog disk I/O
+SNAPSHOT_SUFFIX = '.db.gz'
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _checksum_path(snapshot_path: str) -> str:
+    return snapshot_path + '.sha256'
+
+def create_snapshot(db_file: str, backup_dir: str = BACKUP_DIR, label: str = 'snapshot', keep: int = BACKUP_KEEP,
+                    pages_per_step: int = PAGES_PER_STEP, step_pause: float = STEP_PAUSE, protect: tuple = ()) -> dict:
+    os.makedirs(backup_dir, exist_ok=True)
+    started = time.perf_counter()
+    name = f"nexusverse-{label}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{SNAPSHOT_SUFFIX}"
+    snapshot_path = os.path.join(backup_dir, name)
+    fd, raw_path = tempfile.mkstemp(suffix='.db', dir=backup_dir)
+    os.close(fd)
+    try:
+        src = sqlite3.connect(db_file, timeout=30, isolation_level=None)
+        dst = sqlite3.connect(raw_path)
+        try:
+            # WAL lets the bot keep committing while we read. Pinning one read transaction on the
+            # source gives every step the same snapshot – without it, each foreign write restarts
+            # the backup from page 0 and a busy bot can starve it forever
+            src.execute('PRAGMA journal_mode=WAL')
+            src.execute('BEGIN')
+            src.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            src.backup(dst, pages=pages_per_step, progress=lambda status, remaining, total: time.sleep(step_pause))
+            src.execute('COMMIT')
+            check = dst.execute('PRAGMA quick_check').fetchone()[0]
+            if check != 'ok':
+                raise RuntimeError(f'Snapshot failed quick_check: {check}')
+        finally:
+            dst.close()
+            src.close()
+        raw_size = os.path.getsize(raw_path)
+        with open(raw_path, 'rb') as f_in, gzip.open(snapshot_path, 'wb', compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, 1 << 20)
+    finally:
+        os.remove(raw_path)
+    checksum = _sha256_file(snapshot_path)
+    with open(_checksum_path(snapshot_path), 'w') as f:
+        f.write(f'{checksum}  {name}\n')
+    pruned = prune_snapshots(backup_dir, keep, protect)
+    info = {'name': name, 'sha256': checksum, 'db_bytes': raw_size, 'gz_bytes': os.path.getsize(snapshot_path),
+            'seconds': round(time.perf_counter() - started, 3), 'pruned': pruned}
+    print(f"💾 Snapshot {name} – {raw_size} → {info['gz_bytes']} bytes in {info['seconds']}s (pruned {len(pruned)})")
+    return info
+
+def list_snapshots(backup_dir: str = BACKUP_DIR) -> list:
+    if not os.path.isdir(backup_dir):
+        return []
+    snapshots = []
+    for name in os.listdir(backup_dir):
+        if not name.endswith(SNAPSHOT_SUFFIX):
+            continue
+        path = os.path.join(backup_dir, name)
+        snapshots.append({'name': name, 'gz_bytes': os.path.getsize(path), 'mtime': os.path.getmtime(path),
+                          'has_checksum': os.path.exists(_checksum_path(path))})
+    return sorted(snapshots, key=lambda s: s['mtime'], reverse=True)
+
+def prune_snapshots(backup_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP, protect: tuple = ()) -> list:
+    # Retention applies to scheduled/manual snapshots; pre-restore safety copies count too.
+    # Names in protect (the snapshot being restored) are never pruned
+    pruned = []
+    for snapshot in list_snapshots(backup_dir)[keep:]:
+        if snapshot['name'] in protect:
+            continue
+        path = os.path.join(backup_dir, snapshot['name'])
+        for p in (path, _checksum_path(path)):
+            if os.path.exists(p):
+                os.remove(p)
+        pruned.append(snapshot['name'])
+    return pruned
+
+def verify_snapshot(snapshot_path: str) -> bool:
+    checksum_file = _checksum_path(snapshot_path)
+    if not os.path.exists(snapshot_path) or not os.path.exists(checksum_file):
+        return False
+    with open(checksum_file) as f:
+        expected = f.read().split()[0]
+    return _sha256_file(snapshot_path) == expected
+
+def restore_snapshot(db_file: str, name: str, backup_dir: str = BACKUP_DIR, safety_snapshot: bool = True) -> dict:
+    if os.path.basename(name) != name or not name.endswith(SNAPSHOT_SUFFIX):
+        raise ValueError(f'Invalid snapshot name: {name}')
+    snapshot_path = os.path.join(backup_dir, name)
+    if not verify_snapshot(snapshot_path):
+        raise ValueError(f'Checksum mismatch or missing snapshot: {name}')
+    started = time.perf_counter()
+    fd, raw_path = tempfile.mkstemp(suffix='.db', dir=backup_dir)
+    os.close(fd)
+    try:
+        # Decompress before the safety snapshot – its prune must not touch the file being restored
+        with gzip.open(snapshot_path, 'rb') as f_in, open(raw_path, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out, 1 << 20)
+        safety = create_snapshot(db_file, backup_dir, label='pre-restore', protect=(name,)) if safety_snapshot else None
+        src = sqlite3.connect(raw_path)
+        dst = sqlite3.connect(db_file, timeout=30)
+        try:
+            # Single step (pages=-1): one write lock, live connections see the restored DB atomically
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+    finally:
+        os.remove(raw_path)
+    info = {'restored': name, 'safety_snapshot': safety['name'] if safety else None,
+            'seconds': round(time.perf_counter() - started, 3)}
+    print(f"♻️ Restored {name} into {db_file} in {info['seconds']}s")
+    return info
+
+# CLI (Cron-Friendly): python backup.py snapshot | list | restore <name>
+if __name__ == '__main__':
+    db = os.getenv('DB_FILE', 'nexusverse.db')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'snapshot'
+    if command == 'snapshot':
+        create_snapshot(db)
+    elif command == 'list':
+        for s in list_snapshots():
+            print(f"{s['name']}  {s['gz_bytes']} bytes  {'✅' if s['has_checksum'] else '⚠️ no checksum'}")
+    elif command == 'restore' and len(sys.argv) > 2:
+        restore_snapshot(db, sys.argv[2])
+    else:
+        print('Usage: python backup.py snapshot | list | restore <name>')
+        sys.exit(1)
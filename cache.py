@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+
+# TTL Query Cache (Per-Key TTLs, Explicit Invalidation, Singleflight Loads)
+# A burst of requests for the same expired key runs the loader once – the
+# other callers wait for that result instead of hitting the DB themselves.
+class _Flight:
+    __slots__ = ('done', 'value', 'error', 'invalidated')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.invalidated = False
+
+
+class TTLCache:
+    def __init__(self, default_ttl: float = 30.0):
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> (expires_at, value)
+        self._inflight = {}  # key -> _Flight
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: str, loader, ttl: float = None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                # Don't store a result that a write invalidated mid-load (stale)
+                if flight.error is None and not flight.invalidated:
+                    self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.default_ttl), flight.value)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                if key in self._inflight:
+                    self._inflight[key].invalidated = True
+
+    def invalidate_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+            for key, flight in self._inflight.items():
+                if key.startswith(prefix):
+                    flight.invalidated = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for flight in self._inflight.values():
+                flight.invalidated = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'keys': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'inflight': len(self._inflight)}
+
+
+# Async Variant (Bot Event Loop – Same semantics, waiters share one asyncio Future)
+class _AsyncFlight:
+    __slots__ = ('future', 'invalidated')
+
+    def __init__(self, future):
+        self.future = future
+        self.invalidated = False
+
+
+class AsyncTTLCache:
+    def __init__(self, default_ttl: float = 60.0):
+        self.default_ttl = default_ttl
+        self._entries = {}   # key -> (expires_at, value)
+        self._inflight = {}  # key -> _AsyncFlight
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, key: str, loader, ttl: float = None):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        if key in self._inflight:
+            self.hits += 1
+            return await asyncio.shield(self._inflight[key].future)
+        self.misses += 1
+        flight = _AsyncFlight(asyncio.get_running_loop().create_future())
+        self._inflight[key] = flight
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            flight.future.cancel()
+            raise
+        except BaseException as e:
+            flight.future.set_exception(e)
+            flight.future.exception()  # Mark retrieved – no "never retrieved" warning without waiters
+            raise
+        else:
+            flight.future.set_result(value)
+            if not flight.invalidated:
+                self.set(key, value, ttl)
+            return value
+        finally:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+
+    def peek(self, key: str):
+        # Fresh value or None – never loads (for callers with a cheaper fallback than the loader)
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def set(self, key: str, value, ttl: float = None):
+        self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.default_ttl), value)
+
+    def invalidate(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+            if key in self._inflight:
+                self._inflight[key].invalidated = True
+
+    def invalidate_prefix(self, prefix: str):
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+        for key, flight in self._inflight.items():
+            if key.startswith(prefix):
+                flight.invalidated = True
+
+    def clear(self):
+        self._entries.clear()
+        for flight in self._inflight.values():
+            flight.invalidated = True
+
+    def stats(self) -> dict:
+        return {'keys': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'inflight': len(self._inflight)}
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import io
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import NamedTuple
+
+from PIL import Image, ImageDraw, ImageFont, UnidentifiedImageError
+
+# Profile Cards (Pillow – Rendered in worker processes, PNG bytes cached by a hash of what's drawn)
+# A card's key covers every value on it (stats, stacks, avatar hash), so a cached PNG stays valid
+# until one of them changes – no invalidation hooks, and the avatar is only downloaded on a miss.
+# Workers are spawned rather than forked so they never inherit the bot's loop or sqlite threads.
+CARD_WIDTH = 800
+CARD_WORKERS = 2
+CARD_CACHE_BYTES = 32 * 1024 * 1024   # LRU bound on cached PNG bytes
+AVATAR_SIZE = 128
+COLLECTION_COLUMNS = 4
+COLLECTION_LIMIT = 20                 # Stacks on a collection card (strongest first)
+FONT_FILES = ('DejaVuSans-Bold.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf')
+
+BACKGROUND = (16, 16, 30)
+PANEL = (34, 34, 56)
+TEXT = (236, 236, 246)
+MUTED = (150, 150, 175)
+NEON = (0, 212, 255)
+GOLD = (255, 215, 0)
+RARITY_COLORS = {'Common': (160, 160, 175), 'Rare': (0, 212, 255), 'Epic': (139, 0, 255), 'Legendary': (255, 215, 0), 'Mythic': (255, 64, 96)}
+
+
+class CardStack(NamedTuple):
+    name: str
+    rarity: str
+    count: int
+    power: int
+
+
+class ProfileCard(NamedTuple):
+    kind: str            # 'profile' | 'collection'
+    name: str
+    avatar_key: str      # Discord's avatar hash – stands in for the image bytes in the key
+    level: int
+    credits: int
+    pity: int
+    streak: int
+    total_power: int
+    collection: int
+    unique: int
+    premium: bool
+    stacks: tuple        # CardStack, strongest first
+
+    def key(self) -> str:
+        return hashlib.sha256(repr(self).encode('utf-8')).hexdigest()
+
+
+# Rendering (Runs in the worker processes – plain values in, PNG bytes out)
+@lru_cache(maxsize=None)
+def _font(size: int):
+    for path in FONT_FILES:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+def _bar(draw, x: int, y: int, width: int, fraction: float, color, height: int = 14):
+    draw.rounded_rectangle((x, y, x + width, y + height), radius=height // 2, fill=PANEL)
+    if fraction > 0:
+        draw.rounded_rectangle((x, y, x + max(height, int(width * min(fraction, 1.0))), y + height), radius=height // 2, fill=color)
+
+def _avatar(image, avatar: bytes, name: str, x: int, y: int, size: int):
+    mask = Image.new('L', (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size - 1, size - 1), fill=255)
+    try:
+        picture = Image.open(io.BytesIO(avatar)).convert('RGB').resize((size, size))
+    except (UnidentifiedImageError, OSError, ValueError):  # No avatar / not an image – initial on a disc
+        picture = Image.new('RGB', (size, size), PANEL)
+        ImageDraw.Draw(picture).text((size // 2, size // 2), (name[:1] or '?').upper(), font=_font(size // 2), fill=NEON, anchor='mm')
+    image.paste(picture, (x, y), mask)
+
+def _header(image, draw, card: ProfileCard, avatar: bytes, size: int) -> int:
+    # Avatar, name & badge – returns the y below the header
+    _avatar(image, avatar, card.name, 32, 32, size)
+    draw.text((56 + size, 36), card.name[:28], font=_font(34), fill=TEXT)
+    subtitle = f'Level {card.level}  •  {card.collection} entities ({card.unique} unique)'
+    draw.text((56 + size, 84), subtitle, font=_font(18), fill=MUTED)
+    if card.premium:
+        draw.rounded_rectangle((CARD_WIDTH - 150, 36, CARD_WIDTH - 32, 66), radius=15, fill=GOLD)
+        draw.text((CARD_WIDTH - 91, 51), 'PREMIUM', font=_font(16), fill=BACKGROUND, anchor='mm')
+    return 32 + size + 24
+
+def _stack_tile(draw, stack: CardStack, x: int, y: int, width: int, height: int):
+    color = RARITY_COLORS.get(stack.rarity, MUTED)
+    draw.rounded_rectangle((x, y, x + width, y + height), radius=10, fill=PANEL)
+    draw.rectangle((x, y + 8, x + 5, y + height - 8), fill=color)
+    draw.text((x + 16, y + 10), stack.name[:18], font=_font(17), fill=TEXT)
+    draw.text((x + 16, y + height - 28), f'x{stack.count}  •  {stack.power} PWR', font=_font(14), fill=color)
+
+def _render_profile(card: ProfileCard, avatar: bytes):
+    image = Image.new('RGB', (CARD_WIDTH, 384), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    y = _header(image, draw, card, avatar, AVATAR_SIZE)
+    # Stats column + progress bars (same caps as the embed bars: 10 levels / 10 fails / 10 days)
+    draw.text((32, y), f'{card.credits} credits', font=_font(20), fill=GOLD)
+    draw.text((32, y + 30), f'{card.total_power} total power', font=_font(20), fill=NEON)
+    bar_x, bar_width = 300, CARD_WIDTH - 332
+    for i, (label, value, cap, color) in enumerate((('Level', card.level, 10, NEON), ('Pity', card.pity, 10, RARITY_COLORS['Epic']),
+                                                     ('Streak', card.streak, 10, GOLD))):
+        row = y + i * 30
+        draw.text((bar_x, row), f'{label} {value}', font=_font(15), fill=MUTED)
+        _bar(draw, bar_x + 100, row + 3, bar_width - 100, value / cap, color)
+    y += 100
+    width = (CARD_WIDTH - 64 - 2 * 16) // 3
+    if not card.stacks:
+        draw.text((32, y + 20), 'No entities yet – start with /catch!', font=_font(20), fill=MUTED)
+    for i, stack in enumerate(card.stacks[:3]):
+        _stack_tile(draw, stack, 32 + i * (width + 16), y, width, 72)
+    return image
+
+def _render_collection(card: ProfileCard, avatar: bytes):
+    rows = max(1, -(-len(card.stacks) // COLLECTION_COLUMNS))
+    width, height = (CARD_WIDTH - 64 - (COLLECTION_COLUMNS - 1) * 12) // COLLECTION_COLUMNS, 64
+    image = Image.new('RGB', (CARD_WIDTH, 32 + 96 + 24 + rows * (height + 12) + 20), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    y = _header(image, draw, card, avatar, 96)
+    if not card.stacks:
+        draw.text((32, y + 20), 'No entities yet – start with /catch!', font=_font(20), fill=MUTED)
+    for i, stack in enumerate(card.stacks):
+        row, column = divmod(i, COLLECTION_COLUMNS)
+        _stack_tile(draw, stack, 32 + column * (width + 12), y + row * (height + 12), width, height)
+    return image
+
+def render_card(card: ProfileCard, avatar: bytes) -> bytes:
+    image = _render_collection(card, avatar) if card.kind == 'collection' else _render_profile(card, avatar)
+    out = io.BytesIO()
+    image.save(out, format='PNG')
+    return out.getvalue()
+
+
+# Renderer (Event-loop side – LRU by bytes, one render per key however many commands ask at once)
+class CardRenderer:
+    def __init__(self, workers: int = CARD_WORKERS, max_bytes: int = CARD_CACHE_BYTES):
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.cache = OrderedDict()   # key -> PNG bytes, least recently used first
+        self.size = 0
+        self.inflight = {}           # key -> Future of a running render
+        self.executor = None         # Started on the first miss
+
+    async def render(self, card: ProfileCard, fetch_avatar) -> bytes:
+        # fetch_avatar: coroutine function -> image bytes (b'' draws the initial instead)
+        key = card.key()
+        png = self.cache.get(key)
+        if png is not None:
+            self.cache.move_to_end(key)
+            return png
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._render(key, card, fetch_avatar))
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(future)  # A cancelled command doesn't cancel the shared render
+
+    async def _render(self, key: str, card: ProfileCard, fetch_avatar) -> bytes:
+        avatar = await fetch_avatar()
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            png = await asyncio.get_running_loop().run_in_executor(self.executor, render_card, card, avatar)
+        except BrokenProcessPool:
+            self.executor = None  # A worker died – start a fresh pool on the next miss
+            raise
+        self._store(key, png)
+        return png
+
+    def _store(self, key: str, png: bytes):
+        if len(png) > self.max_bytes:
+            return
+        self.cache[key] = png
+        self.size += len(png)
+        while self.size > self.max_bytes:
+            _, evicted = self.cache.popitem(last=False)
+            self.size -= len(evicted)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import random
+import threading
+from array import array
+from types import MappingProxyType
+from typing import NamedTuple
+
+from inventory import INSTANCED_RARITIES
+
+# Entity Catalog (Single Source – config.json, compiled once, shared by bot & dashboard)
+CONFIG_FILE = os.getenv('CONFIG_FILE', 'config.json')
+RARITIES = ('Common', 'Rare', 'Epic', 'Legendary', 'Mythic')
+MAX_ENTITY_ID = 0xFFFF  # IDs fit array('H') so inventories can store them compactly
+DROP_RATES = (('Mythic', 0.01), ('Legendary', 0.05), ('Epic', 0.2), ('Rare', 0.5))  # QC thresholds (x rate) – the rest is Common
+SHOP_COSTS = {'entity': 50, 'boost': 100, 'lure': 75}                             # premium comes from premium_cost
+CONFIG_POLL_SECONDS = 5.0
+
+class EntityDef(NamedTuple):
+    id: int
+    name: str
+    rarity: str
+    emoji: str
+    power: int
+    desc: str
+    image_url: str
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+class Catalog:
+    __slots__ = ('entities', 'by_id', 'by_name', 'by_rarity', 'rarity_ids', 'powers', 'ids_by_power')
+
+    def __init__(self, entities: tuple):
+        by_id = [None] * (max((e.id for e in entities), default=0) + 1)
+        powers = array('I', bytes(4 * len(by_id)))
+        for e in entities:
+            by_id[e.id] = e
+            powers[e.id] = e.power
+        set_ = object.__setattr__
+        set_(self, 'entities', entities)
+        set_(self, 'by_id', tuple(by_id))                          # entity_id -> EntityDef (None for gaps)
+        set_(self, 'by_name', MappingProxyType({e.name.lower(): e for e in entities}))
+        set_(self, 'by_rarity', MappingProxyType({r: tuple(e for e in entities if e.rarity == r) for r in RARITIES}))
+        set_(self, 'rarity_ids', MappingProxyType({r: array('H', (e.id for e in self.by_rarity[r])) for r in RARITIES}))
+        set_(self, 'powers', powers)                               # entity_id -> power, for sums without lookups
+        set_(self, 'ids_by_power', array('H', (e.id for e in sorted(entities, key=lambda e: (-e.power, e.id)))))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Catalog is immutable – compile a new one instead')
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def __iter__(self):
+        return iter(self.entities)
+
+    def get(self, entity_id: int):
+        return self.by_id[entity_id] if 0 <= entity_id < len(self.by_id) else None
+
+    def find(self, name: str):
+        return self.by_name.get(name.strip().lower())
+
+    def resolve(self, item: dict):
+        # Inventory entries: new ones carry 'id', legacy full-dict copies only have 'name'
+        entity = self.get(item['id']) if isinstance(item.get('id'), int) else None
+        return entity or self.find(item.get('name', ''))
+
+    def random_of(self, rarity: str, rng=random):
+        pool = self.by_rarity.get(rarity) or self.entities
+        return rng.choice(pool)
+
+
+def compile_catalog(raw_entities: list) -> Catalog:
+    entities, seen_ids, seen_names = [], set(), set()
+    for i, raw in enumerate(raw_entities):
+        try:
+            entity = EntityDef(id=int(raw['id']), name=str(raw['name']), rarity=str(raw['rarity']), emoji=str(raw.get('emoji', '')),
+                               power=int(raw['power']), desc=str(raw.get('desc', '')), image_url=str(raw.get('image_url', '')))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f'Entity #{i}: missing/invalid field ({e})')
+        if not 1 <= entity.id <= MAX_ENTITY_ID:
+            raise ValueError(f'Entity {entity.name}: id must be 1-{MAX_ENTITY_ID}')
+        if entity.id in seen_ids or entity.name.lower() in seen_names:
+            raise ValueError(f'Entity {entity.name}: duplicate id or name')
+        if entity.rarity not in RARITIES:
+            raise ValueError(f'Entity {entity.name}: rarity must be one of {", ".join(RARITIES)}')
+        if entity.power < 0:
+            raise ValueError(f'Entity {entity.name}: power must be >= 0')
+        seen_ids.add(entity.id)
+        seen_names.add(entity.name.lower())
+        entities.append(entity)
+    missing = [r for r in RARITIES if not any(e.rarity == r for e in entities)]
+    if missing:
+        raise ValueError(f'Catalog needs at least one entity per rarity (missing: {", ".join(missing)})')
+    return Catalog(tuple(sorted(entities, key=lambda e: e.id)))
+
+def roll_rarity(drop_rates, roll: float, rate: float = 1.0) -> str:
+    # roll in [0, 1): a boost (rate > 1) scales every threshold, so better rarities get proportionally likelier
+    for rarity, threshold in drop_rates:
+        if roll < threshold * rate:
+            return rarity
+    return 'Common'
+
+def load_config(path: str = CONFIG_FILE) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def load_catalog(path: str = CONFIG_FILE) -> Catalog:
+    return compile_catalog(load_config(path)['entities'])
+
+
+# Game Config (config.json – Catalog + costs + drop rates, validated as one unit and swapped atomically)
+class GameConfig(NamedTuple):
+    catalog: Catalog
+    pull_cost: int
+    premium_cost: int
+    catch_cooldown: int
+    drop_rates: tuple
+    shop_costs: MappingProxyType
+    raw: dict
+
+
+def _positive_int(raw: dict, key: str, default: int) -> int:
+    value = raw.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 or int(value) != value:
+        raise ValueError(f'{key} must be a non-negative integer')
+    return int(value)
+
+def compile_config(raw: dict) -> GameConfig:
+    # Raises ValueError on anything a running bot shouldn't pick up
+    if not isinstance(raw, dict) or not isinstance(raw.get('entities'), list):
+        raise ValueError('config must be an object with an "entities" list')
+    rates = raw.get('drop_rates', dict(DROP_RATES))
+    if not isinstance(rates, dict) or set(rates) != {r for r, _ in DROP_RATES}:
+        raise ValueError(f'drop_rates must set exactly {", ".join(r for r, _ in DROP_RATES)}')
+    drop_rates = tuple((rarity, float(rates[rarity])) for rarity, _ in DROP_RATES)
+    thresholds = [t for _, t in drop_rates]
+    if not all(0 <= a <= b <= 1 for a, b in zip(thresholds, thresholds[1:] + [1])):
+        raise ValueError('drop_rates must rise from Mythic to Rare and stay within 0-1')
+    shop = raw.get('shop_costs', {})
+    if not isinstance(shop, dict):
+        raise ValueError('shop_costs must be an object')
+    premium_cost = _positive_int(raw, 'premium_cost', 1000)
+    shop_costs = {item: _positive_int(shop, item, cost) for item, cost in SHOP_COSTS.items()}
+    shop_costs['premium'] = premium_cost
+    return GameConfig(catalog=compile_catalog(raw['entities']), pull_cost=_positive_int(raw, 'pull_cost', 50), premium_cost=premium_cost,
+                      catch_cooldown=_positive_int(raw, 'catch_cooldown', 60), drop_rates=drop_rates, shop_costs=MappingProxyType(shop_costs), raw=raw)
+
+
+def check_reload(running: Catalog, catalog: Catalog):
+    # Stored inventories, listings and brackets hold entity ids, and unique copies have instance rows –
+    # a live reload may add entities or retune them, but not drop an id or move it across INSTANCED_RARITIES
+    for entity in running:
+        new = catalog.get(entity.id)
+        if new is None:
+            raise ValueError(f'entity {entity.id} ({entity.name}) was removed')
+        if (entity.rarity in INSTANCED_RARITIES) != (new.rarity in INSTANCED_RARITIES):
+            raise ValueError(f'{entity.name} can\'t change from {entity.rarity} to {new.rarity} live')
+
+
+class ConfigSource:
+    # Polls config.json's (mtime, size). A changed file is parsed + compiled by the caller's thread
+    # (bot: asyncio.to_thread, dashboard: the request thread); a bad edit is reported and the
+    # running config is kept until the file changes again
+    def __init__(self, path: str = CONFIG_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stamp = self._stamp()
+        self.current = compile_config(load_config(path))
+
+    def _stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def poll(self):
+        # New GameConfig if the file changed and compiled cleanly, else None
+        if not self.lock.acquire(blocking=False):
+            return None  # Another thread is already reloading
+        try:
+            try:
+                stamp = self._stamp()
+            except OSError:
+                return None
+            if stamp == self.stamp:
+                return None
+            self.stamp = stamp
+            try:
+                config = compile_config(load_config(self.path))
+                check_reload(self.current.catalog, config.catalog)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"⚠️ config.json rejected ({e}) – keeping the running config")
+                return None
+            self.current = config
+            return config
+        finally:
+            self.lock.release()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import aiosqlite
+
+# Cross-Process Change Feed (Dashboard writes -> Bot cache invalidation)
+# Writers append (kind, key) rows to change_log inside the same transaction as the
+# change itself. The bot polls PRAGMA data_version – a free in-memory counter that
+# only moves when *another* connection commits – and reads new rows only then.
+CHANGE_KINDS = ('user', 'guild', 'ban', 'event', 'effect', 'all')
+ACTIVITY_KINDS = ('catch', 'pull')  # Bot gameplay rows – listeners ignore them, the live feed counts them
+CHANGE_LOG_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        key INTEGER,
+        changed_at REAL NOT NULL
+    )
+'''
+CHANGE_LOG_INDEX = 'CREATE INDEX IF NOT EXISTS idx_change_log_kind_time ON change_log (kind, changed_at)'
+CHANGE_INSERT_SQL = 'INSERT INTO change_log (kind, key, changed_at) VALUES (?, ?, ?)'
+CHANGE_LOG_RETENTION = 3600  # Seconds of history kept for listeners that reconnect
+
+def record_change(cursor, kind: str, key: int = None):
+    # Sync (sqlite3) – caller commits, so the change row lands atomically with the write
+    cursor.execute(CHANGE_INSERT_SQL, (kind, key, time.time()))
+
+def record_changes(cursor, kind: str, keys):
+    cursor.executemany(CHANGE_INSERT_SQL, [(kind, key, time.time()) for key in keys])
+
+
+class ChangeListener:
+    def __init__(self, db_file: str, handler, interval: float = 1.0):
+        self.db_file = db_file
+        self.handler = handler          # handler(kind, key) – sync, called for every new change row
+        self.interval = interval
+        self.last_seq = 0
+        self.running = False
+
+    async def run(self):
+        self.running = True
+        polls = 0
+        try:
+            async with aiosqlite.connect(self.db_file) as db:
+                await db.execute(CHANGE_LOG_SCHEMA)
+                await db.execute(CHANGE_LOG_INDEX)
+                await db.commit()
+                async with db.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log') as cursor:
+                    self.last_seq = (await cursor.fetchone())[0]
+                data_version = None
+                while self.running:
+                    try:
+                        async with db.execute('PRAGMA data_version') as cursor:
+                            version = (await cursor.fetchone())[0]
+                        if version != data_version:
+                            data_version = version
+                            await self._drain(db)
+                        polls += 1
+                        if polls % 600 == 0:
+                            await db.execute('DELETE FROM change_log WHERE changed_at < ?', (time.time() - CHANGE_LOG_RETENTION,))
+                            await db.commit()
+                    except Exception as e:
+                        print(f"Change feed error: {e}")
+                    await asyncio.sleep(self.interval)
+        finally:
+            self.running = False
+
+    async def _drain(self, db):
+        async with db.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log') as cursor:
+            max_seq = (await cursor.fetchone())[0]
+        if max_seq < self.last_seq:
+            # Sequence went backwards – DB was restored from a snapshot; everything may have changed
+            self.last_seq = max_seq
+            self.handler('all', None)
+            return
+        async with db.execute('SELECT seq, kind, key FROM change_log WHERE seq > ? ORDER BY seq', (self.last_seq,)) as cursor:
+            rows = await cursor.fetchall()
+        for seq, kind, key in rows:
+            self.last_seq = seq
+            try:
+                self.handler(kind, key)
+            except Exception as e:
+                print(f"Change handler error ({kind} {key}): {e}")
+
+    def stop(self):
+        self.running = False
@@ -1,10 +1,28 @@
-from flask import Flask, jsonify, render_template_string, request, session, redirect, url_for, flash
+from flask import Flask, Response, jsonify, render_template_string, request, send_file, session, redirect, url_for, flash, stream_with_context
 import os
 import sqlite3
 import json
 from datetime import datetime, timedelta
 import traceback
 import random
+import csv
+import io
+import queue
+import time
+import threading
+from collections import Counter
+from functools import wraps
+import backup
+from assets import CDN_ASSETS, AssetCache, seed_from_bundle
+from cache import TTLCache
+from catalog import CONFIG_POLL_SECONDS, ConfigSource
+from changes import CHANGE_LOG_INDEX, CHANGE_LOG_SCHEMA, record_change, record_changes
+from effects import EFFECT_KINDS, EFFECTS_SCHEMA, GRANT_SQL
+from inventory import (ENTITY_INSTANCES_INDEX, ENTITY_INSTANCES_SCHEMA, INSTANCED_RARITIES, Inventory, decode_counts, encode_delta, inventory_statements,
+                       migrate_inventories_sync, register_inventory_functions)
+from livefeed import LiveFeed, format_sse
+from records import GUILD_COLUMNS, GUILD_FIELDS, USER_COLUMNS, USER_FIELDS, GuildRecord, UserRecord, select_columns
+from timestamps import epoch_fields, epoch_iso, live_premium, migrate_timestamps_sync
 
 app = Flask(__name__)
 app.secret_key = os.getenv('DASHBOARD_SECRET', 'nexusverse12')
@@ -12,21 +30,24 @@ DB_FILE = 'nexusverse.db'
 OWNER_ID = int(os.getenv('OWNER_ID', '0'))
 ADMIN_IDS = [int(id.strip()) for id in os.getenv('ADMIN_IDS', '').split(',') if id.strip()] if os.getenv('ADMIN_IDS') else []
 
-# CONFIG (Nostalgic Entities – Same as Bot)
-CONFIG = {
-    'entities': [
-        {'name': 'Pac-Man Ghost', 'rarity': 'Common', 'emoji': '👻', 'power': 10, 'desc': 'Classic maze chaser.', 'image_url': 'https://media.giphy.com/media/26ufnwz3wDUfck3m0/giphy.gif'},
-        {'name': 'SpongeBob SquarePants', 'rarity': 'Rare', 'emoji': '🧽', 'power': 50, 'desc': 'Bikini Bottom hero.', 'image_url': 'https://media.giphy.com/media/3o7btPCcdNniyf0ArS/giphy.gif'},
-        {'name': 'Shrek Ogre', 'rarity': 'Epic', 'emoji': '🧅', 'power': 100, 'desc': 'Swamp king.', 'image_url': 'https://media.giphy.com/media/l0HlRnAWXxn0MhKLK/giphy.gif'},
-        {'name': 'Super Mario', 'rarity': 'Legendary', 'emoji': '🍄', 'power': 200, 'desc': 'Plumber legend.', 'image_url': 'https://media.giphy.com/media/26ufktO5bj6aKk9z2/giphy.gif'},
-        {'name': 'Pikachu', 'rarity': 'Mythic', 'emoji': '⚡', 'power': 500, 'desc': 'Electric mouse master.', 'image_url': 'https://media.giphy.com/media/3o7btMYv2bT4nX4X4k/giphy.gif'},
-        {'name': 'Sonic the Hedgehog', 'rarity': 'Rare', 'emoji': '🦔', 'power': 60, 'desc': 'Speed runner.', 'image_url': 'https://media.giphy.com/media/3o7btPCcdNniyf0ArS/giphy.gif'},
-        {'name': 'Donkey Kong', 'rarity': 'Epic', 'emoji': '🍌', 'power': 120, 'desc': 'Barrel thrower.', 'image_url': 'https://media.giphy.com/media/l0HlRnAWXxn0MhKLK/giphy.gif'},
-        {'name': 'Kirby', 'rarity': 'Legendary', 'emoji': '⭐', 'power': 180, 'desc': 'Puffball absorber.', 'image_url': 'https://media.giphy.com/media/26ufktO5bj6aKk9z2/giphy.gif'},
-        {'name': 'Link (Zelda)', 'rarity': 'Mythic', 'emoji': '🗡️', 'power': 450, 'desc': 'Hero of time.', 'image_url': 'https://media.giphy.com/media/3o7btMYv2bT4nX4X4k/giphy.gif'},
-        {'name': 'Master Chief', 'rarity': 'Mythic', 'emoji': '🎮', 'power': 600, 'desc': 'Halo Spartan.', 'image_url': 'https://media.giphy.com/media/3o7btPCcdNniyf0ArS/giphy.gif'}
-    ]
-}
+# CONFIG (Nostalgic Entities – Same catalog as Bot, loaded from config.json & hot-reloaded)
+CONFIG_SOURCE = ConfigSource()
+CONFIG = CONFIG_SOURCE.current.raw
+CATALOG = CONFIG_SOURCE.current.catalog
+config_checked_at = time.monotonic()
+
+@app.before_request
+def reload_config():
+    # At most one stat per CONFIG_POLL_SECONDS; a changed file is compiled once (ConfigSource lock) and swapped in
+    global CONFIG, CATALOG, config_checked_at
+    if time.monotonic() - config_checked_at < CONFIG_POLL_SECONDS:
+        return
+    config_checked_at = time.monotonic()
+    game = CONFIG_SOURCE.poll()
+    if game is not None:
+        CONFIG, CATALOG = game.raw, game.catalog
+        invalidate_views('top_entities')
+        print(f"🔄 config.json reloaded – {len(CATALOG)} entities")
 
 # Advanced DB Helpers (Hierarchy Tables, Per-Guild)
 def init_dashboard_db():
@@ -41,10 +62,13 @@ def init_dashboard_db():
                 entities TEXT DEFAULT '[]',
                 level INTEGER DEFAULT 1,
                 pity INTEGER DEFAULT 0,
-                premium_until TEXT DEFAULT NULL,
+                premium_until_ts INTEGER DEFAULT NULL,
                 streak INTEGER DEFAULT 0,
-                last_daily TEXT DEFAULT NULL,
-                is_official_member BOOLEAN DEFAULT 0
+                last_daily_ts INTEGER DEFAULT NULL,
+                is_official_member BOOLEAN DEFAULT 0,
+                entity_ids BLOB,
+                entity_counts BLOB,
+                is_premium INTEGER DEFAULT 0
             )
         ''')
         cursor.execute('''
@@ -52,14 +76,15 @@ def init_dashboard_db():
                 guild_id INTEGER PRIMARY KEY,
                 is_official BOOLEAN DEFAULT 0,
                 spawn_multiplier REAL DEFAULT 1.0,
-                premium_until TEXT DEFAULT NULL
+                premium_until_ts INTEGER DEFAULT NULL,
+                is_premium INTEGER DEFAULT 0
             )
         ''')
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS bans (
                 user_id INTEGER PRIMARY KEY,
                 reason TEXT,
-                timestamp TEXT,
+                banned_at INTEGER,
                 guild_id INTEGER DEFAULT NULL  -- Per-guild bans
             )
         ''')
@@ -67,8 +92,8 @@ def init_dashboard_db():
             CREATE TABLE IF NOT EXISTS global_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 event_type TEXT,
-                start_time TEXT,
-                end_time TEXT
+                start_ts INTEGER,
+                end_ts INTEGER
             )
         ''')
         # New Hierarchy Tables
@@ -92,6 +117,12 @@ def init_dashboard_db():
                 timestamp TEXT
             )
         ''')
+        cursor.execute(CHANGE_LOG_SCHEMA)  # Tells the bot which cached keys our writes touched
+        cursor.execute(CHANGE_LOG_INDEX)
+        cursor.execute(ENTITY_INSTANCES_SCHEMA)
+        cursor.execute(ENTITY_INSTANCES_INDEX)
+        for statement in EFFECTS_SCHEMA:  # Server premium grants are timed effects, as in the bot
+            cursor.execute(statement)
         # Initial Owner
         cursor.execute('INSERT OR IGNORE INTO admins (user_id, level, assigned_by, assigned_at) VALUES (?, "owner", ?, ?)', (OWNER_ID, OWNER_ID, datetime.now().isoformat()))
         # Initial Admins from Env
@@ -124,6 +155,7 @@ def log_audit(action: str, issuer_id: int, target_id: int = None, guild_id: int
                        (action, issuer_id, target_id, guild_id, level, datetime.now().isoformat()))
         conn.commit()
         conn.close()
+        invalidate_views('audits')
         print(f"Audit: {level} {issuer_id} did {action} on {target_id} in {guild_id}")
     except Exception as e:
         print(f"Audit error: {e}")
@@ -131,6 +163,7 @@ def log_audit(action: str, issuer_id: int, target_id: int = None, guild_id: int
 # Permission Decorator (Advanced – Owner > Admin > Mod)
 def access_required(min_level: str):
     def decorator(f):
+        @wraps(f)  # Keep the view's name – Flask endpoints are named after it
         def decorated(*args, **kwargs):
             user_id = session.get('user_id')
             level = get_user_level(user_id)
@@ -163,58 +196,97 @@ def get_user_data_sync(user_id: int) -> dict:
         init_dashboard_db()
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
+        cursor.execute(f'SELECT {select_columns(USER_COLUMNS, USER_FIELDS)} FROM users WHERE user_id = ?', (user_id,))
         row = cursor.fetchone()
         conn.close()
-        if row:
-            keys = ['user_id', 'credits', 'entities', 'level', 'pity', 'premium_until', 'streak', 'last_daily', 'is_official_member']
-            data = dict(zip(keys, row))
-            data['entities'] = json.loads(data['entities'] or '[]')
-            data['is_premium'] = bool(data['premium_until'] and datetime.fromisoformat(data['premium_until']) > datetime.now())
-            return data
-        return {'user_id': user_id, 'credits': 100, 'entities': [], 'level': 1, 'is_premium': False, 'streak': 0, 'last_daily': None, 'is_official_member': False}
+        return live_premium(UserRecord.from_row(user_id, USER_FIELDS, row, CATALOG))  # Same record type as the bot
     except:
         return {'error': 'DB error', 'user_id': user_id}
 
-def update_user_data_sync(user_id: int, **kwargs):
+def update_user_data_sync(user_id: int, deltas: dict = None, **kwargs):
     try:
         init_dashboard_db()
         conn = sqlite3.connect(DB_FILE)
+        register_inventory_functions(conn)
         cursor = conn.cursor()
-        set_parts = ', '.join([f"{k} = ?" for k in kwargs])
-        values = [json.dumps(kwargs['entities']) if k == 'entities' else (kwargs[k].isoformat() if k == 'premium_until' and kwargs[k] else kwargs[k]) for k in kwargs] + [user_id]
-        cursor.execute(f'UPDATE users SET {set_parts} WHERE user_id = ?', values)
-        if cursor.rowcount == 0:
-            cursor.execute('INSERT INTO users (user_id, credits, level) VALUES (?, 100, 1)', (user_id,))
+        fields = epoch_fields({k: v for k, v in kwargs.items() if k != 'entities'})  # premium_until/last_daily -> epoch columns
+        cursor.execute('INSERT OR IGNORE INTO users (user_id, credits, level) VALUES (?, 100, 1)', (user_id,))
+        if cursor.rowcount:
+            invalidate_views('total_users')
+        deltas = deltas or {}
+        if fields or deltas:
+            set_parts = ', '.join([f"{k} = ?" for k in fields] + [f"{k} = {k} + ?" for k in deltas])
+            values = list(fields.values()) + list(deltas.values()) + [user_id]
+            cursor.execute(f'UPDATE users SET {set_parts} WHERE user_id = ?', values)
+        if 'entities' in kwargs:
+            # Counted inventory – only the pending per-entity deltas are written (inv_merge)
+            for sql, params in inventory_statements(user_id, kwargs['entities'], CATALOG):
+                cursor.execute(sql, params)
+        record_change(cursor, 'user', user_id)
         conn.commit()
         conn.close()
+        if 'entities' in kwargs:
+            if isinstance(kwargs['entities'], Inventory):
+                kwargs['entities'].mark_saved()
+            invalidate_views('top_entities')
         log_audit('update_user', session['user_id'], user_id, level=get_user_level(session['user_id']))
     except Exception as e:
         print(f"Update user error: {e}")
 
+def save_user_sync(data: UserRecord):
+    # Writes only what the route changed (dirty fields, counter deltas + the inventory's pending delta)
+    update_user_data_sync(data['user_id'], data.deltas(), **data.changes())
+    data.mark_saved()
+
 def update_guild_data_sync(guild_id: int, **kwargs):
     try:
         init_dashboard_db()
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
-        set_parts = ', '.join([f"{k} = ?" for k in kwargs])
-        values = list(kwargs.values()) + [guild_id]
+        fields = epoch_fields(kwargs)
+        set_parts = ', '.join([f"{k} = ?" for k in fields])
+        values = list(fields.values()) + [guild_id]
         cursor.execute(f'UPDATE guilds SET {set_parts} WHERE guild_id = ?', values)
         if cursor.rowcount == 0:
             cursor.execute('INSERT INTO guilds (guild_id) VALUES (?)', (guild_id,))
+        record_change(cursor, 'guild', guild_id)
         conn.commit()
         conn.close()
+        invalidate_views('guilds')
         log_audit('update_guild', session['user_id'], None, guild_id, level=get_user_level(session['user_id']))
     except Exception as e:
         print(f"Update guild error: {e}")
 
+def grant_server_premium_sync(guild_id: int, duration: int) -> int:
+    # Same effects row as the bot's /owner server-premium (stacks onto an active grant) + the guild's
+    # premium_until for the guild list, in one transaction. Returns the new expiry
+    init_dashboard_db()
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        cursor = conn.cursor()
+        now = int(time.time())
+        scope = EFFECT_KINDS['server_premium'][0]
+        cursor.execute(GRANT_SQL, (scope, guild_id, 'server_premium', 1, now + duration, now, duration))
+        effect_id, expires_at = cursor.fetchone()
+        cursor.execute('INSERT OR IGNORE INTO guilds (guild_id) VALUES (?)', (guild_id,))
+        fields = epoch_fields({'premium_until': expires_at})
+        cursor.execute(f"UPDATE guilds SET {', '.join(f'{k} = ?' for k in fields)} WHERE guild_id = ?", (*fields.values(), guild_id))
+        record_change(cursor, 'guild', guild_id)
+        record_change(cursor, 'effect', effect_id)  # Bot reloads its effect heap & modifiers
+        conn.commit()
+    finally:
+        conn.close()
+    invalidate_views('guilds')
+    return expires_at
+
 def ban_user_sync(user_id: int, reason: str, guild_id: int = None):
     try:
         init_dashboard_db()
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
-        cursor.execute('INSERT OR REPLACE INTO bans (user_id, reason, timestamp, guild_id) VALUES (?, ?, ?, ?)',
-                       (user_id, reason, datetime.now().isoformat(), guild_id))
+        cursor.execute('INSERT OR REPLACE INTO bans (user_id, reason, banned_at, guild_id) VALUES (?, ?, ?, ?)',
+                       (user_id, reason, int(time.time()), guild_id))
+        record_change(cursor, 'ban', user_id)
         conn.commit()
         conn.close()
         log_audit('ban_user', session['user_id'], user_id, guild_id, level=get_user_level(session['user_id']))
@@ -232,6 +304,7 @@ def unban_user_sync(user_id: int, guild_id: int = None):
         if guild_id:
             params += (guild_id,)
         cursor.execute(f'DELETE FROM bans WHERE user_id = ? AND {where}', params)
+        record_change(cursor, 'ban', user_id)
         conn.commit()
         conn.close()
         log_audit('unban_user', session['user_id'], user_id, guild_id, level=get_user_level(session['user_id']))
@@ -249,6 +322,7 @@ def assign_role_sync(user_id: int, level: str, assigned_by: int, guild_ids: list
                        (user_id, level, assigned_by, datetime.now().isoformat(), guilds_json))
         conn.commit()
         conn.close()
+        invalidate_views('admins')
         log_audit(f'assign_{level}', assigned_by, user_id, level=level)
         print(f"Assigned {level} to {user_id} by {assigned_by} for guilds {guild_ids}")
     except Exception as e:
@@ -262,6 +336,7 @@ def remove_role_sync(user_id: int, level: str, removed_by: int):
         cursor.execute('DELETE FROM admins WHERE user_id = ? AND level = ?', (user_id, level))
         conn.commit()
         conn.close()
+        invalidate_views('admins')
         log_audit(f'remove_{level}', removed_by, user_id, level=level)
         print(f"Removed {level} from {user_id} by {removed_by}")
     except Exception as e:
@@ -290,15 +365,11 @@ def get_guilds_sync():
     try:
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
-        cursor.execute('SELECT guild_id, is_official, spawn_multiplier, premium_until FROM guilds')
+        cursor.execute(f'SELECT guild_id, {select_columns(GUILD_COLUMNS, GUILD_FIELDS)} FROM guilds')
         rows = cursor.fetchall()
         conn.close()
-        guilds = []
-        for row in rows:
-            data = {'guild_id': row[0], 'is_official': bool(row[1]), 'spawn_multiplier': row[2], 'premium_until': row[3]}
-            data['is_premium'] = bool(data['premium_until'] and datetime.fromisoformat(data['premium_until']) > datetime.now())
-            guilds.append(data)
-        return guilds
+        now = time.time()
+        return [live_premium(GuildRecord.from_row(row[0], GUILD_FIELDS, row[1:]), now) for row in rows]
     except Exception as e:
         print(f"Get guilds error: {e}")
         return []
@@ -319,6 +390,51 @@ def get_audit_logs_sync(limit: int = 20):
         print(f"Get audits error: {e}")
         return []
 
+def get_global_event_sync():
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+        cursor.execute('SELECT event_type FROM global_events WHERE end_ts > ? LIMIT 1', (int(time.time()),))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+    except Exception as e:
+        print(f"Get event error: {e}")
+        return None
+
+def start_global_event_sync(event_type: str, duration: int = 24):
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+        now = int(time.time())
+        cursor.execute('DELETE FROM global_events')
+        cursor.execute('INSERT INTO global_events (event_type, start_ts, end_ts) VALUES (?, ?, ?)',
+                       (event_type, now, now + duration * 3600))
+        record_change(cursor, 'event')
+        conn.commit()
+        conn.close()
+        invalidate_views('event')
+        print(f"Global event {event_type} started for {duration}h")
+    except Exception as e:
+        print(f"Start event error: {e}")
+
+def get_top_entities_sync(limit: int = 5):
+    # Most-owned entities across all collections (sums the per-user count maps – cached, see VIEW_TTLS)
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+        cursor.execute('SELECT entity_counts FROM users WHERE entity_counts IS NOT NULL')
+        counts = Counter()
+        for rows in iter(lambda: cursor.fetchmany(EXPORT_BATCH_ROWS), []):
+            for (blob,) in rows:
+                counts.update(decode_counts(blob))
+        conn.close()
+        top = [(CATALOG.get(entity_id), count) for entity_id, count in counts.most_common()]
+        return [{'name': entity.name, 'power': entity.power, 'count': count} for entity, count in top if entity][:limit]
+    except Exception as e:
+        print(f"Get top entities error: {e}")
+        return []
+
 def get_per_guild_users_sync(guild_id: int):
     try:
         # Simulate per-guild users (in full, add guild_id to users table)
@@ -326,11 +442,212 @@ def get_per_guild_users_sync(guild_id: int):
     except:
         return 0
 
+# Bulk Admin Ops (CSV/JSON Batches – Validated, Chunked executemany, One Audit per Batch)
+BULK_OPS = ('credits', 'premium', 'entity')
+BULK_CHUNK_SIZE = 500
+BULK_MAX_ROWS = 50000
+
+def parse_bulk_ops(rows) -> tuple:
+    # rows: iterable of dicts with user_id, op, value – returns (ops, errors)
+    ops, errors = [], []
+    for line_no, row in enumerate(rows, start=1):
+        if line_no > BULK_MAX_ROWS:
+            errors.append(f'Row limit {BULK_MAX_ROWS} exceeded – Split the batch.')
+            break
+        try:
+            user_id = int(str(row.get('user_id', '')).strip())
+            op = str(row.get('op', '')).strip().lower()
+            value = str(row.get('value', '')).strip()
+            if user_id <= 0:
+                raise ValueError('user_id must be positive')
+            if op == 'credits':
+                ops.append((user_id, op, int(value)))
+            elif op == 'premium':
+                months = int(value or 1)
+                if months < 1 or months > 12:
+                    raise ValueError('premium months must be 1-12')
+                ops.append((user_id, op, months))
+            elif op == 'entity':
+                entity = CATALOG.find(value)
+                if entity is None:
+                    raise ValueError(f'unknown entity "{value}"')
+                ops.append((user_id, op, entity.id))
+            else:
+                raise ValueError(f'op must be one of {", ".join(BULK_OPS)}')
+        except (ValueError, AttributeError) as e:
+            errors.append(f'Row {line_no}: {e}')
+    return ops, errors
+
+def apply_bulk_ops_sync(ops: list) -> dict:
+    started = time.perf_counter()
+    counts = {op: 0 for op in BULK_OPS}
+    users = set()
+    conn = sqlite3.connect(DB_FILE)
+    register_inventory_functions(conn)
+    try:
+        cursor = conn.cursor()
+        for start in range(0, len(ops), BULK_CHUNK_SIZE):
+            chunk = ops[start:start + BULK_CHUNK_SIZE]
+            chunk_users = {user_id for user_id, _, _ in chunk}
+            credits = [(value, user_id) for user_id, op, value in chunk if op == 'credits']
+            premium = [(int(time.time()) + 30 * 86400 * value, int(value > 0), user_id) for user_id, op, value in chunk if op == 'premium']
+            entities = [(encode_delta({value: 1}), user_id) for user_id, op, value in chunk if op == 'entity']
+            instances = [(value, user_id, time.time()) for user_id, op, value in chunk if op == 'entity' and CATALOG.get(value).rarity in INSTANCED_RARITIES]
+            with conn:  # One transaction per chunk
+                cursor.executemany('INSERT OR IGNORE INTO users (user_id, credits, level) VALUES (?, 100, 1)', [(u,) for u in chunk_users])
+                cursor.executemany('UPDATE users SET credits = credits + ? WHERE user_id = ?', credits)
+                cursor.executemany('UPDATE users SET premium_until_ts = ?, is_premium = ? WHERE user_id = ?', premium)
+                cursor.executemany('UPDATE users SET entity_counts = inv_merge(entity_counts, ?) WHERE user_id = ?', entities)
+                cursor.executemany('INSERT INTO entity_instances (entity_id, owner_id, acquired_at) VALUES (?, ?, ?)', instances)
+                record_changes(cursor, 'user', chunk_users)
+            users |= chunk_users
+            counts['credits'] += len(credits)
+            counts['premium'] += len(premium)
+            counts['entity'] += len(entities)
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - started
+    invalidate_views('total_users', 'top_entities')
+    return {'rows': len(ops), 'users': len(users), 'ops': counts, 'seconds': round(elapsed, 3),
+            'rows_per_sec': round(len(ops) / elapsed) if elapsed > 0 else len(ops)}
+
+# Streaming Exports (Row-by-Row from the Cursor – Constant Memory for Any Table Size)
+EXPORT_BATCH_ROWS = 500
+ISO_SQL = "strftime('%Y-%m-%dT%H:%M:%S', {}, 'unixepoch', 'localtime')"  # Epoch columns export as ISO, as before
+EXPORTS = {
+    'users': {
+        'sql': f"SELECT user_id, credits, level, pity, {ISO_SQL.format('premium_until_ts')}, streak, {ISO_SQL.format('last_daily_ts')}, is_official_member, COALESCE(inv_total(entity_counts), 0) FROM users",
+        'columns': ['user_id', 'credits', 'level', 'pity', 'premium_until', 'streak', 'last_daily', 'is_official_member', 'entity_count'],
+        'filters': {'min_credits': ('credits >= ?', int), 'min_level': ('level >= ?', int),
+                    'premium': ('(COALESCE(premium_until_ts, 0) > ?) = ?', lambda v: (int(time.time()), int(v == '1')))},
+        'order': 'user_id',
+    },
+    'bans': {
+        'sql': f"SELECT user_id, reason, {ISO_SQL.format('banned_at')}, guild_id FROM bans",
+        'columns': ['user_id', 'reason', 'timestamp', 'guild_id'],
+        'filters': {'guild': ('guild_id = ?', int), 'since': ('banned_at >= ?', lambda v: int(datetime.fromisoformat(v).timestamp()))},
+        'order': 'banned_at',
+    },
+    'audits': {
+        'sql': 'SELECT id, action, issuer_id, target_id, guild_id, level, timestamp FROM audits',
+        'columns': ['id', 'action', 'issuer_id', 'target_id', 'guild_id', 'level', 'timestamp'],
+        'filters': {'level': ('level = ?', str), 'guild': ('guild_id = ?', int), 'issuer': ('issuer_id = ?', int), 'since': ('timestamp >= ?', str)},
+        'order': 'id',
+    },
+}
+
+def build_export_query(dataset: str, args) -> tuple:
+    spec = EXPORTS[dataset]
+    clauses, params = [], []
+    for name, (clause, cast) in spec['filters'].items():
+        raw = args.get(name, '').strip()
+        if not raw:
+            continue
+        value = cast(raw)  # ValueError on bad filter input
+        clauses.append(clause)
+        params.extend(value if isinstance(value, tuple) else (value,))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    return f"{spec['sql']}{where} ORDER BY {spec['order']}", params
+
+def iter_export_rows(sql: str, params: list):
+    conn = sqlite3.connect(DB_FILE)
+    register_inventory_functions(conn)
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def iter_export_csv(columns: list, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_export_ndjson(columns: list, batches):
+    for rows in batches:
+        yield ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows)
+
+# Aggregate View Cache (Per-Key TTLs – Uptime checks & page bursts share one query)
+VIEW_CACHE = TTLCache()
+VIEW_TTLS = {'total_users': 30, 'event': 15, 'admins': 60, 'guilds': 60, 'audits': 10, 'top_entities': 300}
+
+def get_cached_view(key: str, loader, *args):
+    return VIEW_CACHE.get_or_load(key, lambda: loader(*args), VIEW_TTLS.get(key.split(':')[0]))
+
+def invalidate_views(*prefixes: str):
+    for prefix in prefixes:
+        VIEW_CACHE.invalidate_prefix(prefix)
+    LIVE_FEED.poke()  # Open dashboards see the write on the next tick, not after the TTL
+
+# Live Feed (SSE – One counter computation per tick, fanned out to every open dashboard)
+LIVE_INTERVAL = 2.0
+LIVE_HEARTBEAT = 15.0      # Comment line keeps proxies from closing idle streams
+LIVE_AUDIT_BATCH = 50
+
+def compute_live_counters_sync(state: dict) -> tuple:
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        cursor = conn.cursor()
+        # Bot writes 'catch'/'pull' rows to change_log – indexed (kind, changed_at) range, no table scan
+        cursor.execute("SELECT kind, COUNT(*) FROM change_log WHERE kind IN ('catch', 'pull') AND changed_at > ? GROUP BY kind", (time.time() - 60,))
+        per_minute = dict(cursor.fetchall())
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM audits')
+        max_id = cursor.fetchone()[0]
+        last_id = state.get('last_audit_id')
+        new_audits = []
+        if last_id is not None and max_id > last_id:
+            cursor.execute('SELECT id, action, issuer_id, target_id, guild_id, level, timestamp FROM audits WHERE id > ? ORDER BY id DESC LIMIT ?',
+                           (last_id, LIVE_AUDIT_BATCH))
+            keys = ['id', 'action', 'issuer_id', 'target_id', 'guild_id', 'level', 'timestamp']
+            new_audits = [dict(zip(keys, row)) for row in reversed(cursor.fetchall())]
+        state['last_audit_id'] = max_id  # Also resets cleanly if a restore moved ids backwards
+    finally:
+        conn.close()
+    counters = {
+        'total_users': get_cached_view('total_users', get_total_users_sync),
+        'event': get_cached_view('event', get_global_event_sync) or 'None',
+        'catches_per_min': per_minute.get('catch', 0),
+        'pulls_per_min': per_minute.get('pull', 0),
+    }
+    return counters, ([('audits', new_audits)] if new_audits else [])
+
+LIVE_FEED = LiveFeed(compute_live_counters_sync, interval=LIVE_INTERVAL)
+
+def iter_live_events(q):
+    try:
+        yield 'retry: 5000\n\n'
+        snapshot = LIVE_FEED.snapshot()
+        if snapshot:  # Late joiners get the full state; the first subscriber gets it from the first tick
+            yield format_sse('counters', snapshot)
+        while True:
+            try:
+                event, data = q.get(timeout=LIVE_HEARTBEAT)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(event, data)
+    finally:
+        LIVE_FEED.unsubscribe(q)
+
 # Auto-init
 init_dashboard_db()
+migrate_inventories_sync(DB_FILE, CATALOG)  # Legacy inventories -> counted storage (idempotent)
+migrate_timestamps_sync(DB_FILE)  # ISO strings -> indexed epoch integers (idempotent)
 
 # Permission Decorators (Advanced)
 def login_required(f):
+    @wraps(f)
     def decorated(*args, **kwargs):
         if 'logged_in' not in session:
             return redirect(url_for('login'))
@@ -339,7 +656,6 @@ def login_required(f):
 
 # Routes (Advanced Login – Owner Secret, Admins/Mods ID Check)
 @app.route('/login', methods=['GET', 'POST'])
-@login_required
 def login():
     if request.method == 'POST':
         user_id = int(request.form.get('user_id', 0))
@@ -351,12 +667,14 @@ def login():
         if level == 'owner' and secret == app.secret_key:
             session['user_id'] = user_id
             session['level'] = level
+            session['logged_in'] = True  # login_required checks this
             log_audit('login', user_id, level=level)
             flash('Login successful, Owner! 👑', 'success')
             return redirect(url_for('dashboard'))
         elif level in ['admin', 'mod'] and user_id in session.get('allowed_ids', []):  # ID check for non-owner
             session['user_id'] = user_id
             session['level'] = level
+            session['logged_in'] = True
             log_audit('login', user_id, level=level)
             flash(f'Login successful, {level.title()}! ⭐', 'success')
             return redirect(url_for('dashboard'))
@@ -379,7 +697,7 @@ def home():
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Ultimate NexusVerse Dashboard</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
+        <link href="/cdn/bootstrap.min.css" rel="stylesheet">
         <style>
             body { background: linear-gradient(135deg, #0D1117 0%, #1a1a2e 50%, #16213e 100%); color: #fff; padding: 50px; }
             .neon-glow { box-shadow: 0 0 20px #00D4FF; border: 1px solid #00D4FF; animation: glow 2s ease-in-out infinite alternate; }
@@ -407,9 +725,9 @@ def home():
 @access_required('mod')  # Mods can view public
 def public_dashboard():
     try:
-        total_users = get_total_users_sync()
-        event = get_global_event_sync() or 'None'
-        admins = get_admins_sync()
+        total_users = get_cached_view('total_users', get_total_users_sync)
+        event = get_cached_view('event', get_global_event_sync) or 'None'
+        admins = get_cached_view('admins', get_admins_sync)
         return f'''
         <!DOCTYPE html>
         <html lang="en">
@@ -417,14 +735,14 @@ def public_dashboard():
             <meta charset="UTF-8">
             <meta name="viewport" content="width=device-width, initial-scale=1.0">
             <title>Public Stats - Ultimate NexusVerse</title>
-            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
+            <link href="/cdn/bootstrap.min.css" rel="stylesheet">
             <style>
-                body { background: linear-gradient(135deg, #0D1117, #1a1a2e); color: #fff; padding: 50px; }
-                .card { background: rgba(13,17,23,0.8); border-radius: 15px; box-shadow: 0 0 20px #00D4FF; transition: all 0.3s; }
-                .card:hover { box-shadow: 0 0 30px #8B00FF; transform: translateY(-5px); }
-                .neon-glow { box-shadow: 0 0 20px #00D4FF; }
-                .btn-neon { background: linear-gradient(45deg, #00D4FF, #8B00FF); color: white; box-shadow: 0 0 15px rgba(0,212,255,0.5); }
-                .badge { animation: pulse 1s infinite; }
+                body {{ background: linear-gradient(135deg, #0D1117, #1a1a2e); color: #fff; padding: 50px; }}
+                .card {{ background: rgba(13,17,23,0.8); border-radius: 15px; box-shadow: 0 0 20px #00D4FF; transition: all 0.3s; }}
+                .card:hover {{ box-shadow: 0 0 30px #8B00FF; transform: translateY(-5px); }}
+                .neon-glow {{ box-shadow: 0 0 20px #00D4FF; }}
+                .btn-neon {{ background: linear-gradient(45deg, #00D4FF, #8B00FF); color: white; box-shadow: 0 0 15px rgba(0,212,255,0.5); }}
+                .badge {{ animation: pulse 1s infinite; }}
                 @keyframes pulse {{ 0% {{ transform: scale(1); }} 50% {{ transform: scale(1.05); }} 100% {{ transform: scale(1); }} }}
             </style>
         </head>
@@ -482,13 +800,13 @@ def dashboard():
     try:
         user_id = session['user_id']
         level = session['level']
-        total_users = get_total_users_sync()
+        total_users = get_cached_view('total_users', get_total_users_sync)
         owner_data = get_user_data_sync(user_id)
-        top_entities = get_top_entities_sync()
-        event = get_global_event_sync() or 'None'
-        admins = get_admins_sync()
-        guilds = get_guilds_sync()
-        audit_logs = get_audit_logs_sync(10)
+        top_entities = get_cached_view('top_entities', get_top_entities_sync)
+        event = get_cached_view('event', get_global_event_sync) or 'None'
+        admins = get_cached_view('admins', get_admins_sync)
+        guilds = get_cached_view('guilds', get_guilds_sync)
+        audit_logs = get_cached_view('audits:10', get_audit_logs_sync, 10)
         return render_template_string(ADMIN_TEMPLATE, total_users=total_users, owner_data=owner_data, top_entities=top_entities, event=event, admins=admins, guilds=guilds, audit_logs=audit_logs, level=level, user_id=user_id)
     except Exception as e:
         print(f"Dashboard error: {e}")
@@ -503,7 +821,7 @@ LOGIN_TEMPLATE = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Advanced Login - NexusVerse</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
+    <link href="/cdn/bootstrap.min.css" rel="stylesheet">
     <style>
         body { background: linear-gradient(135deg, #0D1117 0%, #1a1a2e 50%, #16213e 100%); color: #fff; min-height: 100vh; display: flex; align-items: center; justify-content: center; }
         .login-card { background: rgba(13,17,23,0.9); border-radius: 20px; box-shadow: 0 0 30px rgba(0,212,255,0.5); border: 1px solid #00D4FF; padding: 40px; width: 450px; animation: glow 2s ease-in-out infinite alternate; }
@@ -556,8 +874,8 @@ ADMIN_TEMPLATE = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Ultimate Advanced Dashboard - NexusVerse</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    <link href="/cdn/bootstrap.min.css" rel="stylesheet">
+    <script src="/cdn/chart.js"></script>
     <style>
         body { background: linear-gradient(135deg, #0D1117 0%, #1a1a2e 50%, #16213e 100%); color: #fff; font-family: 'Arial', sans-serif; }
         .neon-glow { box-shadow: 0 0 20px #00D4FF, inset 0 0 10px rgba(0,212,255,0.1); border: 1px solid #00D4FF; transition: all 0.3s; }
@@ -619,10 +937,10 @@ ADMIN_TEMPLATE = '''
                 <button class="nav-link" id="users-tab" data-bs-toggle="tab" data-bs-target="#users" type="button">👥 Users</button>
             </li>
             <li class="nav-item" role="presentation">
-                <button class="nav-link" id="admins-tab" data-bs-toggle="tab" data-bs-target="#admins" type="button" {{ 'data-bs-toggle="tab"' if level in ['owner', 'admin'] else 'disabled' }}>⭐ Admins ({{ len([a for a in admins if a.level == 'admin']) }})</button>
+                <button class="nav-link" id="admins-tab" data-bs-toggle="tab" data-bs-target="#admins" type="button" {{ 'data-bs-toggle="tab"' if level in ['owner', 'admin'] else 'disabled' }}>⭐ Admins ({{ admins|selectattr('level', 'equalto', 'admin')|list|length }})</button>
             </li>
             <li class="nav-item" role="presentation">
-                <button class="nav-link" id="mods-tab" data-bs-toggle="tab" data-bs-target="#mods" type="button" {{ 'data-bs-toggle="tab"' if level in ['owner', 'admin'] else 'disabled' }}>🛡️ Mods ({{ len([a for a in admins if a.level == 'mod']) }})</button>
+                <button class="nav-link" id="mods-tab" data-bs-toggle="tab" data-bs-target="#mods" type="button" {{ 'data-bs-toggle="tab"' if level in ['owner', 'admin'] else 'disabled' }}>🛡️ Mods ({{ admins|selectattr('level', 'equalto', 'mod')|list|length }})</button>
             </li>
             <li class="nav-item" role="presentation">
                 <button class="nav-link" id="audits-tab" data-bs-toggle="tab" data-bs-target="#audits" type="button">📝 Audits (Who Did What)</button>
@@ -635,7 +953,7 @@ ADMIN_TEMPLATE = '''
                     <div class="col-md-3 mb-3">
                         <div class="card neon-glow p-3 text-center">
                             <h5>Total Users</h5>
-                            <h2>{{ total_users }}</h2>
+                            <h2 id="liveTotalUsers">{{ total_users }}</h2>
                             <span class="badge badge-owner">👑 Global</span>
                         </div>
                     </div>
@@ -649,7 +967,7 @@ ADMIN_TEMPLATE = '''
                     <div class="col-md-3 mb-3">
                         <div class="card neon-glow p-3 text-center">
                             <h5>Active Event</h5>
-                            <h2>{{ event }}</h2>
+                            <h2 id="liveEvent">{{ event }}</h2>
                             <span class="badge badge-admin">⭐ Global Boost</span>
                         </div>
                     </div>
@@ -661,11 +979,14 @@ ADMIN_TEMPLATE = '''
                         </div>
                     </div>
                 </div>
+                <div class="card p-2 mb-3 text-center">
+                    <span>⚡ Live: <b id="liveCatches">0</b> catches/min | <b id="livePulls">0</b> pulls/min <span id="liveStatus" class="badge badge-mod">Connecting…</span></span>
+                </div>
                 <div class="row">
                     <div class="col-md-6">
                         <div class="card p-3">
                             <h5>Your Profile ({{ user_id }})</h5>
-                            <p>Entities: {{ owner_data.entities|length }} | Power: {{ owner_data.entities|sum(attribute='power') }}</p>
+                            <p>Entities: {{ owner_data.entities|length }} | Power: {{ owner_data.entities.total_power() if owner_data.entities is defined else 0 }}</p>
                             <p>Premium: {% if owner_data.is_premium %}💎 Active{% else %}No{% endif %}</p>
                             <a href="/api/profile/{{ user_id }}" class="btn btn-neon">View JSON</a>
                         </div>
@@ -698,6 +1019,30 @@ ADMIN_TEMPLATE = '''
                         }
                     });
                 </script>
+                {% if level == 'owner' %}
+                <!-- Backups (Owner Only – Online Snapshots + Restore) -->
+                <div class="sub-tab">
+                    <h5>💾 Backups (Online Snapshots – Bot Keeps Running)</h5>
+                    <form method="post" action="/admin/backup" class="d-inline">
+                        <button type="submit" class="btn btn-neon">Snapshot Now 💾</button>
+                    </form>
+                    <button class="btn btn-outline-light" onclick="loadBackups()">Refresh List</button>
+                    <div id="backupList" class="dynamic-list card p-3 mt-2"><p class="small">Load to see snapshots.</p></div>
+                    <script>
+                        function loadBackups() {
+                            fetch('/api/backups').then(r => r.json()).then(data => {
+                                const status = data.running ? '<p class="small">⏳ Backup running...</p>' : (data.error ? `<p class="text-danger small">Last error: ${data.error}</p>` : '');
+                                document.getElementById('backupList').innerHTML = status + (data.snapshots.map(s => `
+                                    <form method="post" action="/admin/restore" class="mb-1" onsubmit="return confirm('Restore ${s.name}? Current DB is saved as a pre-restore snapshot first.')">
+                                        <input type="hidden" name="name" value="${s.name}">
+                                        <span>${s.name} (${(s.gz_bytes / 1024).toFixed(1)} KB) ${s.has_checksum ? '✅' : '⚠️'}</span>
+                                        <button type="submit" class="btn btn-warning btn-sm ms-2">Restore</button>
+                                    </form>`).join('') || '<p class="small">No snapshots yet.</p>');
+                            });
+                        }
+                    </script>
+                </div>
+                {% endif %}
                 <!-- Global Commands Modals (Core/Economy – All Levels) -->
                 <div class="sub-tab">
                     <h5>Global Commands (Catch/Pull/Daily – Execute for Any User)</h5>
@@ -714,6 +1059,11 @@ ADMIN_TEMPLATE = '''
                         <div class="col-md-3 mb-3">
                             <button class="btn btn-neon w-100" data-bs-toggle="modal" data-bs-target="#premiumModal">Grant Premium 💎</button>
                         </div>
+                        {% if level in ['owner', 'admin'] %}
+                        <div class="col-md-3 mb-3">
+                            <button class="btn btn-neon w-100" data-bs-toggle="modal" data-bs-target="#bulkModal">Bulk Ops (CSV) 📦</button>
+                        </div>
+                        {% endif %}
                     </div>
                     <!-- Modals (Same as before, but with level checks) -->
                     <!-- Catch Modal (Global – All Levels) -->
@@ -781,6 +1131,28 @@ ADMIN_TEMPLATE = '''
                             </div>
                         </div>
                     </div>
+                    <!-- Bulk Ops Modal (Owner/Admin – Tournament Payouts etc.) -->
+                    <div class="modal fade" id="bulkModal" tabindex="-1">
+                        <div class="modal-dialog">
+                            <div class="modal-content bg-dark text-white neon-purple">
+                                <div class="modal-header">
+                                    <h5 class="modal-title">Bulk Operations (CSV)</h5>
+                                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
+                                </div>
+                                <form method="post" action="/admin/bulk" enctype="multipart/form-data">
+                                    <div class="modal-body">
+                                        <input type="file" name="file" accept=".csv,text/csv" class="form-control mb-2">
+                                        <textarea name="csv" class="form-control" rows="5" placeholder="user_id,op,value&#10;123,credits,500&#10;456,premium,1&#10;789,entity,Pikachu"></textarea>
+                                        <p class="small">Ops: credits (amount), premium (months 1-12), entity (name). Whole batch is validated first – One audit entry per batch.</p>
+                                    </div>
+                                    <div class="modal-footer">
+                                        <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cancel</button>
+                                        <button type="submit" class="btn btn-neon">Apply Batch 📦</button>
+                                    </div>
+                                </form>
+                            </div>
+                        </div>
+                    </div>
                     <!-- Daily Modal -->
                     <div class="modal fade" id="dailyModal" tabindex="-1">
                         <div class="modal-dialog">
@@ -1004,6 +1376,10 @@ ADMIN_TEMPLATE = '''
                     </div>
                 </div>
                 <button class="btn btn-neon mt-3" data-bs-toggle="modal" data-bs-target="#globalUserEditModal">Global User Edit 📊</button>
+                {% if level in ['owner', 'admin'] %}
+                <a href="/api/export/users?format=csv" class="btn btn-outline-light mt-3">Export Users CSV ⬇️</a>
+                <a href="/api/export/bans?format=csv" class="btn btn-outline-light mt-3">Export Bans CSV ⬇️</a>
+                {% endif %}
                 <script>
                     function searchUser() {
                         const userId = document.getElementById('userSearch').value;
@@ -1011,7 +1387,7 @@ ADMIN_TEMPLATE = '''
                         fetch(`/api/profile/${userId}`).then(r => r.json()).then(data => {
                             document.getElementById('userList').innerHTML = `
                                 <p><strong>User ${userId}:</strong> Credits ${data.credits}, Level ${data.level}, Premium ${data.is_premium ? 'Yes' : 'No'}</p>
-                                <p>Entities: ${data.entities.length} (Power Total: ${data.entities.reduce((sum, e) => sum + e.power, 0)})</p>
+                                <p>Entities: ${data.entity_count} (${data.entities.length} unique, Power Total: ${data.total_power})</p>
                             `;
                         }).catch(() => document.getElementById('userList').innerHTML = '<p class="text-danger">User not found or error.</p>');
                     }
@@ -1042,7 +1418,7 @@ ADMIN_TEMPLATE = '''
             </div>
             <!-- Admins Tab (Owner/Admin Only – Assign/Remove) -->
             <div class="tab-pane fade" id="admins" role="tabpanel">
-                <h5 class="mt-3">⭐ Admins Management ({{ len([a for a in admins if a.level == 'admin']) }})</h5>
+                <h5 class="mt-3">⭐ Admins Management ({{ admins|selectattr('level', 'equalto', 'admin')|list|length }})</h5>
                 <p class="small">Owner/Admins can assign/remove – Near-full powers (can't touch owners).</p>
                 <div id="adminsList" class="dynamic-list card p-3">
                     {% for admin in admins if admin.level == 'admin' %}
@@ -1096,7 +1472,7 @@ ADMIN_TEMPLATE = '''
             </div>
             <!-- Mods Tab (Owner/Admin Only – Assign/Remove with Guilds) -->
             <div class="tab-pane fade" id="mods" role="tabpanel">
-                <h5 class="mt-3">🛡️ Mods Management ({{ len([a for a in admins if a.level == 'mod']) }})</h5>
+                <h5 class="mt-3">🛡️ Mods Management ({{ admins|selectattr('level', 'equalto', 'mod')|list|length }})</h5>
                 <p class="small">Assign mods to specific guilds – Limited powers (ban/unban in assigned guilds only).</p>
                 <div id="modsList" class="dynamic-list card p-3">
                     {% for mod in admins if mod.level == 'mod' %}
@@ -1178,6 +1554,9 @@ ADMIN_TEMPLATE = '''
                     </div>
                     <div class="col-md-6">
                         <button class="btn btn-neon" onclick="loadAudits()">Load Audits</button>
+                        {% if level in ['owner', 'admin'] %}
+                        <button class="btn btn-outline-light" onclick="exportAudits()">Export NDJSON ⬇️</button>
+                        {% endif %}
                     </div>
                 </div>
                 <div class="card p-3">
@@ -1221,11 +1600,51 @@ ADMIN_TEMPLATE = '''
                             `).join('') || '<tr><td colspan="5" class="text-center">No audits</td></tr>';
                         }).catch(() => document.getElementById('auditTableBody').innerHTML = '<tr><td colspan="5" class="text-danger text-center">Load error</td></tr>');
                     }
+                    function exportAudits() {
+                        const level = document.getElementById('auditLevelFilter').value;
+                        const guild = document.getElementById('auditGuildFilter').value;
+                        window.location = `/api/export/audits?format=ndjson&level=${level}&guild=${guild}`;
+                    }
                     loadAudits();  // Initial load
+
+                    // Live Feed (SSE – counters & audit tail pushed by the server, no refresh needed)
+                    const liveSource = new EventSource('/api/live');
+                    const liveStatus = document.getElementById('liveStatus');
+                    liveSource.onopen = () => { liveStatus.textContent = 'Live'; };
+                    liveSource.onerror = () => { liveStatus.textContent = 'Reconnecting…'; };
+                    liveSource.addEventListener('counters', e => {
+                        const c = JSON.parse(e.data);
+                        if ('total_users' in c) document.getElementById('liveTotalUsers').textContent = c.total_users;
+                        if ('event' in c) document.getElementById('liveEvent').textContent = c.event;
+                        if ('catches_per_min' in c) document.getElementById('liveCatches').textContent = c.catches_per_min;
+                        if ('pulls_per_min' in c) document.getElementById('livePulls').textContent = c.pulls_per_min;
+                    });
+                    liveSource.addEventListener('audits', e => {
+                        const level = document.getElementById('auditLevelFilter').value;
+                        const guild = document.getElementById('auditGuildFilter').value;
+                        const tbody = document.getElementById('auditTableBody');
+                        JSON.parse(e.data).filter(log => (!level || log.level === level) && (!guild || String(log.guild_id) === guild)).forEach(log => {
+                            const row = document.createElement('tr');
+                            [log.action, `${log.issuer_id} (${log.level})`, log.target_id || 'N/A', log.guild_id || 'Global', log.timestamp.substring(0,16)].forEach((value, i) => {
+                                const cell = document.createElement('td');
+                                if (i === 1) {
+                                    const badge = document.createElement('span');
+                                    badge.className = `badge badge-${log.level}`;
+                                    badge.textContent = value;
+                                    cell.appendChild(badge);
+                                } else {
+                                    cell.textContent = value;
+                                }
+                                row.appendChild(cell);
+                            });
+                            tbody.prepend(row);
+                        });
+                        while (tbody.rows.length > 50) tbody.deleteRow(-1);
+                    });
                 </script>
             </div>
         </div>
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
+        <script src="/cdn/bootstrap.bundle.min.js"></script>
     </body>
 </html>
 '''
@@ -1237,12 +1656,12 @@ def admin_catch():
     try:
         user_id = int(request.form['user_id'])
         # Always spawns & catches (random from CONFIG)
-        entity = random.choice(CONFIG['entities'])
+        entity = random.choice(CATALOG.entities).to_dict()
         data = get_user_data_sync(user_id)
         data['entities'].append(entity)
         data['level'] += 1 if len(data['entities']) % 5 == 0 else 0
-        data['pity'] = 0
-        update_user_data_sync(user_id, entities=data['entities'], level=data['level'], pity=0)
+        data.reset('pity', 0)
+        save_user_sync(data)
         flash(f'{entity["name"]} caught for {user_id} (Power +{entity["power"]}) – QC/Pity synced to bot!', 'success')
         log_audit('admin_catch', session['user_id'], user_id, level=session['level'])
     except ValueError:
@@ -1261,11 +1680,11 @@ def admin_pull():
         data = get_user_data_sync(user_id)
         pulled = []
         for _ in range(num_pulls):
-            entity = random.choice(CONFIG['entities'])
+            entity = random.choice(CATALOG.entities).to_dict()
             pulled.append(entity)
             data['entities'].append(entity)
-        data['pity'] = 0  # Reset on pull
-        update_user_data_sync(user_id, entities=data['entities'], pity=0)
+        data.reset('pity', 0)  # Reset on pull
+        save_user_sync(data)
         flash(f'{num_pulls} pulls for {user_id}: {", ".join([p["name"] for p in pulled])} – Synced to bot /pull!', 'success')
         log_audit('admin_pull', session['user_id'], user_id, level=session['level'])
     except ValueError:
@@ -1284,8 +1703,8 @@ def admin_daily():
         data = get_user_data_sync(user_id)
         data['credits'] += credits
         data['streak'] += 1
-        data['last_daily'] = datetime.now().isoformat()
-        update_user_data_sync(user_id, credits=data['credits'], streak=data['streak'], last_daily=data['last_daily'])
+        data['last_daily'] = int(time.time())
+        save_user_sync(data)
         flash(f'Daily +{credits} credits & streak +1 for {user_id} – Synced to bot /daily!', 'success')
         log_audit('admin_daily', session['user_id'], user_id, level=session['level'])
     except ValueError:
@@ -1438,13 +1857,13 @@ def admin_edit_guild_user():
         if credits > 0:
             data['credits'] += credits
         if entities_add:
-            added_entities = [e for e in CONFIG['entities'] if e['name'].lower() in entities_add.lower().split(',')]
+            added_entities = [e.to_dict() for e in map(CATALOG.find, entities_add.split(',')) if e]
             if added_entities:
                 data['entities'].extend(added_entities)
                 flash(f'Added {len(added_entities)} entities to {user_id} in guild {guild_id}.', 'success')
             else:
                 flash('No matching entities found – Check names (e.g., Mario, Pikachu).', 'warning')
-        update_user_data_sync(user_id, credits=data['credits'], entities=data['entities'])
+        save_user_sync(data)
         flash(f'Edited {user_id} in guild {guild_id}: +{credits} credits – Per-guild sync to bot /profile!', 'success')
         log_audit('edit_guild_user', session['user_id'], user_id, guild_id, level=session['level'])
     except ValueError:
@@ -1460,9 +1879,10 @@ def admin_server_premium():
     try:
         guild_id = int(request.form['guild_id'])
         months = int(request.form.get('months', 1))
-        end_time = datetime.now() + timedelta(days=30 * months)
-        update_guild_data_sync(guild_id, premium_until=end_time)
-        flash(f'Server premium set for guild {guild_id} ({months} months) – Bot announces in all channels + perks (no cooldowns, 3x rates)!', 'success')
+        if not 1 <= months <= 12:
+            raise ValueError('months must be 1-12')  # Same range as the bot's /owner server-premium
+        expires_at = grant_server_premium_sync(guild_id, 30 * 86400 * months)
+        flash(f'Server premium set for guild {guild_id} ({months} months, until {datetime.fromtimestamp(expires_at):%Y-%m-%d}) – Members get the bot perks (no cooldowns, 3x rates)!', 'success')
         log_audit('server_premium', session['user_id'], None, guild_id, level=session['level'])
         print(f"Server premium announced for guild {guild_id} – Interlocked with bot guild_data")
     except ValueError:
@@ -1507,6 +1927,7 @@ def admin_edit_mod_guilds():
         cursor.execute('UPDATE admins SET guilds = ? WHERE user_id = ?', (guilds_json, user_id))
         conn.commit()
         conn.close()
+        invalidate_views('admins')
         flash(f'Mod {user_id} guilds updated to {guilds} – Bot /mod subs limited to these guilds!', 'success')
         log_audit('edit_mod_guilds', session['user_id'], user_id, level=session['level'])
     except ValueError:
@@ -1527,13 +1948,13 @@ def admin_edit_user():
         if credits > 0:
             data['credits'] += credits
         if entities_add:
-            added = [e for e in CONFIG['entities'] if e['name'].lower() in [n.strip().lower() for n in entities_add.split(',')]]
+            added = [e.to_dict() for e in map(CATALOG.find, entities_add.split(',')) if e]
             if added:
                 data['entities'].extend(added)
                 flash(f'Added {len(added)} entities to {user_id}.', 'success')
             else:
                 flash('No matching entities – Check names (e.g., Shrek, Pikachu).', 'warning')
-        update_user_data_sync(user_id, credits=data['credits'], entities=data['entities'])
+        save_user_sync(data)
         flash(f'Global edit for {user_id}: +{credits} credits – Synced to bot /profile!', 'success')
         log_audit('edit_user', session['user_id'], user_id, level=session['level'])
     except ValueError:
@@ -1543,12 +1964,106 @@ def admin_edit_user():
         print(f"Edit user error: {e}")
     return redirect(url_for('dashboard'))
 
+@app.route('/admin/bulk', methods=['POST'])
+@access_required('admin')
+def admin_bulk():
+    # Accepts a CSV upload/paste (user_id,op,value) or JSON {"ops": [{"user_id", "op", "value"}]}
+    wants_json = request.is_json
+    try:
+        if request.is_json:
+            rows = (request.get_json(silent=True) or {}).get('ops', [])
+        else:
+            upload = request.files.get('file')
+            text = upload.read().decode('utf-8-sig') if upload and upload.filename else request.form.get('csv', '')
+            rows = csv.DictReader(io.StringIO(text.strip()), fieldnames=None)
+        ops, errors = parse_bulk_ops(rows)
+        if errors or not ops:
+            errors = errors or ['Empty batch – Expected header user_id,op,value.']
+            if wants_json:
+                return jsonify({'error': 'Validation failed', 'errors': errors[:50]}), 400
+            flash(f'Bulk batch rejected ({len(errors)} errors): ' + ' | '.join(errors[:5]), 'error')
+            return redirect(url_for('dashboard'))
+        result = apply_bulk_ops_sync(ops)
+        summary = ', '.join(f'{op}={n}' for op, n in result['ops'].items() if n)
+        log_audit(f"bulk_ops ({result['rows']} rows, {result['users']} users: {summary})", session['user_id'], level=session['level'])
+        if wants_json:
+            return jsonify(result)
+        flash(f"Bulk applied: {result['rows']} ops for {result['users']} users ({summary}) in {result['seconds']}s – {result['rows_per_sec']} rows/s!", 'success')
+    except Exception as e:
+        print(f"Bulk route error: {e}")
+        if wants_json:
+            return jsonify({'error': str(e)}), 500
+        flash(f'Bulk error: {str(e)} – Check logs.', 'error')
+    return redirect(url_for('dashboard'))
+
+# Backups (Owner – Online snapshot runs in a background thread, bot keeps writing)
+BACKUP_STATE = {'running': False, 'last': None, 'error': None}
+BACKUP_LOCK = threading.Lock()
+
+def run_backup_job(issuer_id: int, level: str):
+    try:
+        info = backup.create_snapshot(DB_FILE)
+        BACKUP_STATE.update(last=info, error=None)
+        log_audit(f"backup ({info['name']})", issuer_id, level=level)
+    except Exception as e:
+        BACKUP_STATE['error'] = str(e)
+        print(f"Backup job error: {e}")
+        traceback.print_exc()
+    finally:
+        BACKUP_STATE['running'] = False
+
+@app.route('/admin/backup', methods=['POST'])
+@access_required('owner')
+def admin_backup():
+    with BACKUP_LOCK:
+        if BACKUP_STATE['running']:
+            flash('Backup already running – Check status in a moment.', 'warning')
+            return redirect(url_for('dashboard'))
+        BACKUP_STATE['running'] = True
+    threading.Thread(target=run_backup_job, args=(session['user_id'], session['level']), daemon=True).start()
+    flash('Backup started – Online snapshot, bot keeps running! 💾', 'success')
+    return redirect(url_for('dashboard'))
+
+@app.route('/admin/restore', methods=['POST'])
+@access_required('owner')
+def admin_restore():
+    name = request.form.get('name', '').strip()
+    with BACKUP_LOCK:
+        if BACKUP_STATE['running']:
+            flash('Backup in progress – Restore after it finishes.', 'warning')
+            return redirect(url_for('dashboard'))
+        BACKUP_STATE['running'] = True  # No backup (or second restore) starts mid-restore
+    try:
+        info = backup.restore_snapshot(DB_FILE, name)
+        VIEW_CACHE.clear()
+        log_audit(f'restore ({name})', session['user_id'], level=session['level'])
+        flash(f"Restored {name} in {info['seconds']}s – Safety copy: {info['safety_snapshot']} ♻️", 'success')
+    except ValueError as e:
+        flash(f'Restore refused: {str(e)}', 'error')
+    except Exception as e:
+        flash(f'Restore error: {str(e)} – Check logs.', 'error')
+        print(f"Restore route error: {e}")
+    finally:
+        BACKUP_STATE['running'] = False
+    return redirect(url_for('dashboard'))
+
+@app.route('/api/backups')
+@login_required
+@access_required('owner')
+def api_backups():
+    return jsonify({'snapshots': backup.list_snapshots(), 'running': BACKUP_STATE['running'],
+                    'last': BACKUP_STATE['last'], 'error': BACKUP_STATE['error']})
+
 # API Routes (For JS Dynamic Loading – No Errors, JSON Defaults)
 @app.route('/api/profile/<int:user_id>')
 @login_required
 def api_profile(user_id):
     try:
-               data = get_user_data_sync(user_id)
+        data = get_user_data_sync(user_id)
+        if 'entities' in data:
+            data = data.to_dict()
+            data['entity_count'], data['total_power'] = len(data['entities']), data['entities'].total_power()
+            data['entities'] = data['entities'].stacks()
         return jsonify(data)
     except Exception as e:
         print(f"API profile error: {e}")
@@ -1562,10 +2077,10 @@ def api_guild_bans(guild_id):
         init_dashboard_db()
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
-        cursor.execute('SELECT user_id, reason, timestamp FROM bans WHERE guild_id = ?', (guild_id,))
+        cursor.execute('SELECT user_id, reason, banned_at FROM bans WHERE guild_id = ?', (guild_id,))
         rows = cursor.fetchall()
         conn.close()
-        bans = [{'user_id': r[0], 'reason': r[1], 'timestamp': r[2]} for r in rows]
+        bans = [{'user_id': r[0], 'reason': r[1], 'timestamp': epoch_iso(r[2])} for r in rows]
         return jsonify({'bans': bans, 'count': len(bans)})
     except Exception as e:
         print(f"API guild bans error: {e}")
@@ -1599,6 +2114,26 @@ def api_guild_stats(guild_id):
         print(f"API guild stats error: {e}")
         return jsonify({'error': 'Guild not found or DB error', 'labels': [], 'users': [], 'bans': []}), 200
 
+@app.route('/api/export/<dataset>')
+@login_required
+@access_required('admin')
+def api_export(dataset):
+    # /api/export/users?format=csv&min_credits=500 – Streams straight from the cursor
+    fmt = request.args.get('format', 'csv').lower()
+    if dataset not in EXPORTS or fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': f'Unknown export – Datasets: {", ".join(EXPORTS)}; formats: csv, ndjson'}), 400
+    try:
+        sql, params = build_export_query(dataset, request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid filter: {e}'}), 400
+    log_audit(f'export_{dataset}', session['user_id'], level=session['level'])
+    columns = EXPORTS[dataset]['columns']
+    batches = iter_export_rows(sql, params)
+    body = iter_export_csv(columns, batches) if fmt == 'csv' else iter_export_ndjson(columns, batches)
+    filename = f"nexusverse-{dataset}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return Response(stream_with_context(body), mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+                    headers={'Content-Disposition': f'attachment; filename={filename}', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/admins')
 @login_required
 @access_required('admin')
@@ -1617,7 +2152,7 @@ def api_audits():
     level = request.args.get('level', '')
     guild = request.args.get('guild', '')
     try:
-        logs = get_audit_logs_sync(50)  # More for API
+        logs = get_cached_view('audits:50', get_audit_logs_sync, 50)  # More for API
         if level:
             logs = [log for log in logs if log['level'] == level]
         if guild:
@@ -1627,6 +2162,15 @@ def api_audits():
         print(f"API audits error: {e}")
         return jsonify({'error': 'Load error', 'logs': []}), 200
 
+@app.route('/api/live')
+@login_required
+@access_required('mod')
+def api_live():
+    # Browser EventSource – initial snapshot, then only changed counters & new audit rows
+    q = LIVE_FEED.subscribe()
+    return Response(iter_live_events(q), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/admin/global-event', methods=['POST'])
 @access_required('admin')
 def admin_global_event():
@@ -1643,16 +2187,58 @@ def admin_global_event():
         print(f"Global event error: {e}")
     return redirect(url_for('dashboard'))
 
+# Asset Cache (Entity GIFs & CDN files served from disk – ETag is the content digest, 304 on revalidation)
+ASSETS = AssetCache()
+seed_from_bundle(ASSETS)
+ASSET_IMMUTABLE = 'public, max-age=31536000, immutable'
+ASSET_NAMED = 'public, max-age=86400'  # /cdn & /media names can be re-pointed (new pin, config reload)
+
+def send_asset(entry: dict, cache_control: str):
+    response = send_file(ASSETS.object_path(entry['digest']), mimetype=entry['content_type'], etag=entry['digest'], conditional=True)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def cached_asset(url: str, cache_control: str):
+    try:
+        entry = ASSETS.get(url)
+    except (OSError, ValueError) as e:
+        print(f"Asset fetch error ({url}): {e}")
+        return redirect(url)  # Origin still works while online – the next request retries the cache
+    return send_asset(entry, cache_control)
+
+@app.route('/assets/<digest>')
+def asset_by_digest(digest):
+    entry = ASSETS.by_digest(digest)
+    if entry is None:
+        return jsonify({'error': 'Unknown asset'}), 404
+    return send_asset(entry, ASSET_IMMUTABLE)
+
+@app.route('/cdn/<name>')
+def cdn_asset(name):
+    if name not in CDN_ASSETS:
+        return jsonify({'error': 'Unknown asset'}), 404
+    return cached_asset(CDN_ASSETS[name], ASSET_NAMED)
+
+@app.route('/media/<int:entity_id>')
+def entity_media(entity_id):
+    entity = CATALOG.get(entity_id)
+    if entity is None or not entity.image_url:
+        return jsonify({'error': 'Unknown entity'}), 404
+    return cached_asset(entity.image_url, ASSET_NAMED)
+
 # Health & Misc (No Errors)
 @app.route('/health')
 def health():
     try:
         return jsonify({
             'status': 'healthy',
-            'total_users': get_total_users_sync(),
-            'active_event': get_global_event_sync() or 'None',
-            'admins_count': len(get_admins_sync('admin')),
-            'mods_count': len(get_admins_sync('mod')),
+            'total_users': get_cached_view('total_users', get_total_users_sync),
+            'active_event': get_cached_view('event', get_global_event_sync) or 'None',
+            'admins_count': len([a for a in get_cached_view('admins', get_admins_sync) if a['level'] == 'admin']),
+            'mods_count': len([a for a in get_cached_view('admins', get_admins_sync) if a['level'] == 'mod']),
+            'cache': VIEW_CACHE.stats(),
+            'live_subscribers': LIVE_FEED.subscriber_count(),
+            'cached_assets': len(ASSETS.index),
             'db_file': DB_FILE,
             'hierarchy': 'Owner > Admin > Mod – Interlocked'
         })
@@ -1665,6 +2251,6 @@ if __name__ == '__main__':
     host = '0.0.0.0'
     print("🚀 Ultimate Best Dashboard Launching – Advanced Hierarchy, Per-Server, Interlocked with Bot!")
     print(f"Owner ID: {OWNER_ID} | Initial Admins: {ADMIN_IDS} | Secret Length: {len(app.secret_key)}")
-    print(f"DB: {DB_FILE} | Entities: {len(CONFIG['entities'])} Nostalgic | Levels: Owner 👑 > Admin ⭐ > Mod 🛡️")
+    print(f"DB: {DB_FILE} | Entities: {len(CATALOG)} Nostalgic | Levels: Owner 👑 > Admin ⭐ > Mod 🛡️")
     init_dashboard_db()  # Ensure hierarchy ready
     app.run(host=host, port=port, debug=False)  # Prod mode – Secure, no debug logs
\ No newline at end of file
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import heapq
+import time
+from typing import NamedTuple
+
+import aiosqlite
+
+from cache import AsyncTTLCache
+
+# Timed Effects (Shop boosts & server premium – One row per target/kind, expiry heap, cached modifiers)
+# Reads are lazy: a target's active effects are cached only until the soonest of them expires,
+# so a lookup never returns a lapsed boost even if the expiry task is behind. The min-heap just
+# deletes rows on time; stale heap entries (extended effects) are skipped by comparing expiries.
+EFFECT_KINDS = {
+    'power_boost': ('user', 'power'),        # kind -> (scope, modifier) – value: +x battle power
+    'catch_boost': ('user', 'catch'),        # value: +x catch success
+    'server_premium': ('guild', 'premium'),  # Premium perks for everyone in the guild
+}
+EFFECT_CACHE_TTL = 300.0
+EFFECT_MAX_SLEEP = 3600.0  # Expiry task re-checks at least this often
+
+EFFECTS_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS effects (
+        effect_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scope TEXT NOT NULL,
+        target_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        value REAL NOT NULL,
+        expires_at INTEGER NOT NULL,
+        UNIQUE (scope, target_id, kind)
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_effects_expires_at ON effects (expires_at)',
+)
+# Insert or extend – an active effect's duration stacks and the stronger value wins
+# (params: scope, target_id, kind, value, now + duration, now, duration)
+GRANT_SQL = ('INSERT INTO effects (scope, target_id, kind, value, expires_at) VALUES (?, ?, ?, ?, ?) '
+             'ON CONFLICT (scope, target_id, kind) DO UPDATE SET value = MAX(value, excluded.value), expires_at = MAX(expires_at, ?) + ? '
+             'RETURNING effect_id, expires_at')
+
+
+class Modifiers(NamedTuple):
+    power: float = 1.0      # Battle power multiplier
+    catch: float = 0.0      # Added to the catch success rate
+    premium: bool = False   # Server premium – premium perks without a personal subscription
+
+
+def combine(effects) -> Modifiers:
+    power, catch, premium = 1.0, 0.0, False
+    for kind, value in effects:
+        modifier = EFFECT_KINDS[kind][1]
+        if modifier == 'power':
+            power += value
+        elif modifier == 'catch':
+            catch += value
+        else:
+            premium = True
+    return Modifiers(power, catch, premium)
+
+
+class EffectEngine:
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.cache = AsyncTTLCache(EFFECT_CACHE_TTL)  # 'user:<id>' / 'guild:<id>' -> ((kind, value), ...)
+        self.heap = []                                # (expires_at, effect_id, scope, target_id)
+        self.expiries = {}                            # effect_id -> current expires_at (heap entries that differ are stale)
+        self.wakeup = asyncio.Event()
+        self.running = False
+
+    async def load(self):
+        async with aiosqlite.connect(self.db_file) as db:
+            for statement in EFFECTS_SCHEMA:
+                await db.execute(statement)
+            await db.commit()
+            cursor = await db.execute('SELECT effect_id, scope, target_id, expires_at FROM effects')
+            rows = await cursor.fetchall()
+        self.heap = [(expires_at, effect_id, scope, target_id) for effect_id, scope, target_id, expires_at in rows]
+        heapq.heapify(self.heap)
+        self.expiries = {effect_id: expires_at for effect_id, _, _, expires_at in rows}
+
+    async def grant(self, target_id: int, kind: str, value: float, duration: float) -> int:
+        # Buying an active effect again stacks the duration (and keeps the stronger value). Returns expires_at
+        scope = EFFECT_KINDS[kind][0]
+        now = int(time.time())
+        async with aiosqlite.connect(self.db_file) as db:
+            cursor = await db.execute(GRANT_SQL, (scope, target_id, kind, value, now + int(duration), now, int(duration)))
+            effect_id, expires_at = await cursor.fetchone()
+            await cursor.close()
+            await db.commit()
+        self.expiries[effect_id] = expires_at
+        heapq.heappush(self.heap, (expires_at, effect_id, scope, target_id))
+        self.cache.invalidate(f'{scope}:{target_id}')
+        self.wakeup.set()
+        return expires_at
+
+    async def reload(self):
+        # Another process (the dashboard) changed the table – rebuild the heap, drop cached modifiers
+        await self.load()
+        self.cache.clear()
+        self.wakeup.set()
+
+    async def active(self, scope: str, target_id: int) -> dict:
+        # kind -> (value, expires_at) for status displays (not cached)
+        async with aiosqlite.connect(self.db_file) as db:
+            cursor = await db.execute('SELECT kind, value, expires_at FROM effects WHERE scope = ? AND target_id = ? AND expires_at > ?',
+                                      (scope, target_id, int(time.time())))
+            return {kind: (value, expires_at) for kind, value, expires_at in await cursor.fetchall()}
+
+    async def modifiers(self, guild_id: int, *user_ids: int) -> list:
+        # One Modifiers per user (user effects + the guild's). Cache misses share a single query
+        keys = [f'user:{user_id}' for user_id in user_ids] + ([f'guild:{guild_id}'] if guild_id else [])
+        found = {key: self.cache.peek(key) for key in keys}
+        missing = [key for key, value in found.items() if value is None]
+        if missing:
+            found.update(await self._load(missing))
+        guild_effects = found.get(f'guild:{guild_id}', ()) if guild_id else ()
+        return [combine(found[f'user:{user_id}'] + guild_effects) for user_id in user_ids]
+
+    async def _load(self, keys: list) -> dict:
+        now = time.time()
+        targets = [key.split(':') for key in keys]
+        where = ' OR '.join('(scope = ? AND target_id = ?)' for _ in targets)
+        params = [p for scope, target_id in targets for p in (scope, int(target_id))]
+        async with aiosqlite.connect(self.db_file) as db:
+            cursor = await db.execute(f'SELECT scope, target_id, kind, value, expires_at FROM effects WHERE ({where}) AND expires_at > ?', params + [int(now)])
+            rows = await cursor.fetchall()
+        loaded = {key: [] for key in keys}
+        soonest = {}
+        for scope, target_id, kind, value, expires_at in rows:
+            key = f'{scope}:{target_id}'
+            loaded[key].append((kind, value))
+            soonest[key] = min(soonest.get(key, expires_at), expires_at)
+        for key, effects in loaded.items():
+            loaded[key] = tuple(effects)
+            # Cached only until the soonest effect lapses – expiry is exact without waiting on the task
+            ttl = min(EFFECT_CACHE_TTL, soonest[key] - now) if key in soonest else EFFECT_CACHE_TTL
+            self.cache.set(key, loaded[key], max(0.0, ttl))
+        return loaded
+
+    async def run(self):
+        self.running = True
+        try:
+            while self.running:
+                now = time.time()
+                expired = []
+                while self.heap and self.heap[0][0] <= now:
+                    expires_at, effect_id, scope, target_id = heapq.heappop(self.heap)
+                    if self.expiries.get(effect_id) == expires_at:
+                        del self.expiries[effect_id]
+                        expired.append((effect_id, scope, target_id))
+                if expired:
+                    try:
+                        await self._expire(expired, int(now))
+                    except Exception as e:
+                        print(f"Effect expiry error: {e}")
+                delay = min(EFFECT_MAX_SLEEP, self.heap[0][0] - time.time()) if self.heap else EFFECT_MAX_SLEEP
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=max(1.0, delay))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.running = False
+
+    async def _expire(self, expired: list, now: int):
+        # The expires_at guard keeps rows that were extended after the heap entry was pushed
+        async with aiosqlite.connect(self.db_file) as db:
+            await db.executemany('DELETE FROM effects WHERE effect_id = ? AND expires_at <= ?', [(effect_id, now) for effect_id, _, _ in expired])
+            await db.commit()
+        self.cache.invalidate(*{f'{scope}:{target_id}' for _, scope, target_id in expired})
+        print(f"⏱️ Expired {len(expired)} timed effects")
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+import json
+import sqlite3
+import sys
+import time
+from array import array
+from typing import NamedTuple
+
+# Counted Inventories (users.entity_counts – packed little-endian uint32 (entity_id, count) pairs)
+# A player with 800 Commons is one 8-byte pair, not 800 list items. Quantities live only in the
+# count map; entity_instances adds identity rows just for unique copies (INSTANCED_RARITIES).
+INSTANCED_RARITIES = ('Mythic',)
+MIGRATION_BATCH = 500
+INVENTORY_COLUMNS = (('entity_ids', 'BLOB'), ('entity_counts', 'BLOB'))
+ENTITY_INSTANCES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS entity_instances (
+        instance_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity_id INTEGER NOT NULL,
+        owner_id INTEGER NOT NULL,
+        acquired_at REAL NOT NULL
+    )
+'''
+ENTITY_INSTANCES_INDEX = 'CREATE INDEX IF NOT EXISTS idx_entity_instances_owner ON entity_instances (owner_id, entity_id)'
+
+def _pack(arr: array) -> bytes:
+    if sys.byteorder == 'big':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+def _unpack(typecode: str, blob) -> array:
+    arr = array(typecode)
+    if blob:
+        arr.frombytes(blob)
+        if sys.byteorder == 'big':
+            arr.byteswap()
+    return arr
+
+def encode_ids(ids) -> bytes:
+    return _pack(array('H', ids))
+
+def decode_ids(blob) -> array:
+    # Pre-count format (users.entity_ids – one uint16 per copy); read only for migration/fallback
+    return _unpack('H', blob)
+
+def encode_counts(counts: dict) -> bytes:
+    pairs = array('I')
+    for entity_id in sorted(counts):
+        if counts[entity_id] > 0:
+            pairs.extend((entity_id, counts[entity_id]))
+    return _pack(pairs)
+
+def decode_counts(blob) -> dict:
+    pairs = _unpack('I', blob)
+    return dict(zip(pairs[::2], pairs[1::2]))
+
+def encode_delta(delta: dict) -> bytes:
+    # Signed (entity_id, change) pairs for inv_merge – may be negative
+    pairs = array('i')
+    for entity_id, change in sorted(delta.items()):
+        if change:
+            pairs.extend((entity_id, change))
+    return _pack(pairs)
+
+def decode_delta(blob) -> dict:
+    pairs = _unpack('i', blob)
+    return dict(zip(pairs[::2], pairs[1::2]))
+
+# SQL Functions (Registered per connection – atomic count deltas without read-modify-write)
+def sql_inv_merge(counts_blob, delta_blob) -> bytes:
+    counts = decode_counts(counts_blob)
+    for entity_id, change in decode_delta(delta_blob).items():
+        counts[entity_id] = max(0, counts.get(entity_id, 0) + change)
+    return encode_counts(counts)
+
+def sql_inv_count(counts_blob, entity_id) -> int:
+    return decode_counts(counts_blob).get(entity_id, 0)
+
+def sql_inv_total(counts_blob) -> int:
+    return sum(_unpack('I', counts_blob)[1::2])
+
+SQL_FUNCTIONS = (('inv_merge', 2, sql_inv_merge), ('inv_count', 2, sql_inv_count), ('inv_total', 1, sql_inv_total))
+
+def register_inventory_functions(conn):
+    # sqlite3 connections; the bot awaits aiosqlite's create_function with the same table
+    for name, num_params, func in SQL_FUNCTIONS:
+        conn.create_function(name, num_params, func, deterministic=True)
+
+def ids_from_json(raw, catalog) -> tuple:
+    # Legacy users.entities (list of full entity dicts) -> (array of ids, unresolved count)
+    ids, lost = array('H'), 0
+    for item in json.loads(raw or '[]'):
+        entity = catalog.resolve(item) if isinstance(item, dict) else catalog.get(item) if isinstance(item, int) else None
+        if entity is None:
+            lost += 1
+        else:
+            ids.append(entity.id)
+    return ids, lost
+
+def _counts_of(ids) -> dict:
+    counts = {}
+    for entity_id in ids:
+        counts[entity_id] = counts.get(entity_id, 0) + 1
+    return counts
+
+
+class Inventory:
+    # Per-entity count map with a pending delta – saves apply only what changed via inv_merge
+    __slots__ = ('counts', 'catalog', 'pending')
+
+    def __init__(self, counts: dict = None, catalog=None):
+        self.counts = dict(counts or {})
+        self.catalog = catalog
+        self.pending = {}
+
+    @classmethod
+    def from_row(cls, counts_blob, ids_blob, legacy_json, catalog):
+        # Unmigrated rows fall back to the uint16 list, then to the JSON column
+        if counts_blob is not None:
+            return cls(decode_counts(counts_blob), catalog)
+        if ids_blob is not None:
+            return cls(_counts_of(decode_ids(ids_blob)), catalog)
+        return cls(_counts_of(ids_from_json(legacy_json, catalog)[0]), catalog)
+
+    @classmethod
+    def from_items(cls, items, catalog):
+        if isinstance(items, Inventory):
+            return items.copy()
+        inventory = cls(None, catalog)
+        inventory.extend(items)
+        return inventory
+
+    def _to_id(self, item) -> int:
+        if isinstance(item, int):
+            return item
+        entity = self.catalog.resolve(item) if isinstance(item, dict) else self.catalog.get(getattr(item, 'id', -1))
+        if entity is None:
+            raise ValueError(f'Unknown entity: {item!r}')
+        return entity.id
+
+    def _to_item(self, entity_id: int) -> dict:
+        entity = self.catalog.get(entity_id)
+        if entity is None:  # Removed from config.json – keep the count, show a placeholder
+            return {'id': entity_id, 'name': f'Unknown #{entity_id}', 'rarity': 'Common', 'emoji': '❔', 'power': 0, 'desc': '', 'image_url': ''}
+        return entity.to_dict()
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.counts)
+
+    def __contains__(self, item) -> bool:
+        return self.count_of(item) > 0
+
+    def __iter__(self):
+        return iter(self.stacks())
+
+    def __repr__(self) -> str:
+        return f'Inventory({len(self)} entities, {len(self.counts)} distinct)'
+
+    def count_of(self, item) -> int:
+        return self.counts.get(self._to_id(item), 0)
+
+    def add(self, item, n: int = 1):
+        entity_id = self._to_id(item)
+        self.counts[entity_id] = self.counts.get(entity_id, 0) + n
+        self.pending[entity_id] = self.pending.get(entity_id, 0) + n
+
+    def remove(self, item, n: int = 1) -> bool:
+        entity_id = self._to_id(item)
+        have = self.counts.get(entity_id, 0)
+        if have < n:
+            return False
+        if have == n:
+            del self.counts[entity_id]
+        else:
+            self.counts[entity_id] = have - n
+        self.pending[entity_id] = self.pending.get(entity_id, 0) - n
+        return True
+
+    # List-compatible spellings so existing catch/pull/shop code keeps working
+    def append(self, item):
+        self.add(item)
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def copy(self):
+        return Inventory(self.counts, self.catalog)
+
+    def mark_saved(self):
+        self.pending = {}
+
+    def distinct(self) -> int:
+        return len(self.counts)
+
+    def is_instanced(self, entity_id: int) -> bool:
+        entity = self.catalog.get(entity_id)
+        return entity is not None and entity.rarity in INSTANCED_RARITIES
+
+    def total_power(self) -> int:
+        powers, size = self.catalog.powers, len(self.catalog.powers)
+        return sum(powers[i] * n for i, n in self.counts.items() if i < size)
+
+    def stacks(self, limit: int = None) -> list:
+        # Entity dicts + 'count', strongest first (walks the catalog's power order, not the copies)
+        order = [i for i in self.catalog.ids_by_power if i in self.counts]
+        order += sorted(i for i in self.counts if self.catalog.get(i) is None)
+        return [{**self._to_item(i), 'count': self.counts[i]} for i in order[:limit]]
+
+    def top(self, k: int = 3) -> list:
+        return self.stacks(k)
+
+    def to_blob(self) -> bytes:
+        return encode_counts(self.counts)
+
+
+def inventory_blob(items, catalog) -> bytes:
+    return Inventory.from_items(items, catalog).to_blob()
+
+def inventory_statements(user_id: int, items, catalog) -> list:
+    # (sql, params) for saving users.entity_counts – shared by sqlite3 (dashboard) and aiosqlite (bot).
+    # An Inventory saves its pending delta atomically; a plain list replaces the whole map.
+    # users.entities is left alone – after migration it only holds JSON the catalog couldn't resolve
+    if not isinstance(items, Inventory):
+        return [('UPDATE users SET entity_counts = ?, entity_ids = NULL WHERE user_id = ?', (inventory_blob(items, catalog), user_id))]
+    if not items.pending:
+        return []
+    statements = [('UPDATE users SET entity_counts = inv_merge(entity_counts, ?), entity_ids = NULL WHERE user_id = ?',
+                   (encode_delta(items.pending), user_id))]
+    now = time.time()
+    for entity_id, change in items.pending.items():
+        if not items.is_instanced(entity_id):
+            continue
+        if change > 0:
+            statements += [('INSERT INTO entity_instances (entity_id, owner_id, acquired_at) VALUES (?, ?, ?)', (entity_id, user_id, now))] * change
+        elif change < 0:
+            statements.append(('DELETE FROM entity_instances WHERE instance_id IN (SELECT instance_id FROM entity_instances WHERE owner_id = ? AND entity_id = ? ORDER BY instance_id DESC LIMIT ?)',
+                               (user_id, entity_id, -change)))
+    return statements
+
+class TradeSide(NamedTuple):
+    # What one side hands over. Stacks are fungible (entity_id, n); unique copies are named by
+    # their stable instance_id, so a trade moves exactly the copies that were offered
+    user_id: int
+    stacks: tuple = ()                 # ((entity_id, n), ...)
+    instances: tuple = ()              # ((instance_id, entity_id), ...)
+    credits: int = 0
+
+    @classmethod
+    def from_payload(cls, payload: dict):
+        return cls(payload['user_id'], tuple(map(tuple, payload['stacks'])), tuple(map(tuple, payload['instances'])), payload['credits'])
+
+    def delta(self) -> dict:
+        delta = dict(self.stacks)
+        for _, entity_id in self.instances:
+            delta[entity_id] = delta.get(entity_id, 0) + 1
+        return delta
+
+    def is_empty(self) -> bool:
+        return not (self.stacks or self.instances or self.credits)
+
+
+def parse_trade_items(text: str, catalog) -> tuple:
+    # "Kirby x2, Pac-Man, #42" -> (((entity_id, n), ...), (instance_id, ...)); raises ValueError
+    stacks, instance_ids = {}, []
+    for token in filter(None, (t.strip() for t in (text or '').split(','))):
+        if token.startswith('#') and token[1:].isdigit():
+            instance_ids.append(int(token[1:]))
+            continue
+        name, n = token, 1
+        head, sep, tail = token.rpartition(' x')
+        if sep and tail.isdigit():
+            name, n = head, int(tail)
+        entity = catalog.find(name)
+        if entity is None:
+            raise ValueError(f'Unknown entity "{name}"')
+        if n < 1:
+            raise ValueError(f'Invalid amount for {entity.name}')
+        stacks[entity.id] = stacks.get(entity.id, 0) + n
+    return tuple(stacks.items()), tuple(instance_ids)
+
+def trade_statements(a: TradeSide, b: TradeSide) -> list:
+    # (sql, params, expected_rowcount) for one transaction. Each side's debit is a single guarded
+    # UPDATE (credits + every count) and its instance moves must match every offered id – any
+    # statement with an expected rowcount that misses means roll back. Only the two users' rows
+    # and the moved instance rows are written
+    statements = [('INSERT OR IGNORE INTO users (user_id, credits, level) VALUES (?, 100, 1)', (side.user_id,), None) for side in (a, b)]
+    for giver, taker in ((a, b), (b, a)):
+        delta = giver.delta()
+        if delta or giver.credits:
+            guards = ''.join(' AND inv_count(entity_counts, ?) >= ?' for _ in delta)
+            params = [encode_delta({i: -n for i, n in delta.items()}), giver.credits, giver.user_id, giver.credits]
+            params += [p for item in delta.items() for p in item]
+            statements.append((f'UPDATE users SET entity_counts = inv_merge(entity_counts, ?), credits = credits - ? WHERE user_id = ? AND credits >= ?{guards}',
+                               tuple(params), 1))
+        if giver.instances:
+            ids = [instance_id for instance_id, _ in giver.instances]
+            statements.append((f"UPDATE entity_instances SET owner_id = ? WHERE owner_id = ? AND instance_id IN ({', '.join('?' * len(ids))})",
+                               (taker.user_id, giver.user_id, *ids), len(ids)))
+    for giver, taker in ((a, b), (b, a)):
+        delta = giver.delta()
+        if delta or giver.credits:
+            statements.append(('UPDATE users SET entity_counts = inv_merge(entity_counts, ?), credits = credits + ? WHERE user_id = ?',
+                               (encode_delta(delta), giver.credits, taker.user_id), None))
+    return statements
+
+def migrate_inventories_sync(db_file: str, catalog, batch: int = MIGRATION_BATCH) -> dict:
+    # Idempotent: adds the inventory columns/tables if missing and converts rows whose entity_counts
+    # is still NULL (from the uint16 list or legacy JSON). Unique copies get their instance rows.
+    # Rows with JSON entries the catalog can't resolve keep that JSON so nothing is lost silently.
+    conn = sqlite3.connect(db_file, timeout=30)
+    migrated = kept_legacy = 0
+    try:
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+        with conn:
+            for name, kind in INVENTORY_COLUMNS:
+                if name not in columns:
+                    conn.execute(f'ALTER TABLE users ADD COLUMN {name} {kind}')
+            conn.execute(ENTITY_INSTANCES_SCHEMA)
+            conn.execute(ENTITY_INSTANCES_INDEX)
+        instanced = {e.id for e in catalog if e.rarity in INSTANCED_RARITIES}
+        last_user = None
+        while True:
+            # Write lock before reading the batch – bot & dashboard may both migrate at startup
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('SELECT user_id, entity_ids, entities FROM users WHERE entity_counts IS NULL AND (? IS NULL OR user_id > ?) ORDER BY user_id LIMIT ?',
+                                (last_user, last_user, batch)).fetchall()
+            if not rows:
+                conn.rollback()
+                break
+            updates, instances, now = [], [], time.time()
+            for user_id, ids_blob, raw in rows:
+                lost = 0
+                if ids_blob is not None:
+                    # Already converted to the uint16 list – any JSON still in entities is what that
+                    # step couldn't resolve, so it's carried over as-is
+                    ids = decode_ids(ids_blob)
+                    lost = int(raw is not None)
+                else:
+                    try:
+                        ids, lost = ids_from_json(raw, catalog)
+                    except ValueError:
+                        ids, lost = array('H'), 1
+                kept_legacy += bool(lost)
+                counts = _counts_of(ids)
+                updates.append((encode_counts(counts), raw if lost else None, user_id))
+                instances += [(entity_id, user_id, now) for entity_id in ids if entity_id in instanced]
+            with conn:
+                conn.executemany('UPDATE users SET entity_counts = ?, entity_ids = NULL, entities = ? WHERE user_id = ?', updates)
+                conn.executemany('INSERT INTO entity_instances (entity_id, owner_id, acquired_at) VALUES (?, ?, ?)', instances)
+            migrated += len(rows)
+            last_user = rows[-1][0]
+    finally:
+        conn.close()
+    if migrated:
+        print(f"📦 Migrated {migrated} inventories to counted storage ({kept_legacy} kept legacy JSON for unknown entities)")
+    return {'migrated': migrated, 'kept_legacy': kept_legacy}
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import json
+import queue
+import threading
+
+# Live Feed (One Server-Side Computation, Fanned Out to Every Connected Browser)
+# A single poller thread recomputes the snapshot while anyone is subscribed, and
+# publishes only the fields that changed. Writers can poke() for an immediate tick.
+class LiveFeed:
+    def __init__(self, compute, interval: float = 2.0, max_queue: int = 256):
+        self.compute = compute          # compute(state) -> (counters dict, list of (event, data) extras)
+        self.interval = interval
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._counters = {}
+        self.state = {}                 # Scratch space for compute (e.g. last audit id seen)
+
+    def subscribe(self) -> queue.Queue:
+        q = queue.Queue(self.max_queue)
+        with self._lock:
+            self._subscribers.add(q)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def poke(self):
+        self._wake.set()
+
+    def publish(self, event: str, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                # Slow browser – drop its oldest message rather than block everyone else
+                try:
+                    q.get_nowait()
+                    q.put_nowait((event, data))
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self.subscriber_count():
+                continue
+            try:
+                counters, extras = self.compute(self.state)
+            except Exception as e:
+                print(f"Live feed compute error: {e}")
+                continue
+            with self._lock:
+                delta = {k: v for k, v in counters.items() if self._counters.get(k) != v}
+                self._counters.update(counters)
+            if delta:
+                self.publish('counters', delta)
+            for event, data in extras:
+                self.publish(event, data)
+
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
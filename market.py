@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import heapq
+import time
+
+import aiosqlite
+
+from inventory import encode_delta
+
+# Marketplace (Price-time priority – Escrowed listings, heap order book, partial index in SQLite)
+# Listing moves the copy out of the seller's inventory (unique copies go to MARKET_ESCROW), so a
+# sale can never fail on the seller's side. Each entity has a min-heap of (price, listing_id);
+# cancelled/sold listings leave the `open` map and their heap entries are skipped lazily, with a
+# rebuild once stale entries outnumber live ones. The DB's guarded UPDATEs stay the authority.
+MARKET_ESCROW = 0               # entity_instances.owner_id while a unique copy is listed
+MAX_LISTING_QUANTITY = 10
+BOOK_DEPTH = 10
+
+MARKET_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS listings (
+        listing_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        seller_id INTEGER NOT NULL,
+        entity_id INTEGER NOT NULL,
+        instance_id INTEGER,
+        price INTEGER NOT NULL,
+        listed_at REAL NOT NULL,
+        status TEXT NOT NULL DEFAULT 'open',
+        buyer_id INTEGER,
+        closed_at REAL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_listings_book ON listings (entity_id, price, listing_id) WHERE status = 'open'",
+    "CREATE INDEX IF NOT EXISTS idx_listings_seller ON listings (seller_id) WHERE status = 'open'",
+)
+
+
+class OrderBook:
+    def __init__(self):
+        self.heaps = {}        # entity_id -> [(price, listing_id)]
+        self.open = {}         # listing_id -> (entity_id, price, seller_id)
+        self.stale = 0
+
+    def __len__(self) -> int:
+        return len(self.open)
+
+    def add(self, listing_id: int, entity_id: int, price: int, seller_id: int):
+        self.open[listing_id] = (entity_id, price, seller_id)
+        heapq.heappush(self.heaps.setdefault(entity_id, []), (price, listing_id))
+
+    def remove(self, listing_id: int):
+        if self.open.pop(listing_id, None) is not None:
+            self.stale += 1
+            if self.stale > len(self.open):
+                self._rebuild()
+
+    def best(self, entity_id: int, exclude_seller: int = None):
+        # (listing_id, price) of the cheapest, oldest open listing not by exclude_seller – or None
+        heap = self.heaps.get(entity_id)
+        skipped, found = [], None
+        while heap:
+            price, listing_id = heap[0]
+            listing = self.open.get(listing_id)
+            if listing is None:
+                heapq.heappop(heap)
+                self.stale -= 1
+                continue
+            if listing[2] == exclude_seller:
+                skipped.append(heapq.heappop(heap))
+                continue
+            found = (listing_id, price)
+            break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        if heap is not None and not heap:
+            del self.heaps[entity_id]
+        return found
+
+    def _rebuild(self):
+        heaps = {}
+        for listing_id, (entity_id, price, _) in self.open.items():
+            heaps.setdefault(entity_id, []).append((price, listing_id))
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        self.heaps, self.stale = heaps, 0
+
+
+class Market:
+    def __init__(self, db_file: str, register_functions):
+        self.db_file = db_file
+        self.register_functions = register_functions
+        self.book = OrderBook()
+
+    async def load(self):
+        async with aiosqlite.connect(self.db_file) as db:
+            for statement in MARKET_SCHEMA:
+                await db.execute(statement)
+            await db.commit()
+            cursor = await db.execute("SELECT listing_id, entity_id, price, seller_id FROM listings WHERE status = 'open'")
+            book = OrderBook()  # Fresh on every (re)connect – no duplicate heap entries
+            for listing_id, entity_id, price, seller_id in await cursor.fetchall():
+                book.add(listing_id, entity_id, price, seller_id)
+        self.book = book
+
+    async def sell(self, seller_id: int, entity_id: int, price: int, quantity: int, instanced: bool) -> list:
+        # Escrows `quantity` copies and opens one listing per copy. Returns the listing ids ([] = not owned)
+        now = time.time()
+        async with aiosqlite.connect(self.db_file) as db:
+            await self.register_functions(db)
+            cursor = await db.execute('UPDATE users SET entity_counts = inv_merge(entity_counts, ?) WHERE user_id = ? AND inv_count(entity_counts, ?) >= ?',
+                                      (encode_delta({entity_id: -quantity}), seller_id, entity_id, quantity))
+            if cursor.rowcount == 0:
+                await db.rollback()
+                return []
+            instance_ids = [None] * quantity
+            if instanced:
+                cursor = await db.execute('UPDATE entity_instances SET owner_id = ? WHERE instance_id IN (SELECT instance_id FROM entity_instances WHERE owner_id = ? AND entity_id = ? ORDER BY instance_id LIMIT ?) RETURNING instance_id',
+                                          (MARKET_ESCROW, seller_id, entity_id, quantity))
+                instance_ids = [row[0] for row in await cursor.fetchall()]
+                if len(instance_ids) != quantity:
+                    await db.rollback()
+                    return []
+            listing_ids = []
+            for escrowed in instance_ids:
+                cursor = await db.execute('INSERT INTO listings (seller_id, entity_id, instance_id, price, listed_at) VALUES (?, ?, ?, ?, ?)',
+                                          (seller_id, entity_id, escrowed, price, now))
+                listing_ids.append(cursor.lastrowid)
+            await db.commit()
+        for listing_id in listing_ids:
+            self.book.add(listing_id, entity_id, price, seller_id)
+        return listing_ids
+
+    async def cancel(self, listing_id: int, seller_id: int):
+        # Returns the listing's entity_id once it's back in the seller's inventory, or None
+        async with aiosqlite.connect(self.db_file) as db:
+            await self.register_functions(db)
+            cursor = await db.execute("UPDATE listings SET status = 'cancelled', closed_at = ? WHERE listing_id = ? AND seller_id = ? AND status = 'open' RETURNING entity_id, instance_id",
+                                      (time.time(), listing_id, seller_id))
+            row = await cursor.fetchone()
+            await cursor.close()
+            if row is None:
+                await db.rollback()
+                return None
+            entity_id, instance_id = row
+            await db.execute('UPDATE users SET entity_counts = inv_merge(entity_counts, ?) WHERE user_id = ?', (encode_delta({entity_id: 1}), seller_id))
+            if instance_id is not None:
+                await db.execute('UPDATE entity_instances SET owner_id = ? WHERE instance_id = ?', (seller_id, instance_id))
+            await db.commit()
+        self.book.remove(listing_id)
+        return entity_id
+
+    async def buy(self, buyer_id: int, entity_id: int, max_price: int = None):
+        # Takes the best listing; a listing another process closed meanwhile is dropped and the next
+        # one tried. Returns (status, listing) – status 'ok' | 'none' | 'price' | 'credits'
+        while True:
+            best = self.book.best(entity_id, exclude_seller=buyer_id)
+            if best is None:
+                return 'none', None
+            listing_id, price = best
+            if max_price is not None and price > max_price:
+                return 'price', {'price': price}
+            status, listing = await self._buy(buyer_id, listing_id)
+            if status != 'gone':
+                return status, listing
+            self.book.remove(listing_id)
+
+    async def _buy(self, buyer_id: int, listing_id: int):
+        now = time.time()
+        async with aiosqlite.connect(self.db_file) as db:
+            await self.register_functions(db)
+            cursor = await db.execute("UPDATE listings SET status = 'sold', buyer_id = ?, closed_at = ? WHERE listing_id = ? AND status = 'open' RETURNING seller_id, entity_id, instance_id, price",
+                                      (buyer_id, now, listing_id))
+            row = await cursor.fetchone()
+            await cursor.close()
+            if row is None:
+                await db.rollback()
+                return 'gone', None
+            seller_id, entity_id, instance_id, price = row
+            await db.execute('INSERT OR IGNORE INTO users (user_id, credits, level) VALUES (?, 100, 1)', (buyer_id,))
+            cursor = await db.execute('UPDATE users SET credits = credits - ?, entity_counts = inv_merge(entity_counts, ?) WHERE user_id = ? AND credits >= ?',
+                                      (price, encode_delta({entity_id: 1}), buyer_id, price))
+            if cursor.rowcount == 0:
+                await db.rollback()
+                return 'credits', {'price': price}
+            await db.execute('UPDATE users SET credits = credits + ? WHERE user_id = ?', (price, seller_id))
+            if instance_id is not None:
+                await db.execute('UPDATE entity_instances SET owner_id = ? WHERE instance_id = ?', (buyer_id, instance_id))
+            await db.commit()
+        self.book.remove(listing_id)
+        return 'ok', {'listing_id': listing_id, 'seller_id': seller_id, 'entity_id': entity_id, 'instance_id': instance_id, 'price': price}
+
+    async def depth(self, entity_id: int, limit: int = BOOK_DEPTH) -> list:
+        # Best asks straight off the partial index: (price, listings at that price)
+        async with aiosqlite.connect(self.db_file) as db:
+            cursor = await db.execute("SELECT price, COUNT(*) FROM (SELECT price FROM listings WHERE status = 'open' AND entity_id = ? ORDER BY price, listing_id LIMIT 100) GROUP BY price ORDER BY price LIMIT ?",
+                                      (entity_id, limit))
+            return await cursor.fetchall()
+
+    async def listings_of(self, seller_id: int) -> list:
+        async with aiosqlite.connect(self.db_file) as db:
+            cursor = await db.execute("SELECT listing_id, entity_id, instance_id, price FROM listings WHERE status = 'open' AND seller_id = ? ORDER BY listing_id", (seller_id,))
+            return await cursor.fetchall()
@@ -3,11 +3,30 @@ import discord
 from discord.ext import commands
 import discord.app_commands as app_commands
 import aiosqlite
-import json
 import random
 from datetime import datetime, timedelta
 import asyncio
+import io
 import os
+import time
+from typing import NamedTuple
+from announce import Announcer
+from autocomplete import EntityIndex
+from battle import TEAM_SIZE, auto_team, battle_boost, chosen_team, simulate
+from cache import AsyncTTLCache
+from cards import AVATAR_SIZE, COLLECTION_LIMIT, CardRenderer, CardStack, ProfileCard
+from catalog import CONFIG_POLL_SECONDS, ConfigSource, roll_rarity
+from changes import ACTIVITY_KINDS, CHANGE_INSERT_SQL, CHANGE_LOG_INDEX, CHANGE_LOG_SCHEMA, ChangeListener
+from effects import EffectEngine
+from inventory import (ENTITY_INSTANCES_INDEX, ENTITY_INSTANCES_SCHEMA, INSTANCED_RARITIES, SQL_FUNCTIONS, Inventory, TradeSide, inventory_statements,
+                       migrate_inventories_sync, parse_trade_items, trade_statements)
+from records import GUILD_COLUMNS, GUILD_FIELDS, USER_COLUMNS, USER_FIELDS, GuildRecord, UserRecord, select_columns
+from market import BOOK_DEPTH, MAX_LISTING_QUANTITY, Market
+from pending import PENDING_PREFIX, PENDING_SCHEMA, create_pending, parse_custom_id, pending_custom_id, take_pending
+from quests import QUESTS, claim_quests, load_progress, migrate_quests_sync, next_rollover, quest_increments, reset_quests_sync
+from spawns import CLAIM_PREFIX, SpawnScheduler
+from timestamps import SWEEP_MAX_SLEEP, epoch_fields, migrate_timestamps_sync, sweep_premium_sync
+from tournaments import TICK_SECONDS, TournamentManager
 
 # Bot Setup
 intents = discord.Intents.default()
@@ -26,15 +45,12 @@ PREMIUM_GOLD = 0xFFD700
 OFFICIAL_GLOW = 0x8B00FF
 EPIC_PURPLE = 0x8B00FF
 
-CONFIG = {
-    'entities': [
-        {'name': 'Pac-Man Ghost', 'rarity': 'Common', 'emoji': '👻', 'power': 10, 'desc': 'Classic maze chaser.', 'image_url': 'https://media.giphy.com/media/26ufnwz3wDUfck3m0/giphy.gif'},
-        {'name': 'SpongeBob SquarePants', 'rarity': 'Rare', 'emoji': '🧽', 'power': 50, 'desc': 'Bikini Bottom hero.', 'image_url': 'https://media.giphy.com/media/3o7btPCcdNniyf0ArS/giphy.gif'},
-        {'name': 'Shrek Ogre', 'rarity': 'Epic', 'emoji': '🧅', 'power': 100, 'desc': 'Swamp king.', 'image_url': 'https://media.giphy.com/media/l0HlRnAWXxn0MhKLK/giphy.gif'},
-        {'name': 'Super Mario', 'rarity': 'Legendary', 'emoji': '🍄', 'power': 200, 'desc': 'Plumber legend.', 'image_url': 'https://media.giphy.com/media/26ufktO5bj6aKk9z2/giphy.gif'},
-        {'name': 'Pikachu', 'rarity': 'Mythic', 'emoji': '⚡', 'power': 500, 'desc': 'Electric mouse master.', 'image_url': 'https://media.giphy.com/media/3o7btMYv2bT4nX4X4k/giphy.gif'}
-    ]
-}
+# Entities, costs & drop rates come from config.json (same IDs in bot & dashboard) – hot-reloaded,
+# so handlers read GAME/CATALOG at call time instead of copying values out
+CONFIG_SOURCE = ConfigSource()
+GAME = CONFIG_SOURCE.current
+CONFIG = GAME.raw
+CATALOG = GAME.catalog
 
 # DB Helpers (Async for Bot)
 async def init_db():
@@ -46,10 +62,13 @@ async def init_db():
                 entities TEXT DEFAULT '[]',
                 level INTEGER DEFAULT 1,
                 pity INTEGER DEFAULT 0,
-                premium_until TEXT DEFAULT NULL,
+                premium_until_ts INTEGER DEFAULT NULL,
                 streak INTEGER DEFAULT 0,
-                last_daily TEXT DEFAULT NULL,
-                is_official_member BOOLEAN DEFAULT 0
+                last_daily_ts INTEGER DEFAULT NULL,
+                is_official_member BOOLEAN DEFAULT 0,
+                entity_ids BLOB,
+                entity_counts BLOB,
+                is_premium INTEGER DEFAULT 0
             )
         ''')
         await db.execute('''
@@ -57,14 +76,15 @@ async def init_db():
                 guild_id INTEGER PRIMARY KEY,
                 is_official BOOLEAN DEFAULT 0,
                 spawn_multiplier REAL DEFAULT 1.0,
-                premium_until TEXT DEFAULT NULL
+                premium_until_ts INTEGER DEFAULT NULL,
+                is_premium INTEGER DEFAULT 0
             )
         ''')
         await db.execute('''
             CREATE TABLE IF NOT EXISTS bans (
                 user_id INTEGER PRIMARY KEY,
                 reason TEXT,
-                timestamp TEXT,
+                banned_at INTEGER,
                 guild_id INTEGER DEFAULT NULL
             )
         ''')
@@ -72,63 +92,293 @@ async def init_db():
             CREATE TABLE IF NOT EXISTS global_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 event_type TEXT,
-                start_time TEXT,
-                end_time TEXT
+                start_ts INTEGER,
+                end_ts INTEGER
             )
         ''')
+        await db.execute(CHANGE_LOG_SCHEMA)
+        await db.execute(CHANGE_LOG_INDEX)
+        await db.execute(ENTITY_INSTANCES_SCHEMA)
+        await db.execute(ENTITY_INSTANCES_INDEX)
+        for statement in PENDING_SCHEMA:
+            await db.execute(statement)
         await db.commit()
-        print("✅ Bot DB initialized – Attractive & Ready!")
+    await asyncio.to_thread(migrate_inventories_sync, DB_FILE, CATALOG)  # Legacy inventories -> counted storage
+    await asyncio.to_thread(migrate_timestamps_sync, DB_FILE)  # ISO strings -> indexed epoch integers
+    await asyncio.to_thread(migrate_quests_sync, DB_FILE)      # Daily/weekly quest counters on users
+    print("✅ Bot DB initialized – Attractive & Ready!")
 
+# Data Cache (Long TTLs are safe – dashboard writes arrive via the change feed, bot writes invalidate locally)
+DATA_CACHE = AsyncTTLCache()
+CACHE_TTLS = {'user': 60, 'guild': 600, 'ban': 600, 'event': 30}
+entity_index = EntityIndex(CATALOG)  # Owned-entity autocomplete – bot writes apply their deltas, loads re-index
+
+def on_db_change(kind: str, key):
+    if kind == 'user':
+        DATA_CACHE.invalidate(f'user:{key}')
+        entity_index.drop(key)  # Dashboard edit – re-indexed on the next load
+    elif kind == 'guild':
+        DATA_CACHE.invalidate(f'guild:{key}')
+    elif kind == 'ban':
+        DATA_CACHE.invalidate_prefix(f'ban:{key}:')
+    elif kind == 'event':
+        DATA_CACHE.invalidate('event')
+    elif kind == 'effect':
+        asyncio.ensure_future(effects.reload())  # Dashboard grant – key is the effect_id
+    elif kind == 'all':
+        DATA_CACHE.clear()
+        entity_index.clear()
+        asyncio.ensure_future(effects.reload())
+
+change_listener = ChangeListener(DB_FILE, on_db_change)
+
+# User Loaders (Projections – Commands fetch only the columns they read; records live in records.py)
 async def get_user_data(user_id: int):
+    data = await DATA_CACHE.get_or_load(f'user:{user_id}', lambda: load_user_data(user_id), CACHE_TTLS['user'])
+    return data.copy()  # Handlers mutate – never hand out the cached copy
+
+async def load_user_data(user_id: int):
+    return await load_user_fields(user_id, USER_FIELDS)
+
+async def get_user_fields(user_id: int, *fields: str) -> UserRecord:
+    # e.g. get_user_fields(uid, 'credits') – a credits-only command never reads the inventory blob
+    cached = DATA_CACHE.peek(f'user:{user_id}')
+    if cached is not None:
+        return cached.copy()
+    return await load_user_fields(user_id, fields)
+
+async def load_user_fields(user_id: int, fields) -> UserRecord:
+    # is_premium is a stored flag – the premium sweeper clears it at expiry
     async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
+        cursor = await db.execute(f'SELECT {select_columns(USER_COLUMNS, fields)} FROM users WHERE user_id = ?', (user_id,))
         row = await cursor.fetchone()
-        if row:
-            keys = ['user_id', 'credits', 'entities', 'level', 'pity', 'premium_until', 'streak', 'last_daily', 'is_official_member']
-            data = dict(zip(keys, row))
-            data['entities'] = json.loads(data['entities'] or '[]')
-            data['is_premium'] = bool(data['premium_until'] and datetime.fromisoformat(data['premium_until']) > datetime.now())
-            return data
-        return {'user_id': user_id, 'credits': 100, 'entities': [], 'level': 1, 'is_premium': False, 'streak': 0, 'last_daily': None, 'is_official_member': False}
-
-async def update_user_data(user_id: int, **kwargs):
+    return index_inventory(UserRecord.from_row(user_id, fields, row, CATALOG))
+
+def index_inventory(record: UserRecord) -> UserRecord:
+    # Loads feed the autocomplete index once; after that the writes keep it current
+    if 'entities' in record and record['user_id'] not in entity_index:
+        entity_index.set(record['user_id'], record['entities'].counts)
+    return record
+
+async def register_db_functions(db):
+    for name, num_params, func in SQL_FUNCTIONS:
+        await db.create_function(name, num_params, func, deterministic=True)
+
+async def update_user_data(user_id: int, activity: str = None, deltas: dict = None, **kwargs):
+    entities = kwargs.pop('entities', None)
+    increments = quest_increments(activity)  # Quest counters ride the same UPDATE
     async with aiosqlite.connect(DB_FILE) as db:
-        set_parts = ', '.join([f"{k} = ?" for k in kwargs])
-        values = []
-        for k, v in kwargs.items():
-            if k == 'entities':
-                values.append(json.dumps(v))
-            elif k == 'premium_until':
-                values.append(v.isoformat() if v else None)
-            else:
-                values.append(v)
-        values.append(user_id)
-        await db.execute(f'UPDATE users SET {set_parts} WHERE user_id = ?', values)
-        if db.total_changes == 0:
-            await db.execute('INSERT INTO users (user_id, credits, level) VALUES (?, 100, 1)', (user_id,))
+        await register_db_functions(db)
+        await db.execute('INSERT OR IGNORE INTO users (user_id, credits, level) VALUES (?, 100, 1)', (user_id,))
+        if kwargs or deltas or increments:
+            fields = epoch_fields(kwargs)  # premium_until/last_daily -> epoch columns (+ is_premium)
+            deltas = deltas or {}
+            set_parts = ', '.join([f"{k} = ?" for k in fields] + [f"{k} = {k} + ?" for k in deltas] + ([increments] if increments else []))
+            values = list(fields.values()) + list(deltas.values()) + [user_id]
+            await db.execute(f'UPDATE users SET {set_parts} WHERE user_id = ?', values)
+        if entities is not None:
+            # Counted inventory – only the pending per-entity deltas are written (inv_merge)
+            for sql, params in inventory_statements(user_id, entities, CATALOG):
+                await db.execute(sql, params)
+        if activity in ACTIVITY_KINDS:
+            # 'catch' / 'pull' rows feed the dashboard's per-minute live counters
+            await db.execute(CHANGE_INSERT_SQL, (activity, user_id, time.time()))
         await db.commit()
+    if 'premium_until' in kwargs:
+        premium_wake.set()
+    if isinstance(entities, Inventory):
+        entity_index.apply(user_id, entities.pending)
+        entities.mark_saved()
+    DATA_CACHE.invalidate(f'user:{user_id}')
 
-async def get_guild_data(guild_id: int):
+async def debit_credits(user_id: int, amount: int):
+    # Guarded spend – the new balance, or None if the user can't afford it (nothing written)
     async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute('SELECT * FROM guilds WHERE guild_id = ?', (guild_id,))
+        await db.execute('INSERT OR IGNORE INTO users (user_id, credits, level) VALUES (?, 100, 1)', (user_id,))  # New users start at 100
+        cursor = await db.execute('UPDATE users SET credits = credits - ? WHERE user_id = ? AND credits >= ? RETURNING credits', (amount, user_id, amount))
         row = await cursor.fetchone()
-        if row:
-            keys = ['guild_id', 'is_official', 'spawn_multiplier', 'premium_until']
-            data = dict(zip(keys, row))
-            data['is_premium'] = bool(data['premium_until'] and datetime.fromisoformat(data['premium_until']) > datetime.now())
-            return data
-        return {'guild_id': guild_id, 'is_official': False, 'spawn_multiplier': 1.0, 'is_premium': False}
+        await db.commit()
+    DATA_CACHE.invalidate(f'user:{user_id}')
+    return None if row is None else row[0]
+
+async def save_user(data: UserRecord, activity: str = None):
+    # Writes only what the handler changed (dirty fields, counter deltas + the inventory's pending delta)
+    changes, deltas = data.changes(), data.deltas()
+    if changes or deltas or activity:
+        await update_user_data(data['user_id'], activity, deltas, **changes)
+    data.mark_saved()
+
+async def load_trade_side(user_id: int, inventory: Inventory, items: str, credits: int = 0) -> TradeSide:
+    # Names resolve to stacks; unique copies are pinned to instance ids now, so confirming later
+    # moves exactly what was shown. Raises ValueError with a user-facing message
+    stacks, instance_ids = parse_trade_items(items, CATALOG)
+    fungible, instances, wanted = [], [], len(instance_ids)
+    async with aiosqlite.connect(DB_FILE) as db:
+        if instance_ids:
+            cursor = await db.execute(f"SELECT instance_id, entity_id FROM entity_instances WHERE owner_id = ? AND instance_id IN ({', '.join('?' * len(instance_ids))})",
+                                      (user_id, *instance_ids))
+            instances += await cursor.fetchall()
+            missing = set(instance_ids) - {instance_id for instance_id, _ in instances}
+            if missing:
+                raise ValueError(f'#{min(missing)} is not owned')
+        pinned = [instance_id for instance_id, _ in instances]
+        for entity_id, n in stacks:
+            have = inventory.count_of(entity_id)
+            if have < n:
+                raise ValueError(f'Only {have}x {CATALOG.get(entity_id).name} owned')
+            if not inventory.is_instanced(entity_id):
+                fungible.append((entity_id, n))
+                continue
+            # Copies named by count are picked from the ones not already pinned by #id
+            cursor = await db.execute(f"SELECT instance_id, entity_id FROM entity_instances WHERE owner_id = ? AND entity_id = ? AND instance_id NOT IN ({', '.join('?' * len(pinned))}) ORDER BY instance_id LIMIT ?",
+                                      (user_id, entity_id, *pinned, n))
+            instances += await cursor.fetchall()
+            wanted += n
+    instances = tuple(dict.fromkeys(map(tuple, instances)))
+    if len(instances) != wanted:  # Repeated #ids, or fewer instance rows than the counts say
+        raise ValueError(f'Only {len(instances)} of the {wanted} unique copies offered could be found')
+    return TradeSide(user_id, tuple(fungible), instances, credits)
+
+async def execute_trade(a: TradeSide, b: TradeSide) -> bool:
+    # Both sides in one transaction – False (nothing written) if either no longer has what was offered
+    async with aiosqlite.connect(DB_FILE) as db:
+        await register_db_functions(db)
+        for sql, params, expected in trade_statements(a, b):
+            cursor = await db.execute(sql, params)
+            if expected is not None and cursor.rowcount != expected:
+                await db.rollback()
+                return False
+        await db.commit()
+    DATA_CACHE.invalidate(f'user:{a.user_id}', f'user:{b.user_id}')
+    for giver, taker in ((a, b), (b, a)):
+        entity_index.apply(giver.user_id, {i: -n for i, n in giver.delta().items()})
+        entity_index.apply(taker.user_id, giver.delta())
+    return True
+
+def describe_side(side: TradeSide) -> str:
+    parts = [f"{CATALOG.get(i).emoji} {CATALOG.get(i).name} x{n}" for i, n in side.stacks]
+    parts += [f"{CATALOG.get(i).emoji} {CATALOG.get(i).name} #{instance_id}" for instance_id, i in side.instances]
+    if side.credits:
+        parts.append(f"💰 {side.credits} credits")
+    return "\n".join(parts) or "Nothing"
+
+# Announcements & Tournaments (Rate-limited queue – rounds post results without hitting Discord limits)
+async def send_announcement(channel_id: int, embed, view=None):
+    channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
+    if view is None:
+        await channel.send(embed=embed)
+        return
+    await channel.send(embed=embed, view=view)
+    view.stop()  # Components stay on the message; clicks are routed by custom_id in on_interaction
+
+announcer = Announcer(send_announcement)
+
+def notify_tournament(channel_id: int, title: str, description: str):
+    announcer.announce(channel_id, discord.Embed(title=title, description=description, color=EPIC_PURPLE))
+
+def invalidate_users(user_ids):
+    DATA_CACHE.invalidate(*(f'user:{user_id}' for user_id in user_ids))
+
+tournaments = TournamentManager(DB_FILE, CATALOG, notify_tournament, invalidate_users)
+tournament_task = None
+
+async def tournament_loop():
+    while True:
+        try:
+            await tournaments.tick(await get_global_event())
+        except Exception as e:
+            print(f"Tournament tick error: {e}")
+        await asyncio.sleep(TICK_SECONDS)
+
+# Premium Expiry (One sweeper sleeps until the next expiry and flips is_premium off in bulk)
+premium_sweep_task = None
+premium_wake = asyncio.Event()  # Set by premium writes – a new expiry may come before the current sleep ends
+
+async def premium_sweep_loop():
+    while True:
+        next_expiry = None
+        premium_wake.clear()  # Before the sweep, so a write during it still wakes the next sleep
+        try:
+            expired, next_expiry = await asyncio.to_thread(sweep_premium_sync, DB_FILE)
+            if expired['users'] or expired['guilds']:
+                print(f"💎 Premium expired: {len(expired['users'])} users, {len(expired['guilds'])} guilds")
+        except Exception as e:
+            print(f"Premium sweep error: {e}")
+        try:
+            await asyncio.wait_for(premium_wake.wait(), SWEEP_MAX_SLEEP if next_expiry is None else min(SWEEP_MAX_SLEEP, max(1, next_expiry - time.time())))
+        except asyncio.TimeoutError:
+            pass
+
+# Marketplace (Escrowed listings – In-memory order book, guarded buys)
+market = Market(DB_FILE, register_db_functions)
+
+# Config Hot-Reload (Poll config.json – parse & compile in a thread, swap references on the loop)
+config_task = None
+
+def apply_config(game):
+    global GAME, CONFIG, CATALOG
+    catalog_changed = game.catalog.entities != CATALOG.entities
+    GAME, CONFIG, CATALOG = game, game.raw, game.catalog
+    tournaments.catalog = spawns.catalog = CATALOG
+    spawns.drop_rates = GAME.drop_rates
+    if catalog_changed:
+        entity_index.rebind(CATALOG)
+        DATA_CACHE.invalidate_prefix('user:')  # Cached records hold the old catalog
+    print(f"🔄 config.json reloaded – {len(CATALOG)} entities, pull {GAME.pull_cost}, premium {GAME.premium_cost}, cooldown {GAME.catch_cooldown}s")
+
+async def config_watch_loop():
+    while True:
+        try:
+            game = await asyncio.to_thread(CONFIG_SOURCE.poll)
+            if game is not None:
+                apply_config(game)
+        except Exception as e:
+            print(f"Config reload error: {e}")
+        await asyncio.sleep(CONFIG_POLL_SECONDS)
+
+# Timed Effects (Power/catch boosts & server premium – Heap-driven expiry, one cached lookup per command)
+effects = EffectEngine(DB_FILE)
+effect_task = None
+BOOST_SECONDS = 86400
+
+# Quest Rollover (Bulk reset at UTC midnight / Monday – meta row keeps it once per period)
+quest_reset_task = None
+
+async def quest_reset_loop():
+    while True:
+        try:
+            rolled = await asyncio.to_thread(reset_quests_sync, DB_FILE)
+            if rolled:
+                print(f"🏆 Quests reset: {', '.join(rolled)}")
+        except Exception as e:
+            print(f"Quest reset error: {e}")
+        await asyncio.sleep(max(1, next_rollover() - time.time()))
+
+async def get_guild_data(guild_id: int):
+    return await DATA_CACHE.get_or_load(f'guild:{guild_id}', lambda: load_guild_data(guild_id), CACHE_TTLS['guild'])
+
+async def load_guild_data(guild_id: int):
+    async with aiosqlite.connect(DB_FILE) as db:
+        cursor = await db.execute(f'SELECT {select_columns(GUILD_COLUMNS, GUILD_FIELDS)} FROM guilds WHERE guild_id = ?', (guild_id,))
+        return GuildRecord.from_row(guild_id, GUILD_FIELDS, await cursor.fetchone())
 
 async def update_guild_data(guild_id: int, **kwargs):
+    fields = epoch_fields(kwargs)
     async with aiosqlite.connect(DB_FILE) as db:
-        set_parts = ', '.join([f"{k} = ?" for k in kwargs])
-        values = list(kwargs.values()) + [guild_id]
+        set_parts = ', '.join([f"{k} = ?" for k in fields])
+        values = list(fields.values()) + [guild_id]
         await db.execute(f'UPDATE guilds SET {set_parts} WHERE guild_id = ?', values)
         if db.total_changes == 0:
             await db.execute('INSERT INTO guilds (guild_id) VALUES (?)', (guild_id,))
         await db.commit()
+    DATA_CACHE.invalidate(f'guild:{guild_id}')
+    if 'premium_until' in kwargs:
+        premium_wake.set()
 
 async def is_banned(user_id: int, guild_id: int = None):
+    return await DATA_CACHE.get_or_load(f'ban:{user_id}:{guild_id}', lambda: load_is_banned(user_id, guild_id), CACHE_TTLS['ban'])
+
+async def load_is_banned(user_id: int, guild_id: int = None):
     async with aiosqlite.connect(DB_FILE) as db:
         if guild_id:
             cursor = await db.execute('SELECT * FROM bans WHERE user_id = ? AND guild_id = ?', (user_id, guild_id))
@@ -139,9 +389,10 @@ async def is_banned(user_id: int, guild_id: int = None):
 
 async def ban_user(user_id: int, reason: str, guild_id: int = None):
     async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute('INSERT OR REPLACE INTO bans (user_id, reason, timestamp, guild_id) VALUES (?, ?, ?, ?)',
-                         (user_id, reason, datetime.now().isoformat(), guild_id))
+        await db.execute('INSERT OR REPLACE INTO bans (user_id, reason, banned_at, guild_id) VALUES (?, ?, ?, ?)',
+                         (user_id, reason, int(time.time()), guild_id))
         await db.commit()
+    DATA_CACHE.invalidate_prefix(f'ban:{user_id}:')
 
 async def unban_user(user_id: int, guild_id: int = None):
     async with aiosqlite.connect(DB_FILE) as db:
@@ -150,27 +401,95 @@ async def unban_user(user_id: int, guild_id: int = None):
         else:
             await db.execute('DELETE FROM bans WHERE user_id = ?', (user_id,))
         await db.commit()
+    DATA_CACHE.invalidate_prefix(f'ban:{user_id}:')
 
 async def get_global_event():
+    return await DATA_CACHE.get_or_load('event', load_global_event, CACHE_TTLS['event'])
+
+async def load_global_event():
     async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute('SELECT event_type FROM global_events WHERE end_time > ? LIMIT 1', (datetime.now().isoformat(),))
+        cursor = await db.execute('SELECT event_type FROM global_events WHERE end_ts > ? LIMIT 1', (int(time.time()),))
         row = await cursor.fetchone()
         return row[0] if row else None
 
 async def start_global_event(event_type: str, duration: int = 24):
     async with aiosqlite.connect(DB_FILE) as db:
-        end_time = datetime.now() + timedelta(hours=duration)
+        now = int(time.time())
         await db.execute('DELETE FROM global_events')
-        await db.execute('INSERT INTO global_events (event_type, start_time, end_time) VALUES (?, ?, ?)',
-                         (event_type, datetime.now().isoformat(), end_time.isoformat()))
+        await db.execute('INSERT INTO global_events (event_type, start_ts, end_ts) VALUES (?, ?, ?)',
+                         (event_type, now, now + duration * 3600))
         await db.commit()
+    DATA_CACHE.invalidate('event')
+
+# Channel Spawns (double_spawn event – Timer wheel, own send queue so tournaments never wait on spawns)
+def post_spawn(channel_id: int, spawn_id: int, entity):
+    embed = discord.Embed(title=f"{entity.emoji} A wild {entity.name} appeared!", description=f"**{entity.rarity}** | {entity.power} ⚡\nFirst to click **Claim** catches it!", color=NEON_BLUE)
+    embed.set_image(url=entity.image_url)
+    view = discord.ui.View(timeout=None)
+    view.add_item(discord.ui.Button(label='Claim', emoji='🎯', style=discord.ButtonStyle.success, custom_id=f'{CLAIM_PREFIX}{spawn_id}'))
+    spawn_announcer.announce(channel_id, embed, view)
+
+spawn_announcer = Announcer(send_announcement, rate=20.0, burst=40, max_queue=2000)
+spawns = SpawnScheduler(DB_FILE, CATALOG, post_spawn, get_global_event, register_db_functions)
+spawn_task = None
+
+# Command Context (Ban + users + guild + event – Cache hits are free, all misses share one query)
+class CommandContext(NamedTuple):
+    banned: bool                       # Any of the users (same per-guild semantics as is_banned)
+    users: list                        # UserRecord copies, in the order asked for
+    guild: GuildRecord
+    event: str
+
+CONTEXT_SQL = '''
+    WITH k(uid) AS (VALUES {values})
+    SELECT k.uid, u.user_id IS NOT NULL, {user_columns}, g.guild_id IS NOT NULL, {guild_columns},
+           (SELECT event_type FROM global_events WHERE end_ts > ? LIMIT 1),
+           EXISTS(SELECT 1 FROM bans b WHERE b.user_id = k.uid AND (? IS NULL OR b.guild_id = ?))
+    FROM k LEFT JOIN users u ON u.user_id = k.uid LEFT JOIN guilds g ON g.guild_id = ?
+'''
+
+async def load_context_rows(user_ids: tuple, guild_id: int) -> dict:
+    sql = CONTEXT_SQL.format(values=', '.join('(?)' for _ in user_ids), user_columns=select_columns(USER_COLUMNS, USER_FIELDS, 'u.'),
+                             guild_columns=select_columns(GUILD_COLUMNS, GUILD_FIELDS, 'g.'))
+    ban_guild = guild_id or None  # Falsy guild -> any ban counts (is_banned semantics)
+    async with aiosqlite.connect(DB_FILE) as db:
+        cursor = await db.execute(sql, (*user_ids, int(time.time()), ban_guild, ban_guild, guild_id))
+        rows = await cursor.fetchall()
+    n_user = len(select_columns(USER_COLUMNS, USER_FIELDS).split(', '))
+    values = {}
+    for row in rows:
+        uid = row[0]
+        values[f'user:{uid}'] = index_inventory(UserRecord.from_row(uid, USER_FIELDS, row[2:2 + n_user] if row[1] else None, CATALOG))
+        values[f'ban:{uid}:{guild_id}'] = bool(row[-1])
+        guild_row = row[3 + n_user:3 + n_user + len(GUILD_FIELDS)]
+        values[f'guild:{guild_id}'] = GuildRecord.from_row(guild_id, GUILD_FIELDS, guild_row if row[2 + n_user] else None)
+        values['event'] = row[-2]
+    return values
+
+async def load_context(guild_id: int, *user_ids: int) -> CommandContext:
+    # Every piece goes through DATA_CACHE.get_or_load (singleflight + invalidation-safe); the
+    # loaders of whichever keys missed all await one shared query
+    batch = None
+
+    def loader(key: str):
+        async def load():
+            nonlocal batch
+            if batch is None:
+                batch = asyncio.ensure_future(load_context_rows(user_ids, guild_id))
+            return (await batch)[key]
+        return load
+
+    keys = [(f'ban:{uid}:{guild_id}', 'ban') for uid in user_ids] + [(f'user:{uid}', 'user') for uid in user_ids] + [(f'guild:{guild_id}', 'guild'), ('event', 'event')]
+    values = await asyncio.gather(*(DATA_CACHE.get_or_load(key, loader(key), CACHE_TTLS[kind]) for key, kind in keys))
+    n = len(user_ids)
+    return CommandContext(any(values[:n]), [user.copy() for user in values[n:2 * n]], values[-2], values[-1])
 
 # Rate Limit (Simple – Premium Skips)
 user_cooldowns = {}
 async def rate_limit_check(user_id: int):
     now = datetime.now().timestamp()
     if user_id in user_cooldowns:
-        if now - user_cooldowns[user_id] < 60:  # 60s cooldown
+        if now - user_cooldowns[user_id] < GAME.catch_cooldown:  # config.json catch_cooldown
             return False
     user_cooldowns[user_id] = now
     return True
@@ -179,6 +498,32 @@ async def rate_limit_check(user_id: int):
 @bot.event
 async def on_ready():
     await init_db()
+    await tournaments.ensure_schema()
+    if not change_listener.running:
+        asyncio.create_task(change_listener.run())  # Dashboard edits -> precise cache invalidation
+    global tournament_task
+    if tournament_task is None or tournament_task.done():
+        tournament_task = asyncio.create_task(tournament_loop())  # pvp_tournament event -> sign-ups, rounds, payouts
+    announcer.start()
+    global premium_sweep_task
+    if premium_sweep_task is None or premium_sweep_task.done():
+        premium_sweep_task = asyncio.create_task(premium_sweep_loop())  # Cache invalidation rides the change feed
+    await market.load()
+    global config_task
+    if config_task is None or config_task.done():
+        config_task = asyncio.create_task(config_watch_loop())
+    global effect_task
+    if effect_task is None or effect_task.done():
+        await effects.load()
+        effect_task = asyncio.create_task(effects.run())
+    global quest_reset_task
+    if quest_reset_task is None or quest_reset_task.done():
+        quest_reset_task = asyncio.create_task(quest_reset_loop())
+    global spawn_task
+    if spawn_task is None or spawn_task.done():
+        await spawns.load()
+        spawn_task = asyncio.create_task(spawns.run())  # One tick task for every opted-in channel
+    spawn_announcer.start()
     try:
         synced = await bot.tree.sync()
         print(f"✅ Bot ready – Synced {len(synced)} commands. Attractive embeds loaded!")
@@ -200,6 +545,93 @@ async def on_message(message):
         return
     await bot.process_commands(message)
 
+# Component Router (custom_id prefix -> handler – no View object kept per spawned message)
+component_handlers = {}
+
+@bot.event
+async def on_interaction(interaction: discord.Interaction):
+    if interaction.type != discord.InteractionType.component:
+        return
+    custom_id = (interaction.data or {}).get('custom_id', '')
+    for prefix, handler in component_handlers.items():
+        if custom_id.startswith(prefix):
+            await handler(interaction, custom_id[len(prefix):])
+            return
+
+async def claim_spawn(interaction: discord.Interaction, spawn_id: str):
+    user_id = interaction.user.id
+    if await is_banned(user_id, interaction.guild.id if interaction.guild else None):
+        await interaction.response.send_message(embed=discord.Embed(title="🚫 Banned", description="You are banned from using commands.", color=ERROR_RED), ephemeral=True)
+        return
+    entity, winner = await spawns.claim(int(spawn_id), user_id)
+    if entity is None:
+        embed = discord.Embed(title="💨 Gone", description="This spawn no longer exists.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    elif winner == user_id:
+        DATA_CACHE.invalidate(f'user:{user_id}')
+        entity_index.apply(user_id, {entity.id: 1})
+        embed = discord.Embed(title=f"🎯 {entity.name} Claimed!", description=f"{interaction.user.mention} caught {entity.emoji} **{entity.name}** ({entity.rarity}, {entity.power} ⚡)!", color=SUCCESS_GREEN)
+        embed.set_thumbnail(url=entity.image_url)
+        await interaction.response.edit_message(embed=embed, view=None)
+    elif winner is None:
+        embed = discord.Embed(title="🕒 Too Late", description=f"{entity.emoji} {entity.name} got away!", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    else:
+        embed = discord.Embed(title="⚡ Too Slow", description=f"<@{winner}> already claimed {entity.emoji} {entity.name}!", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+component_handlers[CLAIM_PREFIX] = claim_spawn
+
+# Pending Confirmations (Trade/shop buttons – state in pending_actions, survives restarts)
+pending_handlers = {}  # kind -> async handler(interaction, payload), registered next to each command
+
+def confirm_view(action_id: int) -> discord.ui.View:
+    view = discord.ui.View(timeout=None)
+    view.add_item(discord.ui.Button(label='Confirm ✅', style=discord.ButtonStyle.green, custom_id=pending_custom_id(action_id, 'confirm')))
+    view.add_item(discord.ui.Button(label='Cancel ❌', style=discord.ButtonStyle.red, custom_id=pending_custom_id(action_id, 'cancel')))
+    view.stop()  # Finished views aren't stored – the components stay, clicks come back through on_interaction
+    return view
+
+async def pending_action(interaction: discord.Interaction, rest: str):
+    action_id, choice = parse_custom_id(rest)
+    kind, payload, owner_id = await take_pending(DB_FILE, action_id, interaction.user.id)
+    if kind is None:
+        if owner_id is not None:
+            await interaction.response.send_message(f"Only <@{owner_id}> can answer this!", ephemeral=True)
+        else:
+            embed = discord.Embed(title="🕒 Expired", description="This confirmation is no longer active.", color=ERROR_RED)
+            await interaction.response.edit_message(embed=embed, view=None)
+        return
+    if choice != 'confirm':
+        cancel_embed = discord.Embed(title="❌ Canceled", description="No changes made.", color=ERROR_RED)
+        await interaction.response.edit_message(embed=cancel_embed, view=None)
+        return
+    await pending_handlers[kind](interaction, payload)
+
+component_handlers[PENDING_PREFIX] = pending_action
+
+# Entity Autocomplete (In-memory prefix index – answers well inside Discord's deadline, no DB)
+def entity_choices(current: str, suggest) -> list:
+    # Comma lists ("Kirby x2, Pa") complete the last item and keep what was typed before it
+    head, sep, last = current.rpartition(',')
+    lead = f"{head.strip()}, " if sep else ""
+    choices = []
+    for entity in suggest(last):
+        value = f"{lead}{entity.name}"
+        if len(value) <= 100:
+            choices.append(app_commands.Choice(name=f"{entity.emoji} {value} ({entity.rarity})"[:100], value=value))
+    return choices
+
+async def owned_entity_autocomplete(interaction: discord.Interaction, current: str) -> list:
+    return entity_choices(current, lambda prefix: entity_index.suggest(interaction.user.id, prefix))
+
+async def their_entity_autocomplete(interaction: discord.Interaction, current: str) -> list:
+    target = getattr(interaction.namespace, 'user', None)
+    return entity_choices(current, lambda prefix: entity_index.suggest(target.id if target else 0, prefix))
+
+async def any_entity_autocomplete(interaction: discord.Interaction, current: str) -> list:
+    return entity_choices(current, entity_index.suggest_any)
+
 # Attractive /help (Interactive Subcommands – Detailed for Fools)
 @bot.tree.command(name='help', description='📖 Detailed NexusVerse Guide – Interactive Categories!')
 @app_commands.describe(category='Choose: core, economy, premium, owner')
@@ -232,22 +664,24 @@ async def help_command(interaction: discord.Interaction, category: str = 'core')
 async def catch_command(interaction: discord.Interaction):
     user_id = interaction.user.id
     guild_id = interaction.guild.id if interaction.guild else 0
-    if await is_banned(user_id, guild_id):
+    ctx = await load_context(guild_id, user_id)  # Ban, user, guild & event in one round trip
+    if ctx.banned:
         embed = discord.Embed(title="🚫 Banned", description="You can't use commands while banned.", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     if not await rate_limit_check(user_id):
-        embed = discord.Embed(title="⏳ Cooldown", description="60s recharge. Premium skips! Wait or upgrade.", color=ERROR_RED)
+        embed = discord.Embed(title="⏳ Cooldown", description=f"{GAME.catch_cooldown}s recharge. Premium skips! Wait or upgrade.", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
-    data = await get_user_data(user_id)
-    guild_data = await get_guild_data(guild_id)
+    data, guild_data = ctx.users[0], ctx.guild
+    mods = (await effects.modifiers(guild_id, user_id))[0]  # Boosts & server premium
+    premium = data['is_premium'] or mods.premium
     await interaction.response.defer()  # Interactive – Not instant
     await interaction.followup.send("🔍 Scanning Nexus for entities... (3s)")  # Excitement
     await asyncio.sleep(3)  # Scan animation time
     
     # Automatic Event Check (Double Spawn Active? – No Manual Change)
-    event = await get_global_event()
+    event = ctx.event
     rate = 1.0
     if guild_data['is_official']:
         rate *= guild_data['spawn_multiplier']  # 3x
@@ -257,28 +691,15 @@ async def catch_command(interaction: discord.Interaction):
         rate *= 2  # Automatic x2!
         event_embed = discord.Embed(title="🌟 Double Spawn Event", description="x2 Rarity Chance – Better pulls!", color=EPIC_PURPLE)
         await interaction.followup.send(event_embed, ephemeral=True)
-    if data['is_premium']:
+    if premium:
         rate *= 1.5
         premium_embed = discord.Embed(title="💎 Premium Boost", description="+20% Success & 1.5x Rate!", color=PREMIUM_GOLD)
         await interaction.followup.send(premium_embed, ephemeral=True)
     
     # ALWAYS SPAWN RANDOM ENTITY (QC = Rarity Roll – Explained)
-    rarity_roll = random.random() * rate
-    if rarity_roll < 0.01 * rate:
-        entity = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Mythic'])
-        rarity = "Mythic"
-    elif rarity_roll < 0.05 * rate:
-        entity = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Legendary'])
-        rarity = "Legendary"
-    elif rarity_roll < 0.2 * rate:
-        entity = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Epic'])
-        rarity = "Epic"
-    elif rarity_roll < 0.5 * rate:
-        entity = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Rare'])
-        rarity = "Rare"
-    else:
-        entity = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Common'])
-        rarity = "Common"
+    rarity_roll = random.random()
+    rarity = roll_rarity(GAME.drop_rates, rarity_roll, rate)
+    entity = CATALOG.random_of(rarity).to_dict()
     
     # QC Explanation Embed (Attractive – Always Shows Spawn)
     qc_embed = discord.Embed(title=f"🎯 QC Roll: {rarity} Spawn Detected!", description=f"{entity['emoji']} **{entity['name']}** ({entity['rarity']}, Power {entity['power']})\n{entity['desc']}\n\n**QC Explained**: Rolled {rarity_roll:.2f} vs rate {rate}x (boosted by { 'official/event/premium' if rate > 1 else 'base' }). Always spawns something – Now attempting catch!", color=NEON_BLUE)
@@ -288,12 +709,13 @@ async def catch_command(interaction: discord.Interaction):
     
     # Catch Roll (Success Based on Level/Premium/Official/Event)
     success_rate = 0.3 + 0.05 * data['level']  # Base 30% + level (max 90%)
-    if data['is_premium']:
+    if premium:
         success_rate += 0.2  # +20%
     if guild_data['is_official']:
         success_rate += 0.1  # +10%
     if event == 'double_spawn':
         success_rate += 0.1  # +10% in event
+    success_rate += mods.catch  # Catch Lure
     success_rate = min(success_rate, 0.9)  # Cap 90%
     success_roll = random.random()
     
@@ -304,45 +726,83 @@ async def catch_command(interaction: discord.Interaction):
         if event == 'double_spawn':
             credits_earned *= 2  # Double credits
         data['credits'] += credits_earned
-        data['pity'] = 0  # Reset pity
+        data.reset('pity', 0)  # Reset pity
         if len(data['entities']) % 5 == 0:
             data['level'] += 1
             level_embed = discord.Embed(title="🎉 Level Up!", description=f"Level {data['level']} Unlocked – +5% Catch Rate!", color=SUCCESS_GREEN)
             await interaction.followup.send(embed=level_embed)
-        await update_user_data(user_id, entities=data['entities'], credits=data['credits'], pity=0, level=data['level'])
+        await save_user(data, activity='catch')
         
         success_embed = discord.Embed(title="🚀 WARP-CATCH SUCCESS!", description=f"{entity['emoji']} **{entity['name']}** Captured!\nPower +{entity['power']} | Credits +{credits_earned}\n\n**Pity Reset**: 0/10 – Keep catching!", color=SUCCESS_GREEN)
         success_embed.set_thumbnail(url=entity['image_url'])  # Victory GIF
-        success_embed.add_field(name="Collection", value=f"Total Entities: {len(data['entities'])} | Total Power: {sum(e.get('power', 0) for e in data['entities'])}", inline=False)
+        success_embed.add_field(name="Collection", value=f"Total Entities: {len(data['entities'])} | Total Power: {data['entities'].total_power()}", inline=False)
         confetti = "🎉🎊✨🌟🚀"  # ASCII confetti
         success_embed.set_footer(text=confetti)
         await interaction.followup.send(embed=success_embed)
     else:
         # Fail – Pity +1, But Always Shows Spawn (No Empty)
-        data['pity'] += 1 if not data['is_premium'] else 2  # Premium 2x faster
+        data['pity'] += 1 if not premium else 2  # Premium 2x faster
         if data['pity'] >= 10:
-            data['pity'] = 0
+            data.reset('pity', 0)
             pity_embed = discord.Embed(title="🔥 PITY BREAK!", description="Next /catch guaranteed Rare+! (Reset to 0)", color=EPIC_PURPLE)
             await interaction.followup.send(embed=pity_embed)
-        await update_user_data(user_id, pity=data['pity'])
+        await save_user(data)
         
         fail_embed = discord.Embed(title="💥 Warp Failed – Escaped!", description=f"{entity['emoji']} **{entity['name']}** slipped away!\nYou saw it spawn (Power {entity['power']}) – Better luck next time.\n\n**Pity System**: {data['pity']}/10 Fails (Guaranteed Rare+ at 10! Premium: Fills 2x faster, Official: Cap 8).", color=ERROR_RED)
         fail_embed.set_thumbnail(url=entity['image_url'])  # Escape GIF
         fail_embed.add_field(name="Tip", value="Level up for +5% success. Premium +20%! Events boost too.", inline=False)
         await interaction.followup.send(embed=fail_embed)
 
-# /profile (Attractive – GIF Carousel, Progress Bars)
+# Profile Cards (Pillow in a process pool – PNGs cached by a hash of everything drawn on them)
+card_renderer = CardRenderer()
+
+async def render_profile_card(kind: str, user, data) -> discord.File:
+    # None if rendering failed – callers keep their GIF embed
+    stacks = data['entities'].stacks(3 if kind == 'profile' else COLLECTION_LIMIT)
+    card = ProfileCard(kind, user.display_name, user.display_avatar.key, data['level'], data['credits'], data['pity'], data['streak'],
+                       data['entities'].total_power(), len(data['entities']), data['entities'].distinct(), bool(data['is_premium']),
+                       tuple(CardStack(e['name'], e['rarity'], e['count'], e['power']) for e in stacks))
+
+    async def fetch_avatar():
+        try:
+            return await user.display_avatar.replace(size=AVATAR_SIZE, format='png').read()
+        except discord.HTTPException:
+            return b''
+
+    try:
+        png = await card_renderer.render(card, fetch_avatar)
+    except Exception as e:
+        print(f"Card render error: {e}")
+        return None
+    return discord.File(io.BytesIO(png), filename=f'{kind}.png')
+
+# /profile [card] (Attractive – Rendered Card, Progress Bars, GIF Fallback)
 @bot.tree.command(name='profile', description='👤 View your NexusVerse stats – Attractive with GIFs & bars!')
-async def profile_command(interaction: discord.Interaction):
+@app_commands.describe(card='profile (stats card) or collection (all your stacks)')
+@app_commands.choices(card=[app_commands.Choice(name='Profile', value='profile'), app_commands.Choice(name='Collection', value='collection')])
+async def profile_command(interaction: discord.Interaction, card: str = 'profile'):
     user_id = interaction.user.id
+    await interaction.response.defer()  # A cache-miss render can outlast the 3s response window
     data = await get_user_data(user_id)
+    image = await render_profile_card(card, interaction.user, data)
+
+    if card == 'collection':
+        embed = discord.Embed(title=f"🗂️ {interaction.user.display_name}'s Collection",
+                              description=f"{len(data['entities'])} entities ({data['entities'].distinct()} unique) – strongest first.", color=NEON_BLUE)
+        if image:
+            embed.set_image(url=f'attachment://{image.filename}')
+            await interaction.followup.send(embed=embed, file=image)
+        else:
+            embed.add_field(name="Top Entities", value="\n".join(f"{e['emoji']} {e['name']} x{e['count']}" for e in data['entities'].top(10)) or "None yet – Start with /catch! 🎣", inline=False)
+            await interaction.followup.send(embed=embed)
+        return
     guild_data = await get_guild_data(interaction.guild.id if interaction.guild else 0) if interaction.guild else {'is_official': False}
     
     embed = discord.Embed(title=f"🌌 {interaction.user.display_name}'s Profile", color=NEON_BLUE)
     embed.set_thumbnail(url=interaction.user.avatar.url if interaction.user.avatar else interaction.user.default_avatar.url)
     
     # Total Power & Premium Badge
-    total_power = sum(e.get('power', 0) for e in data['entities'])
+    total_power = data['entities'].total_power()
     premium_status = "💎 Active" if data['is_premium'] else "No (Buy with /shop!)"
     official_status = "🏛️ Official Member (+10% Success)."
 
@@ -355,10 +815,10 @@ async def profile_command(interaction: discord.Interaction):
     
     embed.add_field(name="Progress", value=f"Level: [{level_bar}] {data['level']}/∞\nPity: [{pity_bar}] {data['pity']}/10 (Rare+ at max!)\nStreak: [{streak_bar}] {data['streak']} days 🔥", inline=False)
     
-    # Top 3 Entities GIF Carousel (Random from Collection – Attractive)
+    # Top 3 Entities GIF Carousel (Strongest Stacks – Attractive)
     if data['entities']:
-        top3 = random.sample(data['entities'], min(3, len(data['entities'])))
-        entities_str = "\n".join([f"{e['emoji']} {e['name']} ({e['rarity']}, Power {e['power']})" for e in top3])
+        top3 = data['entities'].top(3)
+        entities_str = "\n".join([f"{e['emoji']} {e['name']} x{e['count']} ({e['rarity']}, Power {e['power']})" for e in top3])
         embed.add_field(name="Top Entities", value=entities_str, inline=True)
         # Carousel GIF (First top3 GIF)
         embed.set_image(url=top3[0].get('image_url', 'https://media.giphy.com/media/3o7btPCcdNniyf0ArS/giphy.gif'))
@@ -366,13 +826,17 @@ async def profile_command(interaction: discord.Interaction):
         embed.add_field(name="Entities", value="None yet – Start with /catch! 🎣", inline=True)
         embed.set_image(url="https://media.giphy.com/media/26ufnwz3wDUfck3m0/giphy.gif")  # Empty collection GIF
     
-    embed.add_field(name="Stats", value=f"Credits: {data['credits']} 💰\nTotal Power: {total_power} ⚡\nCollection: {len(data['entities'])} / ∞", inline=True)
+    embed.add_field(name="Stats", value=f"Credits: {data['credits']} 💰\nTotal Power: {total_power} ⚡\nCollection: {len(data['entities'])} ({data['entities'].distinct()} unique) / ∞", inline=True)
     
     # Footer with Tip GIF
     tip = "Tip: /catch for entities! Premium doubles rewards. Official servers boost rates."
     embed.set_footer(text=tip, icon_url="https://media.giphy.com/media/l0HlRnAWXxn0MhKLK/giphy.gif")
-    
-    await interaction.response.send_message(embed=embed)
+
+    if image:
+        embed.set_image(url=f'attachment://{image.filename}')  # Rendered card replaces the carousel GIF
+        await interaction.followup.send(embed=embed, file=image)
+    else:
+        await interaction.followup.send(embed=embed)
 
 # /pull (Gacha – Attractive Roll with Pity, Always Pulls Something)
 @bot.tree.command(name='pull', description='🎰 Gacha Pull – Spend 50 credits for entities (Pity 10 = Legendary!)')
@@ -381,12 +845,14 @@ async def pull_command(interaction: discord.Interaction):
     if await is_banned(user_id, interaction.guild.id if interaction.guild else None):
         return
     data = await get_user_data(user_id)
-    if data['credits'] < 50:
-        embed = discord.Embed(title="💸 Not Enough Credits", description="Need 50 for a pull. Earn with /daily or /catch!", color=ERROR_RED)
+    pull_cost = GAME.pull_cost
+    if data['credits'] < pull_cost:
+        embed = discord.Embed(title="💸 Not Enough Credits", description=f"Need {pull_cost} for a pull. Earn with /daily or /catch!", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
-    if not await rate_limit_check(user_id) and not data['is_premium']:
-        embed = discord.Embed(title="⏳ Cooldown", description="60s between pulls. Premium skips!", color=ERROR_RED)
+    mods = (await effects.modifiers(interaction.guild.id if interaction.guild else 0, user_id))[0]
+    if not await rate_limit_check(user_id) and not (data['is_premium'] or mods.premium):
+        embed = discord.Embed(title="⏳ Cooldown", description=f"{GAME.catch_cooldown}s between pulls. Premium skips!", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
@@ -399,34 +865,24 @@ async def pull_command(interaction: discord.Interaction):
     pulled_entities = []
     if data['pity'] >= 10:
         # Guaranteed Legendary
-        legendary = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Legendary'])
+        legendary = CATALOG.random_of('Legendary').to_dict()
         pulled_entities.append(legendary)
-        data['pity'] = 0
+        data.reset('pity', 0)
         pity_text = "🔥 PITY BREAK! Guaranteed Legendary!"
     else:
         for _ in range(num_entities):
-            rarity_roll = random.random()
-            if rarity_roll < 0.01:
-                entity = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Mythic'])
-            elif rarity_roll < 0.05:
-                entity = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Legendary'])
-            elif rarity_roll < 0.2:
-                entity = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Epic'])
-            elif rarity_roll < 0.5:
-                entity = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Rare'])
-            else:
-                entity = random.choice([e for e in CONFIG['entities'] if e['rarity'] == 'Common'])
+            entity = CATALOG.random_of(roll_rarity(GAME.drop_rates, random.random())).to_dict()
             pulled_entities.append(entity)
         data['pity'] += 1
         pity_text = f"Pity: {data['pity']}/10 (Legendary at max!)"
     
     # Deduct Credits & Add Entities
-    data['credits'] -= 50
+    data['credits'] -= pull_cost
     data['entities'].extend(pulled_entities)
-    await update_user_data(user_id, credits=data['credits'], entities=data['entities'], pity=data['pity'])
+    await save_user(data, activity='pull')
     
     # Attractive Roll Embed (GIFs for Each)
-    embed = discord.Embed(title="🎰 Gacha Results!", description=f"{pity_text}\n\nPulled {num_entities} entities for 50 credits!", color=NEON_BLUE)
+    embed = discord.Embed(title="🎰 Gacha Results!", description=f"{pity_text}\n\nPulled {num_entities} entities for {pull_cost} credits!", color=NEON_BLUE)
     for entity in pulled_entities:
         embed.add_field(name=f"{entity['emoji']} {entity['name']}", value=f"{entity['rarity']} | Power {entity['power']}\n{entity['desc']}", inline=True)
         embed.set_image(url=entity['image_url'])  # Carousel effect with last
@@ -440,9 +896,9 @@ async def daily_command(interaction: discord.Interaction):
     user_id = interaction.user.id
     if await is_banned(user_id, interaction.guild.id if interaction.guild else None):
         return
-    data = await get_user_data(user_id)
+    data = await get_user_fields(user_id, 'credits', 'streak', 'last_daily', 'is_premium')
     now = datetime.now().date()
-    last_daily = datetime.fromisoformat(data['last_daily']).date() if data['last_daily'] else None
+    last_daily = datetime.fromtimestamp(data['last_daily']).date() if data['last_daily'] else None
     
     if last_daily == now:
         embed = discord.Embed(title="📅 Already Claimed", description="Come back tomorrow! Streak: {data['streak']} 🔥", color=ERROR_RED)
@@ -457,9 +913,12 @@ async def daily_command(interaction: discord.Interaction):
         total_reward *= 2  # Double for premium
     
     data['credits'] += total_reward
-    data['streak'] = data['streak'] + 1 if last_daily and (now - last_daily).days == 1 else 1
-    data['last_daily'] = datetime.now().isoformat()
-    await update_user_data(user_id, credits=data['credits'], streak=data['streak'], last_daily=data['last_daily'])
+    if last_daily and (now - last_daily).days == 1:
+        data['streak'] += 1
+    else:
+        data.reset('streak', 1)
+    data['last_daily'] = int(time.time())
+    await save_user(data, activity='daily')
     
     embed = discord.Embed(title="🎁 Daily Reward Claimed!", description=f"+{total_reward} Credits!\nStreak: {data['streak']} days 🔥 (Bonus +{streak_bonus})", color=SUCCESS_GREEN)
     embed.add_field(name="Total", value=f"Credits: {data['credits']} 💰", inline=True)
@@ -471,7 +930,7 @@ async def daily_command(interaction: discord.Interaction):
 
 # /shop (Interactive Buy – Attractive List & Confirmation)
 @bot.tree.command(name='shop', description='🛒 Browse & buy items/entities – Spend credits!')
-@app_commands.describe(item='entity, boost, premium')
+@app_commands.describe(item='entity, boost, lure, premium')
 async def shop_command(interaction: discord.Interaction, item: str = 'entity'):
     user_id = interaction.user.id
     if await is_banned(user_id, interaction.guild.id if interaction.guild else None):
@@ -480,20 +939,21 @@ async def shop_command(interaction: discord.Interaction, item: str = 'entity'):
     
     if item == 'list':
         embed = discord.Embed(title="🛒 NexusVerse Shop", description="Spend credits on boosts & more!", color=NEON_BLUE)
-        embed.add_field(name="Entity Pack", value="50 credits – 1-3 random entities (Pity counts!)", inline=False)
-        embed.add_field(name="Power Boost", value="100 credits – +20% entity power for 24h", inline=False)
-        embed.add_field(name="Premium (1 Month)", value="1000 credits – 2x rewards, no cooldowns!", inline=False)
+        costs = GAME.shop_costs
+        embed.add_field(name="Entity Pack", value=f"{costs['entity']} credits – 1-3 random entities (Pity counts!)", inline=False)
+        embed.add_field(name="Power Boost", value=f"{costs['boost']} credits – +20% entity power for 24h", inline=False)
+        embed.add_field(name="Catch Lure", value=f"{costs['lure']} credits – +10% catch success for 24h", inline=False)
+        embed.add_field(name="Premium (1 Month)", value=f"{costs['premium']} credits – 2x rewards, no cooldowns!", inline=False)
         embed.set_footer(text="Use /shop item:entity to buy. Example: /shop item:entity", icon_url="https://media.giphy.com/media/26ufnwz3wDUfck3m0/giphy.gif")
         await interaction.response.send_message(embed=embed)
         return
     
-    costs = {'entity': 50, 'boost': 100, 'premium': 1000}
-    if item not in costs:
-        embed = discord.Embed(title="❌ Invalid Item", description="Try: entity, boost, premium. Use /shop for list.", color=ERROR_RED)
+    if item not in GAME.shop_costs:
+        embed = discord.Embed(title="❌ Invalid Item", description="Try: entity, boost, lure, premium. Use /shop for list.", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    cost = costs[item]
+    cost = GAME.shop_costs[item]
     if data['credits'] < cost:
         embed = discord.Embed(title="💸 Not Enough", description=f"Need {cost} credits for {item}. Earn with /daily or /catch!", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -502,18 +962,27 @@ async def shop_command(interaction: discord.Interaction, item: str = 'entity'):
     # Buy Confirmation (Attractive)
     confirm_embed = discord.Embed(title=f"🛒 Confirm Buy: {item.title()}", description=f"Cost: {cost} credits\nYour Balance: {data['credits']}", color=NEON_BLUE)
     if item == 'entity':
-        sample_entity = random.choice(CONFIG['entities'])
+        sample_entity = random.choice(CATALOG.entities).to_dict()
         confirm_embed.add_field(name="Sample", value=f"{sample_entity['emoji']} {sample_entity['name']} ({sample_entity['rarity']})", inline=True)
         confirm_embed.set_image(url=sample_entity['image_url'])
-    await interaction.response.send_message(embed=confirm_embed, ephemeral=True)
-    
-    # Wait for confirmation (Simple – Or add buttons in full)
-    await asyncio.sleep(5)  # Auto-confirm for simplicity (add view for buttons)
+    action_id = await create_pending(DB_FILE, 'shop', user_id, {'item': item})
+    await interaction.response.send_message(embed=confirm_embed, view=confirm_view(action_id), ephemeral=True)
+
+async def shop_confirm(interaction: discord.Interaction, payload: dict):
+    # Balance is re-checked at click time – the confirmation may be minutes (or a restart) old
+    user_id = interaction.user.id
+    item = payload['item']
+    cost = GAME.shop_costs[item]
+    balance = await debit_credits(user_id, cost)
+    if balance is None:
+        embed = discord.Embed(title="💸 Not Enough", description=f"Need {cost} credits for {item}. Earn with /daily or /catch!", color=ERROR_RED)
+        await interaction.response.edit_message(embed=embed, view=None)
+        return
     
-    data['credits'] -= cost
+    data = await get_user_data(user_id)  # After the debit – saving it only adds the item
     if item == 'entity':
         num = random.randint(1, 3)
-        pulled = [random.choice(CONFIG['entities']) for _ in range(num)]
+        pulled = [random.choice(CATALOG.entities).to_dict() for _ in range(num)]
         data['entities'].extend(pulled)
         data['pity'] += num  # Pity for pulls
         buy_embed = discord.Embed(title="✅ Bought Entity Pack!", description=f"Pulled {num} entities for {cost} credits!\nPity +{num}", color=SUCCESS_GREEN)
@@ -521,26 +990,34 @@ async def shop_command(interaction: discord.Interaction, item: str = 'entity'):
             buy_embed.add_field(name=e['emoji'] + e['name'], value=f"{e['rarity']} | Power {e['power']}", inline=True)
         buy_embed.set_image(url=pulled[-1]['image_url'])
     elif item == 'boost':
-        # Temporary boost (add to data if needed)
-        buy_embed = discord.Embed(title="✅ Bought Power Boost!", description="Entities +20% power for 24h! (Next battle/pull)", color=SUCCESS_GREEN)
+        expires_at = await effects.grant(user_id, 'power_boost', 0.2, BOOST_SECONDS)  # Stacks with an active boost
+        buy_embed = discord.Embed(title="✅ Bought Power Boost!", description=f"Entities +20% power in battles until <t:{expires_at}:R>!", color=SUCCESS_GREEN)
         buy_embed.set_image(url="https://media.giphy.com/media/3o7btMYv2bT4nX4X4k/giphy.gif")  # Boost GIF
+    elif item == 'lure':
+        expires_at = await effects.grant(user_id, 'catch_boost', 0.1, BOOST_SECONDS)
+        buy_embed = discord.Embed(title="✅ Bought Catch Lure!", description=f"+10% catch success until <t:{expires_at}:R>!", color=SUCCESS_GREEN)
+        buy_embed.set_image(url="https://media.giphy.com/media/26ufktO5bj6aKk9z2/giphy.gif")  # Lure GIF
     elif item == 'premium':
         end_time = datetime.now() + timedelta(days=30)
         data['premium_until'] = end_time
         buy_embed = discord.Embed(title="💎 Premium Activated!", description="1 month perks: 2x rewards, no cooldowns! Active until " + end_time.strftime("%Y-%m-%d"), color=PREMIUM_GOLD)
         buy_embed.set_image(url="https://media.giphy.com/media/l0HlRnAWXxn0MhKLK/giphy.gif")  # Premium GIF
     
-    await update_user_data(user_id, credits=data['credits'], entities=data['entities'] if item == 'entity' else data['entities'], premium_until=data['premium_until'] if item == 'premium' else data['premium_until'])
-    buy_embed.add_field(name="New Balance", value=f"{data['credits']} credits left", inline=True)
-    await interaction.followup.send(embed=buy_embed)
+    await save_user(data)
+    buy_embed.add_field(name="New Balance", value=f"{balance} credits left", inline=True)
+    await interaction.response.edit_message(embed=buy_embed, view=None)
+
+pending_handlers['shop'] = shop_confirm
 
-# /battle @opponent (PvP – Attractive Comparison GIF)
-@bot.tree.command(name='battle', description='⚔️ PvP Battle – Compare entity power with opponent!')
-@app_commands.describe(opponent='User to battle')
-async def battle_command(interaction: discord.Interaction, opponent: discord.Member):
+# /battle @opponent [team] (PvP – Top-K Teams, Seeded Slot Duels)
+@bot.tree.command(name='battle', description='⚔️ PvP Battle – Your best team vs your opponent\'s!')
+@app_commands.describe(opponent='User to battle', team=f'Optional: up to {TEAM_SIZE} entity names, comma-separated (default: your strongest)')
+@app_commands.autocomplete(team=owned_entity_autocomplete)
+async def battle_command(interaction: discord.Interaction, opponent: discord.Member, team: str = None):
     user_id = interaction.user.id
     opp_id = opponent.id
-    if await is_banned(user_id, interaction.guild.id) or await is_banned(opp_id, interaction.guild.id):
+    ctx = await load_context(interaction.guild.id, user_id, opp_id)
+    if ctx.banned:
         embed = discord.Embed(title="🚫 Banned User", description="Can't battle if banned.", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
@@ -549,19 +1026,27 @@ async def battle_command(interaction: discord.Interaction, opponent: discord.Mem
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    data1 = await get_user_data(user_id)
-    data2 = await get_user_data(opp_id)
-    power1 = sum(e.get('power', 0) for e in data1['entities'])
-    power2 = sum(e.get('power', 0) for e in data2['entities'])
+    data1, data2 = ctx.users
     
     if not data1['entities'] or not data2['entities']:
         embed = discord.Embed(title="⚠️ No Entities", description="Both need entities to battle. Catch some first!", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
+    # Teams (Chosen or Auto Top-K) & Boosts – then a seeded simulation (interaction ID = replayable)
+    try:
+        team1 = chosen_team(data1['entities'].counts, CATALOG, team.split(',')) if team else auto_team(data1['entities'].counts, CATALOG)
+    except ValueError as e:
+        embed = discord.Embed(title="❌ Invalid Team", description=f"{e}. Leave team empty to auto-pick your strongest {TEAM_SIZE}.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    team2 = auto_team(data2['entities'].counts, CATALOG)
+    mods1, mods2 = await effects.modifiers(interaction.guild.id, user_id, opp_id)
+    result = simulate(team1, team2, CATALOG, battle_boost(data1['is_premium'] or mods1.premium, data1['is_official_member'], data1['level']) * mods1.power,
+                      battle_boost(data2['is_premium'] or mods2.premium, data2['is_official_member'], data2['level']) * mods2.power, seed=interaction.id)
+    
     # Power Comparison (Attractive Bars)
-    power1 = sum(e.get('power', 0) for e in data1['entities'])
-    power2 = sum(e.get('power', 0) for e in data2['entities'])
+    power1, power2 = result.power1, result.power2
     max_power = max(power1, power2, 1)
     bar1 = "■■■■■■■■■■"[:int(10 * power1 / max_power)] + "□□□□□□□□□□"[int(10 * power1 / max_power):]
     bar2 = "■■■■■■■■■■"[:int(10 * power2 / max_power)] + "□□□□□□□□□□"[int(10 * power2 / max_power):]
@@ -570,37 +1055,207 @@ async def battle_command(interaction: discord.Interaction, opponent: discord.Mem
     embed.add_field(name=f"{interaction.user.display_name}'s Power", value=f"[{bar1}] {power1} ⚡", inline=True)
     embed.add_field(name=f"{opponent.display_name}'s Power", value=f"[{bar2}] {power2} ⚡", inline=True)
     embed.set_thumbnail(url="https://media.giphy.com/media/26ufktO5bj6aKk9z2/giphy.gif")  # Battle GIF
+    names = lambda entity_id: f"{CATALOG.get(entity_id).emoji} {CATALOG.get(entity_id).name}" if entity_id else "— (empty)"
+    rounds_str = "\n".join(f"{'✅' if r1 > r2 else '❌' if r2 > r1 else '➖'} {names(id1)} **{r1}** vs **{r2}** {names(id2)}" for id1, id2, r1, r2 in result.rounds)
+    embed.add_field(name=f"Rounds ({result.wins1}–{result.wins2})", value=rounds_str, inline=False)
     
-    if power1 > power2:
+    if result.winner == 1:
         data1['credits'] += 50
-        await update_user_data(user_id, credits=data1['credits'])
-        embed.description = f"**{interaction.user.display_name} Wins!** +50 Credits\n(Vs {opponent.display_name} – Better collection!)"
+        embed.description = f"**{interaction.user.display_name} Wins!** +50 Credits\n(Vs {opponent.display_name} – Better team!)"
         embed.color = SUCCESS_GREEN
         embed.set_image(url="https://media.giphy.com/media/3o7btMYv2bT4nX4X4k/giphy.gif")  # Victory GIF
-    elif power2 > power1:
+    elif result.winner == 2:
         data2['credits'] += 50
-        await update_user_data(opp_id, credits=data2['credits'])
         embed.description = f"**{opponent.display_name} Wins!** +50 Credits\n(Vs {interaction.user.display_name} – Train more entities!)"
         embed.color = SUCCESS_GREEN
         embed.set_image(url="https://media.giphy.com/media/l0HlRnAWXxn0MhKLK/giphy.gif")  # Loss GIF
     else:
-        embed.description = "💥 It's a Tie! No credits – Equal power."
+        embed.description = "💥 It's a Tie! No credits – Equal rounds & power."
         embed.color = 0xFFA500  # Orange for tie
         embed.set_image(url="https://media.giphy.com/media/26ufnwz3wDUfck3m0/giphy.gif")  # Tie GIF
+    await save_user(data1, activity='battle')  # Both sides count toward battle quests
+    await save_user(data2, activity='battle')
     
     embed.set_footer(text="Battle again? Use stronger entities! ⚔️", icon_url="https://media.giphy.com/media/3o7btPCcdNniyf0ArS/giphy.gif")
     await interaction.response.send_message(embed=embed)
 
+# /tournament join|status (PvP Tournaments – Team locked in at sign-up)
+tournament_group = app_commands.Group(name='tournament', description='🏆 PvP Tournaments – Sign up during the pvp_tournament event!')
+bot.tree.add_command(tournament_group)
+
+@tournament_group.command(name='join', description='🏆 Sign up for the current tournament')
+@app_commands.describe(team=f'Optional: up to {TEAM_SIZE} entity names, comma-separated (default: your strongest)')
+@app_commands.autocomplete(team=owned_entity_autocomplete)
+async def tournament_join(interaction: discord.Interaction, team: str = None):
+    user_id = interaction.user.id
+    if await is_banned(user_id, interaction.guild.id if interaction.guild else None):
+        return
+    data = await get_user_data(user_id)
+    if not data['entities']:
+        embed = discord.Embed(title="⚠️ No Entities", description="Catch some entities before entering a tournament!", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    try:
+        entry_team = chosen_team(data['entities'].counts, CATALOG, team.split(',')) if team else auto_team(data['entities'].counts, CATALOG)
+    except ValueError as e:
+        embed = discord.Embed(title="❌ Invalid Team", description=f"{e}. Leave team empty to auto-pick your strongest {TEAM_SIZE}.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    mods = (await effects.modifiers(interaction.guild.id if interaction.guild else 0, user_id))[0]
+    joined, message = await tournaments.join(user_id, interaction.channel_id, entry_team,
+                                             battle_boost(data['is_premium'] or mods.premium, data['is_official_member'], data['level']) * mods.power)
+    embed = discord.Embed(title="🏆 Tournament Sign-up" if joined else "⚠️ Can't Join", description=message, color=SUCCESS_GREEN if joined else ERROR_RED)
+    if joined:
+        embed.add_field(name="Your Team", value="\n".join(f"{CATALOG.get(i).emoji} {CATALOG.get(i).name} ({CATALOG.get(i).power} ⚡)" for i in entry_team), inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@tournament_group.command(name='status', description='📊 Current tournament status')
+async def tournament_status(interaction: discord.Interaction):
+    tournament = await tournaments.current()
+    if tournament is None:
+        embed = discord.Embed(title="🏆 No Tournament", description="None running – they start automatically during the **pvp_tournament** event.", color=NEON_BLUE)
+    elif tournament['status'] == 'signup':
+        embed = discord.Embed(title=f"🏆 Tournament #{tournament['tournament_id']} – Sign-ups Open", description=f"{tournament['entrants']} entrants | Starts <t:{int(tournament['starts_at'])}:R>\nJoin with `/tournament join`!", color=NEON_BLUE)
+    else:
+        embed = discord.Embed(title=f"🏆 Tournament #{tournament['tournament_id']} – Round {tournament['round']}/{tournament['total_rounds']}", description=f"{tournament['alive']} of {tournament['entrants']} still in | Next round <t:{int(tournament['next_round_at'])}:R>", color=EPIC_PURPLE)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# /spawns enable|disable (Channel Spawns – Manage Channels permission or owner)
+spawns_group = app_commands.Group(name='spawns', description='🎯 Wild spawns in this channel during the double_spawn event')
+bot.tree.add_command(spawns_group)
+
+async def can_manage_spawns(interaction: discord.Interaction) -> bool:
+    if interaction.guild is None:
+        return False
+    return interaction.user.id == OWNER_ID or interaction.user.guild_permissions.manage_channels
+
+@spawns_group.command(name='enable', description='🎯 Let entities spawn in this channel')
+async def spawns_enable(interaction: discord.Interaction):
+    if not await can_manage_spawns(interaction):
+        embed = discord.Embed(title="❌ Not Allowed", description="You need **Manage Channels** to set up spawns.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    guild_data = await get_guild_data(interaction.guild.id)
+    await spawns.enable(interaction.channel_id, interaction.guild.id, interaction.user.id, guild_data['spawn_multiplier'])
+    embed = discord.Embed(title="🎯 Spawns Enabled", description="Wild entities will appear here during the **double_spawn** event – first click claims!", color=SUCCESS_GREEN)
+    await interaction.response.send_message(embed=embed)
+
+@spawns_group.command(name='disable', description='🚫 Stop entities spawning in this channel')
+async def spawns_disable(interaction: discord.Interaction):
+    if not await can_manage_spawns(interaction):
+        embed = discord.Embed(title="❌ Not Allowed", description="You need **Manage Channels** to set up spawns.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    removed = await spawns.disable(interaction.channel_id)
+    embed = discord.Embed(title="🚫 Spawns Disabled" if removed else "ℹ️ Not Enabled", description="No more wild spawns in this channel." if removed else "Spawns weren't enabled here.", color=NEON_BLUE)
+    await interaction.response.send_message(embed=embed)
+
+# /market sell|buy|cancel|view|mine (Player Marketplace – Cheapest first, oldest first at the same price)
+market_group = app_commands.Group(name='market', description='🏪 Player marketplace – List entities for credits & buy the best price')
+bot.tree.add_command(market_group)
+
+@market_group.command(name='sell', description='🏷️ List entities for sale (they leave your collection until sold or cancelled)')
+@app_commands.describe(entity='Entity name (e.g., Kirby)', price='Price per copy in credits', quantity=f'Copies to list (1-{MAX_LISTING_QUANTITY})')
+@app_commands.autocomplete(entity=owned_entity_autocomplete)
+async def market_sell(interaction: discord.Interaction, entity: str, price: int, quantity: int = 1):
+    user_id = interaction.user.id
+    if await is_banned(user_id, interaction.guild.id if interaction.guild else None):
+        return
+    entity_def = CATALOG.find(entity)
+    if entity_def is None or price < 1 or not 1 <= quantity <= MAX_LISTING_QUANTITY:
+        embed = discord.Embed(title="❌ Invalid Listing", description=f"Need a known entity, a price of at least 1 and 1-{MAX_LISTING_QUANTITY} copies.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    listing_ids = await market.sell(user_id, entity_def.id, price, quantity, entity_def.rarity in INSTANCED_RARITIES)
+    if not listing_ids:
+        embed = discord.Embed(title="❌ Not Enough Copies", description=f"You don't own {quantity}x **{entity_def.name}**.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    DATA_CACHE.invalidate(f'user:{user_id}')
+    entity_index.apply(user_id, {entity_def.id: -quantity})
+    embed = discord.Embed(title="🏷️ Listed!", description=f"{quantity}x {entity_def.emoji} **{entity_def.name}** at {price} credits each.\nListing IDs: {', '.join(f'#{i}' for i in listing_ids)}", color=SUCCESS_GREEN)
+    embed.set_thumbnail(url=entity_def.image_url)
+    await interaction.response.send_message(embed=embed)
+
+@market_group.command(name='buy', description='🛍️ Buy the cheapest listing of an entity')
+@app_commands.describe(entity='Entity name (e.g., Kirby)', max_price='Optional: don\'t pay more than this')
+@app_commands.autocomplete(entity=any_entity_autocomplete)
+async def market_buy(interaction: discord.Interaction, entity: str, max_price: int = None):
+    user_id = interaction.user.id
+    if await is_banned(user_id, interaction.guild.id if interaction.guild else None):
+        return
+    entity_def = CATALOG.find(entity)
+    if entity_def is None:
+        embed = discord.Embed(title="❌ Unknown Entity", description=f"No entity named **{entity}**.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    status, listing = await market.buy(user_id, entity_def.id, max_price)
+    if status != 'ok':
+        if status == 'none':
+            reason = f"No one is selling **{entity_def.name}** right now."
+        elif status == 'price':
+            reason = f"Cheapest **{entity_def.name}** is {listing['price']} credits – above your max."
+        else:
+            reason = f"You need {listing['price']} credits for the cheapest **{entity_def.name}**."
+        embed = discord.Embed(title="❌ No Purchase", description=reason, color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    DATA_CACHE.invalidate(f'user:{user_id}', f"user:{listing['seller_id']}")
+    entity_index.apply(user_id, {entity_def.id: 1})
+    copy = f" #{listing['instance_id']}" if listing['instance_id'] else ""
+    embed = discord.Embed(title="🛍️ Purchased!", description=f"{entity_def.emoji} **{entity_def.name}**{copy} for {listing['price']} credits from <@{listing['seller_id']}>.", color=SUCCESS_GREEN)
+    embed.set_thumbnail(url=entity_def.image_url)
+    await interaction.response.send_message(embed=embed)
+
+@market_group.command(name='cancel', description='↩️ Cancel one of your listings')
+@app_commands.describe(listing_id='Listing ID (see /market mine)')
+async def market_cancel(interaction: discord.Interaction, listing_id: int):
+    user_id = interaction.user.id
+    if await is_banned(user_id, interaction.guild.id if interaction.guild else None):
+        return
+    entity_id = await market.cancel(listing_id, user_id)
+    if entity_id is None:
+        embed = discord.Embed(title="❌ Can't Cancel", description=f"#{listing_id} isn't one of your open listings.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    DATA_CACHE.invalidate(f'user:{user_id}')
+    entity_index.apply(user_id, {entity_id: 1})
+    embed = discord.Embed(title="↩️ Listing Cancelled", description=f"{CATALOG.get(entity_id).emoji} **{CATALOG.get(entity_id).name}** is back in your collection.", color=NEON_BLUE)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@market_group.command(name='view', description='📈 Best prices for an entity')
+@app_commands.describe(entity='Entity name (e.g., Kirby)')
+@app_commands.autocomplete(entity=any_entity_autocomplete)
+async def market_view(interaction: discord.Interaction, entity: str):
+    entity_def = CATALOG.find(entity)
+    if entity_def is None:
+        embed = discord.Embed(title="❌ Unknown Entity", description=f"No entity named **{entity}**.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    asks = await market.depth(entity_def.id, BOOK_DEPTH)
+    embed = discord.Embed(title=f"📈 {entity_def.emoji} {entity_def.name} – Market", color=NEON_BLUE)
+    embed.description = "\n".join(f"**{price}** credits × {count}" for price, count in asks) or "No open listings."
+    embed.set_thumbnail(url=entity_def.image_url)
+    await interaction.response.send_message(embed=embed)
+
+@market_group.command(name='mine', description='📋 Your open listings')
+async def market_mine(interaction: discord.Interaction):
+    rows = await market.listings_of(interaction.user.id)
+    embed = discord.Embed(title="📋 Your Listings", color=NEON_BLUE)
+    embed.description = "\n".join(f"#{listing_id} {CATALOG.get(entity_id).emoji} {CATALOG.get(entity_id).name}{f' #{instance_id}' if instance_id else ''} – {price} credits"
+                                  for listing_id, entity_id, instance_id, price in rows[:25]) or "Nothing listed. Use /market sell!"
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 # /premium (Attractive Status Check)
 @bot.tree.command(name='premium', description='💎 Check your premium status & perks!')
 async def premium_command(interaction: discord.Interaction):
     user_id = interaction.user.id
     if await is_banned(user_id, interaction.guild.id if interaction.guild else None):
         return
-    data = await get_user_data(user_id)
+    data = await get_user_fields(user_id, 'is_premium', 'premium_until')
     
     if data['is_premium']:
-        end_date = datetime.fromisoformat(data['premium_until']).strftime("%Y-%m-%d")
+        end_date = datetime.fromtimestamp(data['premium_until']).strftime("%Y-%m-%d")
         embed = discord.Embed(title="💎 Premium Active!", description=f"Until {end_date} – Enjoy perks!", color=PREMIUM_GOLD)
         embed.add_field(name="Perks", value="• 2x Credits from Catch/Daily\n• No Cooldowns (60s skip)\n• +20% Catch Success\n• Pity Fills 2x Faster\n• Exclusive Mythic Pulls", inline=False)
         embed.set_image(url="https://media.giphy.com/media/l0HlRnAWXxn0MhKLK/giphy.gif")  # Premium GIF
@@ -618,26 +1273,24 @@ async def quest_command(interaction: discord.Interaction):
     user_id = interaction.user.id
     if await is_banned(user_id, interaction.guild.id if interaction.guild else None):
         return
-    data = await get_user_data(user_id)
-    
-    # Simple Quests (Catch 5, Daily 1, Battle 3 – Track in data if needed)
-    quests = {
-        'catch_5': {'progress': min(5, len(data['entities']) % 10), 'goal': 5, 'reward': '100 Credits + Level Up'},
-        'daily_1': {'progress': 1 if data['last_daily'] else 0, 'goal': 1, 'reward': 'Streak Bonus'},
-        'battle_3': {'progress': 0, 'goal': 3, 'reward': '50 Credits'}  # Track battles in full
-    }
-    
-    embed = discord.Embed(title="🏆 Daily Quests", description="Complete for rewards! Progress resets weekly.", color=NEON_BLUE)
-    for quest, info in quests.items():
-        bar = "■■■■■■■■■■"[:int(10 * info['progress'] / info['goal'])] + "□□□□□□□□□□"[int(10 * info['progress'] / info['goal']):]
-        embed.add_field(name=f"{quest.replace('_', ' ').title()}", value=f"[{bar}] {info['progress']}/{info['goal']}\nReward: {info['reward']}", inline=True)
-    
-    # Claim if Complete (Simple – All at once for demo)
-    if all(info['progress'] >= info['goal'] for info in quests.values()):
-        data['credits'] += 150  # Total reward
-        data['level'] += 1
-        await update_user_data(user_id, credits=data['credits'], level=data['level'])
-        embed.description = "🎉 All Quests Complete! +150 Credits & Level Up!"
+    # Claim whatever is complete (guarded per quest), then show the counters
+    claimed = await claim_quests(DB_FILE, user_id)
+    if claimed:
+        DATA_CACHE.invalidate(f'user:{user_id}')
+    progress = await load_progress(DB_FILE, user_id)
+    
+    embed = discord.Embed(title="🏆 Quests", description="Daily quests reset at 00:00 UTC, weekly quests on Monday.", color=NEON_BLUE)
+    for quest in QUESTS:
+        count = min(progress[f'{quest.period}_{quest.counter}'], quest.goal)
+        bar = "■■■■■■■■■■"[:int(10 * count / quest.goal)] + "□□□□□□□□□□"[int(10 * count / quest.goal):]
+        done = "✅ " if progress[f'{quest.period}_claimed'] & quest.bit else ""
+        reward = f"{quest.credits} Credits" + (" + Level Up" if quest.levels else "")
+        embed.add_field(name=f"{done}{quest.title} ({quest.period.title()})", value=f"[{bar}] {count}/{quest.goal}\nReward: {reward}", inline=True)
+    
+    if claimed:
+        credits = sum(quest.credits for quest in claimed)
+        levels = sum(quest.levels for quest in claimed)
+        embed.description = f"🎉 Claimed {', '.join(quest.title for quest in claimed)}! +{credits} Credits" + (f" & +{levels} Level" if levels else "")
         embed.set_image(url="https://media.giphy.com/media/3o7btPCcdNniyf0ArS/giphy.gif")  # Reward GIF
     else:
         embed.set_image(url="https://media.giphy.com/media/26ufktO5bj6aKk9z2/giphy.gif")  # Quest GIF
@@ -651,15 +1304,15 @@ async def quest_command(interaction: discord.Interaction):
 async def heist_command(interaction: discord.Interaction, victim: discord.Member):
     user_id = interaction.user.id
     victim_id = victim.id
-    if await is_banned(user_id, interaction.guild.id) or await is_banned(victim_id, interaction.guild.id):
+    ctx = await load_context(interaction.guild.id, user_id, victim_id)
+    if ctx.banned:
         return
     if user_id == victim_id:
         embed = discord.Embed(title="❌ Self-Heist?", description="Can't steal from yourself!", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    data = await get_user_data(user_id)
-    victim_data = await get_user_data(victim_id)
+    data, victim_data = ctx.users
     if data['credits'] < 20:  # Risk 20 on fail
         embed = discord.Embed(title="⚠️ Low Risk", description="Need 20 credits to risk on heist!", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -675,8 +1328,7 @@ async def heist_command(interaction: discord.Interaction, victim: discord.Member
         if victim_data['credits'] >= amount:
             victim_data['credits'] -= amount
             data['credits'] += amount
-            await update_user_data(victim_id, credits=victim_data['credits'])
-            await update_user_data(user_id, credits=data['credits'])
+            await save_user(victim_data)
             embed = discord.Embed(title="💰 Heist Success!", description=f"Stole {amount} credits from {victim.mention}!\nYour new balance: {data['credits']}", color=SUCCESS_GREEN)
             embed.set_image(url="https://media.giphy.com/media/l0HlRnAWXxn0MhKLK/giphy.gif")  # Steal GIF
         else:
@@ -684,81 +1336,83 @@ async def heist_command(interaction: discord.Interaction, victim: discord.Member
             embed.set_image(url="https://media.giphy.com/media/26ufnwz3wDUfck3m0/giphy.gif")  # Fail GIF
     else:
         data['credits'] -= 20  # Risk penalty
-        await update_user_data(user_id, credits=data['credits'])
         embed = discord.Embed(title="😵 Heist Caught!", description=f"Lost 20 credits risk! {victim.mention} safe.\nNew balance: {data['credits']}", color=ERROR_RED)
         embed.set_image(url="https://media.giphy.com/media/3o7btMYv2bT4nX4X4k/giphy.gif")  # Caught GIF
+    await save_user(data, activity='heist')  # Every attempt counts toward heist quests
     
     embed.set_footer(text="Heist wisely – 50% risk! 💰", icon_url="https://media.giphy.com/media/3o7btPCcdNniyf0ArS/giphy.gif")
     await interaction.followup.send(embed=embed)
 
-# /trade @user index (Confirmation with Buttons – Interactive)
-@bot.tree.command(name='trade', description='🔄 Trade entity to user – Confirm with buttons!')
-@app_commands.describe(user='User to trade with', index='Entity index (0 for first)')
-async def trade_command(interaction: discord.Interaction, user: discord.Member, index: int):
+# /trade @user entities [credits] [want] [want_credits] (Both sides in one transaction – Confirm with buttons)
+@bot.tree.command(name='trade', description='🔄 Trade entities & credits with a user – Confirm with buttons!')
+@app_commands.describe(user='User to trade with', entities='Entities to give, comma-separated (e.g. "Kirby x2, Pac-Man" or "#42" for a unique copy)',
+                       credits='Credits to give', want='Entities you want back (same format)', want_credits='Credits you want back')
+@app_commands.autocomplete(entities=owned_entity_autocomplete, want=their_entity_autocomplete)
+async def trade_command(interaction: discord.Interaction, user: discord.Member, entities: str = None, credits: int = 0, want: str = None, want_credits: int = 0):
     trader_id = interaction.user.id
     receiver_id = user.id
-    if await is_banned(trader_id, interaction.guild.id) or await is_banned(receiver_id, interaction.guild.id):
+    ctx = await load_context(interaction.guild.id, trader_id, receiver_id)
+    if ctx.banned:
         return
     if trader_id == receiver_id:
         embed = discord.Embed(title="❌ Self-Trade?", description="Trade with someone else!", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
-    
-    data = await get_user_data(trader_id)
-    if not data['entities'] or index < 0 or index >= len(data['entities']):
-        embed = discord.Embed(title="❌ Invalid Trade", description=f"You have {len(data['entities'])} entities. Index 0-{len(data['entities'])-1}.", color=ERROR_RED)
+    if credits < 0 or want_credits < 0:
+        embed = discord.Embed(title="❌ Invalid Credits", description="Credit amounts can't be negative.", color=ERROR_RED)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    entity = data['entities'][index]
-    receiver_data = await get_user_data(receiver_id)
-    
-    # Confirmation Embed (Attractive with GIF)
-    embed = discord.Embed(title="🔄 Trade Confirmation", description=f"Trade {entity['emoji']} **{entity['name']}** ({entity['rarity']}, Power {entity['power']}) to {user.mention}?", color=NEON_BLUE)
-    embed.add_field(name="Your Collection After", value=f"{len(data['entities'])-1} entities left", inline=True)
-    embed.set_image(url=entity['image_url'])  # Entity GIF
-    embed.set_footer(text="React ✅ to confirm, ❌ to cancel.", icon_url="https://media.giphy.com/media/26ufktO5bj6aKk9z2/giphy.gif")
+    data, their_data = ctx.users
+    try:
+        give = await load_trade_side(trader_id, data['entities'], entities, credits)
+    except ValueError as err:
+        owned = ", ".join(f"{e['name']} x{e['count']}" for e in data['entities'].top(10)) or "None"
+        embed = discord.Embed(title="❌ Invalid Trade", description=f"{err}.\nYou have: {owned}", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    try:
+        get = await load_trade_side(receiver_id, their_data['entities'], want, want_credits)
+    except ValueError as err:
+        embed = discord.Embed(title="❌ Invalid Trade", description=f"{user.mention}: {err}.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    if give.is_empty():
+        embed = discord.Embed(title="❌ Empty Trade", description="Offer at least one entity or some credits.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    if data['credits'] < credits or their_data['credits'] < want_credits:
+        embed = discord.Embed(title="💸 Not Enough Credits", description="One side can't cover the credits in this trade.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
     
-    msg = await interaction.response.send_message(embed=embed, view=TradeView(trader_id, receiver_id, index, entity))  # Add TradeView class below for buttons
+    # Confirmation Embed – a gift is confirmed by the giver, a swap by the user being asked
+    confirmer = trader_id if get.is_empty() else receiver_id
+    embed = discord.Embed(title="🔄 Trade Confirmation", description=f"{interaction.user.mention} ⇄ {user.mention}", color=NEON_BLUE)
+    embed.add_field(name=f"{interaction.user.display_name} gives", value=describe_side(give), inline=True)
+    embed.add_field(name=f"{user.display_name} gives", value=describe_side(get), inline=True)
+    shown = [i for i, _ in give.stacks] + [i for _, i in give.instances] + [i for i, _ in get.stacks] + [i for _, i in get.instances]
+    if shown:
+        embed.set_image(url=CATALOG.get(shown[0]).image_url)  # Entity GIF
+    embed.set_footer(text=f"{'You' if confirmer == trader_id else user.display_name}: click ✅ to confirm, ❌ to cancel (expires in 5 minutes).", icon_url="https://media.giphy.com/media/26ufktO5bj6aKk9z2/giphy.gif")
+    
+    action_id = await create_pending(DB_FILE, 'trade', confirmer, {'give': give._asdict(), 'get': get._asdict()})
+    await interaction.response.send_message(content=f"<@{receiver_id}>" if confirmer == receiver_id else None, embed=embed, view=confirm_view(action_id))
 
-# Trade View (Buttons for Confirmation – Interactive)
-class TradeView(discord.ui.View):
-    def __init__(self, trader_id, receiver_id, index, entity):
-        super().__init__(timeout=60)
-        self.trader_id = trader_id
-        self.receiver_id = receiver_id
-        self.index = index
-        self.entity = entity
+async def trade_confirm(interaction: discord.Interaction, payload: dict):
+    # Both sides move in one transaction; only the two users' rows and the moved instance rows are written
+    give, get = TradeSide.from_payload(payload['give']), TradeSide.from_payload(payload['get'])
+    if not await execute_trade(give, get):
+        embed = discord.Embed(title="❌ Trade Failed", description="Someone no longer has everything in this trade – nothing was moved.", color=ERROR_RED)
+        await interaction.response.edit_message(content=None, embed=embed, view=None)
+        return
+    
+    success_embed = discord.Embed(title="✅ Trade Complete!", description=f"<@{give.user_id}> ⇄ <@{get.user_id}>", color=SUCCESS_GREEN)
+    success_embed.add_field(name="Sent", value=describe_side(give), inline=True)
+    success_embed.add_field(name="Received", value=describe_side(get), inline=True)
+    await interaction.response.edit_message(content=None, embed=success_embed, view=None)
 
-    @discord.ui.button(label='Confirm ✅', style=discord.ButtonStyle.green)
-    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.trader_id:
-            await interaction.response.send_message("Only the trader can confirm!", ephemeral=True)
-            return
-        
-        trader_data = await get_user_data(self.trader_id)
-        receiver_data = await get_user_data(self.receiver_id)
-        
-        # Execute Trade
-        traded_entity = trader_data['entities'].pop(self.index)
-        receiver_data['entities'].append(traded_entity)
-        await update_user_data(self.trader_id, entities=trader_data['entities'])
-        await update_user_data(self.receiver_id, entities=receiver_data['entities'])
-        
-        success_embed = discord.Embed(title="✅ Trade Complete!", description=f"{traded_entity['emoji']} **{traded_entity['name']}** traded to <@{self.receiver_id}>!", color=SUCCESS_GREEN)
-        success_embed.set_image(url=traded_entity['image_url'])  # Trade GIF
-        success_embed.add_field(name="New Counts", value=f"Trader: {len(trader_data['entities'])} | Receiver: {len(receiver_data['entities'])}", inline=False)
-        await interaction.response.edit_message(embed=success_embed, view=None)
-        self.stop()
-
-    @discord.ui.button(label='Cancel ❌', style=discord.ButtonStyle.red)
-    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.trader_id:
-            await interaction.response.send_message("Only the trader can cancel!", ephemeral=True)
-            return
-        cancel_embed = discord.Embed(title="❌ Trade Canceled", description="No changes made.", color=ERROR_RED)
-        await interaction.response.edit_message(embed=cancel_embed, view=None)
-        self.stop()
+pending_handlers['trade'] = trade_confirm
 
 # /owner Group (Subs – Owner-Only, Attractive, No Errors)
 owner_group = app_commands.Group(name='owner', description='👑 Owner Admin Commands – Ban, Premium, Events!")
@@ -874,6 +1528,22 @@ async def owner_event(interaction: discord.Interaction, type: str, duration: int
     await interaction.response.send_message(embed=success_embed, ephemeral=True)
     print(f"Owner started event '{type}' for {duration}h")
 
+@owner_group.command(name='tournament', description='🏆 Open tournament sign-ups now (results post in this channel)')
+@app_commands.describe(signup_minutes='Sign-up window in minutes (1-1440)')
+async def owner_tournament(interaction: discord.Interaction, signup_minutes: int = 30):
+    if interaction.user.id != OWNER_ID:
+        embed = discord.Embed(title="🔒 Access Denied", description="Owner only!", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    if signup_minutes < 1 or signup_minutes > 1440:
+        embed = discord.Embed(title="❌ Invalid Window", description="1-1440 minutes only.", color=ERROR_RED)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    tournament = await tournaments.create(signup_minutes, interaction.channel_id)
+    embed = discord.Embed(title="🏆 Tournament Ready", description=f"Tournament #{tournament['tournament_id']} is in **{tournament['status']}** – sign-ups close <t:{int(tournament['starts_at'])}:R>.", color=EPIC_PURPLE)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+    print(f"Owner opened tournament #{tournament['tournament_id']}")
+
 @owner_group.command(name='official-server', description='🏛️ Set this server official – 3x rates + perks')
 async def owner_official_server(interaction: discord.Interaction):
     if interaction.user.id != OWNER_ID:
@@ -914,8 +1584,9 @@ async def owner_server_premium(interaction: discord.Interaction, duration: int =
         return
     
     guild_id = interaction.guild.id
-    end_time = datetime.now() + timedelta(days=30 * duration)
-    await update_guild_data(guild_id, premium_until=end_time)
+    expires_at = await effects.grant(guild_id, 'server_premium', 1, 30 * 86400 * duration)  # Members get premium perks
+    end_time = datetime.fromtimestamp(expires_at)
+    await update_guild_data(guild_id, premium_until=end_time)  # Dashboard's guild list still shows premium_until
     
     # Announce in All Allowed Channels
     announce_embed = discord.Embed(title="🌟 Server Premium Activated!", description=f"**For {duration} months until {end_time.strftime('%Y-%m-%d')}**\n**Perks for Everyone:**\n• No Cooldowns on Commands\n• 3x Spawn Rates\n• Premium-like Boosts (+20% Success)\n• Exclusive Server Events!\n\nEnjoy the upgrades! 💎", color=PREMIUM_GOLD)
@@ -940,7 +1611,7 @@ if __name__ == '__main__':
         exit(1)
     try:
         print("🚀 Launching NexusVerse Bot – Attractive & Complete!")
-        print(f"Owner ID: {OWNER_ID} | DB: {DB_FILE} | Entities: {len(CONFIG['entities'])} nostalgic ones loaded.")
+        print(f"Owner ID: {OWNER_ID} | DB: {DB_FILE} | Entities: {len(CATALOG)} nostalgic ones loaded.")
         bot.run(DISCORD_TOKEN)
     except Exception as e:
         print(f"Bot launch error: {e}")
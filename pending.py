@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+import aiosqlite
+
+# Pending Confirmations (Restart-safe – State lives in a table, buttons carry only the action id)
+# custom_id is 'pending:<action_id>:confirm|cancel'. Taking an action is a guarded DELETE ...
+# RETURNING, so a double-click, a second process or a click after restart runs it at most once.
+PENDING_PREFIX = 'pending:'
+PENDING_TTLS = {'trade': 300, 'shop': 120}
+
+PENDING_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS pending_actions (
+        action_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        payload TEXT NOT NULL,
+        expires_at INTEGER NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_pending_actions_expires_at ON pending_actions (expires_at)',
+)
+
+
+def pending_custom_id(action_id: int, choice: str) -> str:
+    return f'{PENDING_PREFIX}{action_id}:{choice}'
+
+def parse_custom_id(rest: str):
+    # 'action_id:choice' (prefix already stripped) -> (action_id, choice)
+    action_id, _, choice = rest.partition(':')
+    return int(action_id), choice
+
+async def create_pending(db_file: str, kind: str, user_id: int, payload: dict) -> int:
+    now = int(time.time())
+    async with aiosqlite.connect(db_file) as db:
+        await db.execute('DELETE FROM pending_actions WHERE expires_at <= ?', (now,))  # Indexed – only expired rows
+        cursor = await db.execute('INSERT INTO pending_actions (kind, user_id, payload, expires_at) VALUES (?, ?, ?, ?)',
+                                  (kind, user_id, json.dumps(payload, separators=(',', ':')), now + PENDING_TTLS[kind]))
+        await db.commit()
+        return cursor.lastrowid
+
+async def take_pending(db_file: str, action_id: int, user_id: int):
+    # Returns (kind, payload, owner_id). kind is None when not taken: owner_id is then the user who
+    # may answer, or None if the action expired / was already answered
+    async with aiosqlite.connect(db_file) as db:
+        cursor = await db.execute('DELETE FROM pending_actions WHERE action_id = ? AND user_id = ? AND expires_at > ? RETURNING kind, payload',
+                                  (action_id, user_id, int(time.time())))
+        row = await cursor.fetchone()
+        await cursor.close()
+        await db.commit()
+        if row is not None:
+            return row[0], json.loads(row[1]), user_id
+        cursor = await db.execute('SELECT user_id FROM pending_actions WHERE action_id = ? AND expires_at > ?', (action_id, int(time.time())))
+        owner = await cursor.fetchone()
+    return None, None, owner[0] if owner else None
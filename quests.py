@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import time
+from typing import NamedTuple
+
+import aiosqlite
+
+# Quests (Counters on the users row – Bumped inside the write a command already does)
+# Each activity adds `daily_x = daily_x + 1, weekly_x = weekly_x + 1` to its UPDATE. Rollover is
+# one bulk UPDATE per period, guarded by the period number in `meta`, so it runs exactly once
+# per period across restarts and missed midnights.
+PERIODS = ('daily', 'weekly')
+COUNTERS = ('catches', 'pulls', 'battles', 'heists', 'dailies')
+ACTIVITY_COUNTERS = {'catch': 'catches', 'pull': 'pulls', 'battle': 'battles', 'heist': 'heists', 'daily': 'dailies'}
+QUEST_COLUMNS = tuple(f'{period}_{counter}' for period in PERIODS for counter in COUNTERS) + tuple(f'{period}_claimed' for period in PERIODS)
+META_SCHEMA = 'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)'
+
+
+class Quest(NamedTuple):
+    key: str
+    title: str
+    period: str
+    counter: str
+    goal: int
+    credits: int
+    levels: int = 0
+
+    @property
+    def bit(self) -> int:
+        return 1 << QUEST_BITS[self.key]
+
+
+QUESTS = (
+    Quest('catch_5', 'Catch 5', 'daily', 'catches', 5, 100, 1),
+    Quest('daily_1', 'Claim Daily', 'daily', 'dailies', 1, 50),
+    Quest('battle_3', 'Battle 3', 'daily', 'battles', 3, 50),
+    Quest('heist_2', 'Heist 2', 'daily', 'heists', 2, 40),
+    Quest('catch_30', 'Catch 30', 'weekly', 'catches', 30, 500, 1),
+    Quest('pull_10', 'Pull 10', 'weekly', 'pulls', 10, 300),
+    Quest('battle_15', 'Battle 15', 'weekly', 'battles', 15, 300),
+)
+QUEST_BITS = {quest.key: i for i, quest in enumerate(QUESTS)}  # Claimed flags: one bit per quest in <period>_claimed
+
+
+def quest_increments(activity: str) -> str:
+    # SET fragment for update statements ('' for activities no quest counts)
+    counter = ACTIVITY_COUNTERS.get(activity)
+    if counter is None:
+        return ''
+    return ', '.join(f'{period}_{counter} = {period}_{counter} + 1' for period in PERIODS)
+
+def period_number(period: str, now: float = None) -> int:
+    day = int((time.time() if now is None else now) // 86400)  # UTC days
+    return day if period == 'daily' else (day + 3) // 7          # Weeks roll over on Monday (day 0 was a Thursday)
+
+def next_rollover(now: float = None) -> float:
+    return (int((time.time() if now is None else now) // 86400) + 1) * 86400
+
+def migrate_quests_sync(db_file: str):
+    conn = sqlite3.connect(db_file)
+    try:
+        cursor = conn.cursor()
+        existing = {row[1] for row in cursor.execute('PRAGMA table_info(users)')}
+        for column in QUEST_COLUMNS:
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE users ADD COLUMN {column} INTEGER DEFAULT 0')
+        cursor.execute(META_SCHEMA)
+        conn.commit()
+    finally:
+        conn.close()
+
+def reset_quests_sync(db_file: str, now: float = None) -> list:
+    # Returns the periods that rolled over. The guarded meta UPDATE makes the reset run once per period
+    conn = sqlite3.connect(db_file)
+    try:
+        cursor = conn.cursor()
+        rolled = []
+        for period in PERIODS:
+            current = period_number(period, now)
+            key = f'quests_{period}'
+            cursor.execute('INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)', (key, current))
+            cursor.execute('UPDATE meta SET value = ? WHERE key = ? AND value < ?', (current, key, current))
+            if cursor.rowcount:
+                columns = [f'{period}_{counter}' for counter in COUNTERS] + [f'{period}_claimed']
+                cursor.execute(f"UPDATE users SET {', '.join(f'{c} = 0' for c in columns)} WHERE {' OR '.join(f'{c} != 0' for c in columns)}")
+                rolled.append(period)
+            conn.commit()
+        return rolled
+    finally:
+        conn.close()
+
+async def load_progress(db_file: str, user_id: int) -> dict:
+    async with aiosqlite.connect(db_file) as db:
+        cursor = await db.execute(f"SELECT {', '.join(QUEST_COLUMNS)} FROM users WHERE user_id = ?", (user_id,))
+        row = await cursor.fetchone()
+    return dict(zip(QUEST_COLUMNS, row or (0,) * len(QUEST_COLUMNS)))
+
+async def claim_quests(db_file: str, user_id: int) -> list:
+    # Each claim is guarded on the claimed bit and the counter, so double-clicks and races pay once
+    claimed = []
+    async with aiosqlite.connect(db_file) as db:
+        for quest in QUESTS:
+            cursor = await db.execute(f'UPDATE users SET {quest.period}_claimed = {quest.period}_claimed | ?, credits = credits + ?, level = level + ? '
+                                      f'WHERE user_id = ? AND ({quest.period}_claimed & ?) = 0 AND {quest.period}_{quest.counter} >= ?',
+                                      (quest.bit, quest.credits, quest.levels, user_id, quest.bit, quest.goal))
+            if cursor.rowcount:
+                claimed.append(quest)
+        await db.commit()
+    return claimed
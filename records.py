@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+from inventory import Inventory
+
+# Records (__slots__ – Shared by bot & dashboard, dict-style access for handlers & templates)
+# A record holds only the fields its loader selected (projections). Writes through r['x'] = v
+# or r.x = v mark the field dirty, so saves send just the changed columns. The inventory
+# stays a raw (counts, ids, legacy JSON) row until 'entities' is first read. Counters remember
+# their loaded value, so a save adds the difference – a handler holding its record across an
+# await can't overwrite what a trade or market buy wrote in between. Resets go through
+# reset(), which writes the value as-is.
+USER_COLUMNS = {'credits': 'credits', 'level': 'level', 'pity': 'pity', 'premium_until': 'premium_until_ts', 'streak': 'streak',
+                'last_daily': 'last_daily_ts', 'is_official_member': 'is_official_member', 'is_premium': 'is_premium',
+                'entities': 'entity_counts, entity_ids, entities'}
+USER_FIELDS = tuple(USER_COLUMNS)
+USER_DEFAULTS = {'credits': 100, 'level': 1, 'pity': 0, 'premium_until': None, 'streak': 0, 'last_daily': None, 'is_official_member': False, 'is_premium': False}
+GUILD_COLUMNS = {'is_official': 'is_official', 'spawn_multiplier': 'spawn_multiplier', 'premium_until': 'premium_until_ts', 'is_premium': 'is_premium'}
+GUILD_FIELDS = tuple(GUILD_COLUMNS)
+GUILD_DEFAULTS = {'is_official': False, 'spawn_multiplier': 1.0, 'premium_until': None, 'is_premium': False}
+BOOL_FIELDS = frozenset(('is_premium', 'is_official_member', 'is_official'))
+COUNTER_FIELDS = frozenset(('credits', 'level', 'pity', 'streak'))  # Saved as col = col + delta
+
+
+def select_columns(columns: dict, fields, prefix: str = '') -> str:
+    return ', '.join(f'{prefix}{column}' for f in fields for column in columns[f].split(', '))
+
+
+class Record:
+    __slots__ = ('dirty', 'loaded')
+    KEY = ''
+    FIELDS_ORDER = ()
+    FIELDS = frozenset()
+
+    def __setattr__(self, name, value):
+        if name in self.FIELDS:
+            if self.dirty is None:
+                object.__setattr__(self, 'dirty', set())
+                object.__setattr__(self, 'loaded', {})
+            if name in COUNTER_FIELDS and name not in self.dirty and hasattr(self, name):
+                self.loaded[name] = getattr(self, name)
+            self.dirty.add(name)
+        object.__setattr__(self, name, value)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key) -> bool:
+        return key == self.KEY or (key in self.FIELDS and hasattr(self, key))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self) -> list:
+        return [self.KEY] + [f for f in self.FIELDS_ORDER if f in self]
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self.keys()}
+
+    def changes(self) -> dict:
+        # Absolute values – counters that were loaded go through deltas() instead
+        return {f: getattr(self, f) for f in self.dirty if f not in self.loaded} if self.dirty else {}
+
+    def reset(self, name: str, value):
+        # Counter assignment that must land as written (pity -> 0, streak -> 1), not as a delta
+        setattr(self, name, value)
+        self.loaded.pop(name, None)
+
+    def deltas(self) -> dict:
+        return {f: getattr(self, f) - v for f, v in self.loaded.items() if getattr(self, f) != v} if self.dirty else {}
+
+    def mark_saved(self):
+        object.__setattr__(self, 'dirty', None)
+        object.__setattr__(self, 'loaded', None)
+
+    @classmethod
+    def from_row(cls, key: int, fields, row, defaults: dict):
+        record = cls.__new__(cls)
+        object.__setattr__(record, 'dirty', None)
+        object.__setattr__(record, 'loaded', None)
+        object.__setattr__(record, cls.KEY, key)
+        if row is None:
+            for field in fields:
+                object.__setattr__(record, field, defaults[field])
+            return record
+        for field, value in zip(fields, row):
+            object.__setattr__(record, field, bool(value) if field in BOOL_FIELDS else value)
+        return record
+
+    def copy(self):
+        record = type(self).__new__(type(self))
+        object.__setattr__(record, 'dirty', None)
+        object.__setattr__(record, 'loaded', None)
+        for name in self._copy_slots():
+            if hasattr(self, name):
+                object.__setattr__(record, name, getattr(self, name))
+        return record
+
+    def _copy_slots(self):
+        return (self.KEY,) + self.FIELDS_ORDER
+
+
+class UserRecord(Record):
+    __slots__ = ('user_id', 'credits', 'level', 'pity', 'premium_until', 'streak', 'last_daily', 'is_official_member', 'is_premium',
+                 '_entities', 'inventory_row', 'catalog')
+    KEY = 'user_id'
+    FIELDS_ORDER = USER_FIELDS
+    FIELDS = frozenset(USER_FIELDS)
+
+    @classmethod
+    def from_row(cls, user_id: int, fields, row, catalog):
+        # row: the SELECT of select_columns(USER_COLUMNS, fields) – 'entities' spans three columns
+        scalar = [f for f in fields if f != 'entities']
+        if row is None:
+            record = super().from_row(user_id, scalar, None, USER_DEFAULTS)
+            object.__setattr__(record, 'catalog', catalog)
+            if 'entities' in fields:
+                object.__setattr__(record, '_entities', Inventory(None, catalog))
+            return record
+        values, inventory_row, i = [], None, 0
+        for field in fields:
+            if field == 'entities':
+                inventory_row, i = tuple(row[i:i + 3]), i + 3
+            else:
+                values.append(row[i])
+                i += 1
+        record = super().from_row(user_id, scalar, values, USER_DEFAULTS)
+        object.__setattr__(record, 'catalog', catalog)
+        object.__setattr__(record, 'inventory_row', inventory_row)
+        return record
+
+    @property
+    def entities(self) -> Inventory:
+        try:
+            return self._entities
+        except AttributeError:
+            pass
+        if getattr(self, 'inventory_row', None) is None:
+            raise AttributeError('entities')  # Not in this projection
+        entities = Inventory.from_row(*self.inventory_row, self.catalog)
+        object.__setattr__(self, '_entities', entities)
+        return entities
+
+    @entities.setter
+    def entities(self, value):
+        object.__setattr__(self, '_entities', value)
+
+    def __contains__(self, key) -> bool:
+        if key == 'entities':
+            return hasattr(self, '_entities') or getattr(self, 'inventory_row', None) is not None  # Without decoding
+        return super().__contains__(key)
+
+    def changes(self) -> dict:
+        # Inventories track their own pending delta – mutating one in place counts as a change
+        changes = super().changes()
+        entities = getattr(self, '_entities', None)
+        if entities is not None and 'entities' not in changes and (not isinstance(entities, Inventory) or entities.pending):
+            changes['entities'] = entities
+        return changes
+
+    def copy(self):
+        record = super().copy()
+        object.__setattr__(record, 'catalog', getattr(self, 'catalog', None))
+        object.__setattr__(record, 'inventory_row', getattr(self, 'inventory_row', None))
+        if hasattr(self, '_entities'):
+            object.__setattr__(record, '_entities', self._entities.copy())  # Handlers mutate – never share one
+        return record
+
+    def _copy_slots(self):
+        return (self.KEY,) + tuple(f for f in USER_FIELDS if f != 'entities')
+
+
+class GuildRecord(Record):
+    __slots__ = ('guild_id', 'is_official', 'spawn_multiplier', 'premium_until', 'is_premium')
+    KEY = 'guild_id'
+    FIELDS_ORDER = GUILD_FIELDS
+    FIELDS = frozenset(GUILD_FIELDS)
+
+    @classmethod
+    def from_row(cls, guild_id: int, fields, row):
+        return super().from_row(guild_id, fields, row, GUILD_DEFAULTS)
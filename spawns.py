@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import random
+import time
+
+import aiosqlite
+
+from catalog import DROP_RATES, roll_rarity
+from changes import CHANGE_INSERT_SQL
+from inventory import Inventory, inventory_statements
+from quests import quest_increments
+
+# Channel Spawns (double_spawn event – Opted-in channels, one tick task, first claim wins)
+# Every channel lives in a hierarchical timer wheel instead of its own task/sleep: scheduling
+# is an append, each tick touches only the slot that's due, and far-off timers cascade down a
+# level once per rotation – O(1) amortized for tens of thousands of channels.
+SPAWN_EVENT = 'double_spawn'
+SPAWN_MIN_SECONDS = 120
+SPAWN_MAX_SECONDS = 600
+SPAWN_TTL = 300                 # Unclaimed spawns expire (claim guard checks expires_at)
+SPAWN_RETENTION = 86400         # Old spawn rows are pruned after a day
+CLAIM_PREFIX = 'spawn:claim:'
+
+SPAWN_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS spawn_channels (
+        channel_id INTEGER PRIMARY KEY,
+        guild_id INTEGER NOT NULL,
+        enabled_by INTEGER,
+        enabled_at REAL NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS spawns (
+        spawn_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel_id INTEGER NOT NULL,
+        entity_id INTEGER NOT NULL,
+        spawned_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        claimed_by INTEGER,
+        claimed_at REAL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_spawns_spawned_at ON spawns (spawned_at)',
+)
+
+
+class TimerWheel:
+    # levels x slots buckets; level L slot = one tick * slots**L. Default: 64 x 1s, 64 x 64s, 64 x ~68min
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 3, start: float = None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.current = 0
+        self.start = time.monotonic() if start is None else start
+        self.timers = {}                # key -> expiry tick; stale bucket entries are skipped (lazy cancel)
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def schedule(self, key, delay: float):
+        expires = self.current + max(1, int(delay / self.tick + 0.5))
+        self.timers[key] = expires
+        self._place(key, expires)
+
+    def cancel(self, key):
+        self.timers.pop(key, None)
+
+    def _place(self, key, expires: int):
+        delta = expires - self.current
+        for level in range(self.levels):
+            if delta < self.slots ** (level + 1) or level == self.levels - 1:
+                self.wheels[level][(expires // self.slots ** level) % self.slots].append((key, expires))
+                return
+
+    def advance(self, now: float = None) -> list:
+        target = int(((time.monotonic() if now is None else now) - self.start) / self.tick)
+        due = []
+        while self.current < target:
+            self.current += 1
+            # Cascade from the highest level whose slot boundary we just crossed
+            for level in range(self.levels - 1, 0, -1):
+                span = self.slots ** level
+                if self.current % span == 0:
+                    bucket = self.wheels[level][(self.current // span) % self.slots]
+                    self.wheels[level][(self.current // span) % self.slots] = []
+                    for key, expires in bucket:
+                        if self.timers.get(key) == expires:
+                            self._place(key, expires)
+            bucket = self.wheels[0][self.current % self.slots]
+            self.wheels[0][self.current % self.slots] = []
+            for key, expires in bucket:
+                if self.timers.get(key) != expires:
+                    continue
+                if expires <= self.current:
+                    del self.timers[key]
+                    due.append(key)
+                else:
+                    self._place(key, expires)   # Beyond the top level's horizon – goes round again
+        return due
+
+
+def roll_spawn(catalog, rng=random, rate: float = 2.0, drop_rates=DROP_RATES):
+    # Same QC thresholds as /catch (config.json drop_rates)
+    return catalog.random_of(roll_rarity(drop_rates, rng.random(), rate), rng)
+
+
+class SpawnScheduler:
+    def __init__(self, db_file: str, catalog, post, get_event, register_functions):
+        self.db_file = db_file
+        self.catalog = catalog
+        self.drop_rates = DROP_RATES              # Swapped with the catalog on config reload
+        self.post = post                          # post(channel_id, spawn_id, entity) – queue the message
+        self.get_event = get_event                # async () -> active global event type
+        self.register_functions = register_functions
+        self.wheel = TimerWheel()
+        self.channels = {}                        # channel_id -> guild spawn_multiplier (higher = shorter timers)
+        self.rng = random.Random()
+        self.spawned = 0
+        self.running = False
+
+    def _delay(self, channel_id: int) -> float:
+        return self.rng.uniform(SPAWN_MIN_SECONDS, SPAWN_MAX_SECONDS) / max(0.1, self.channels.get(channel_id, 1.0))
+
+    async def load(self):
+        async with aiosqlite.connect(self.db_file) as db:
+            for statement in SPAWN_SCHEMA:
+                await db.execute(statement)
+            await db.commit()
+            cursor = await db.execute('SELECT s.channel_id, COALESCE(g.spawn_multiplier, 1.0) FROM spawn_channels s LEFT JOIN guilds g ON g.guild_id = s.guild_id')
+            for channel_id, multiplier in await cursor.fetchall():
+                self.channels[channel_id] = multiplier
+                self.wheel.schedule(channel_id, self._delay(channel_id))
+
+    async def enable(self, channel_id: int, guild_id: int, user_id: int, multiplier: float = 1.0):
+        async with aiosqlite.connect(self.db_file) as db:
+            await db.execute('INSERT OR REPLACE INTO spawn_channels (channel_id, guild_id, enabled_by, enabled_at) VALUES (?, ?, ?, ?)',
+                             (channel_id, guild_id, user_id, time.time()))
+            await db.commit()
+        self.channels[channel_id] = multiplier
+        self.wheel.schedule(channel_id, self._delay(channel_id))
+
+    async def disable(self, channel_id: int) -> bool:
+        async with aiosqlite.connect(self.db_file) as db:
+            cursor = await db.execute('DELETE FROM spawn_channels WHERE channel_id = ?', (channel_id,))
+            await db.commit()
+        self.channels.pop(channel_id, None)
+        self.wheel.cancel(channel_id)
+        return cursor.rowcount > 0
+
+    async def run(self):
+        self.running = True
+        ticks = 0
+        try:
+            while self.running:
+                await asyncio.sleep(self.wheel.tick)
+                due = self.wheel.advance()
+                ticks += 1
+                try:
+                    if due and await self.get_event() == SPAWN_EVENT:
+                        await self._spawn(due)
+                    if ticks % 3600 == 0:
+                        await self._prune()
+                except Exception as e:
+                    print(f"Spawn tick error: {e}")
+                for channel_id in due:
+                    if channel_id in self.channels:
+                        self.wheel.schedule(channel_id, self._delay(channel_id))
+        finally:
+            self.running = False
+
+    async def _spawn(self, channel_ids: list):
+        now = time.time()
+        spawned = []
+        async with aiosqlite.connect(self.db_file) as db:
+            for channel_id in channel_ids:
+                entity = roll_spawn(self.catalog, self.rng, drop_rates=self.drop_rates)
+                cursor = await db.execute('INSERT INTO spawns (channel_id, entity_id, spawned_at, expires_at) VALUES (?, ?, ?, ?)',
+                                          (channel_id, entity.id, now, now + SPAWN_TTL))
+                spawned.append((channel_id, cursor.lastrowid, entity))
+            await db.commit()  # One commit for every channel due this tick
+        for channel_id, spawn_id, entity in spawned:
+            self.post(channel_id, spawn_id, entity)
+        self.spawned += len(spawned)
+
+    async def _prune(self):
+        async with aiosqlite.connect(self.db_file) as db:
+            await db.execute('DELETE FROM spawns WHERE spawned_at < ?', (time.time() - SPAWN_RETENTION,))
+            await db.commit()
+
+    async def claim(self, spawn_id: int, user_id: int):
+        # First-come: the guarded UPDATE only matches while claimed_by IS NULL, so exactly one claimer
+        # wins; the entity lands in their inventory in the same transaction. Returns (entity, winner_id)
+        now = time.time()
+        async with aiosqlite.connect(self.db_file) as db:
+            await self.register_functions(db)
+            cursor = await db.execute('UPDATE spawns SET claimed_by = ?, claimed_at = ? WHERE spawn_id = ? AND claimed_by IS NULL AND expires_at > ? RETURNING entity_id',
+                                      (user_id, now, spawn_id, now))
+            row = await cursor.fetchone()
+            await cursor.close()
+            if row is None:
+                await db.rollback()
+                cursor = await db.execute('SELECT entity_id, claimed_by FROM spawns WHERE spawn_id = ?', (spawn_id,))
+                existing = await cursor.fetchone()
+                return (self.catalog.get(existing[0]), existing[1]) if existing else (None, None)
+            inventory = Inventory(None, self.catalog)
+            inventory.add(row[0])
+            await db.execute('INSERT OR IGNORE INTO users (user_id, credits, level) VALUES (?, 100, 1)', (user_id,))
+            await db.execute(f"UPDATE users SET {quest_increments('catch')} WHERE user_id = ?", (user_id,))
+            for sql, params in inventory_statements(user_id, inventory, self.catalog):
+                await db.execute(sql, params)
+            await db.execute(CHANGE_INSERT_SQL, ('catch', user_id, now))  # Counts toward the live catches/min
+            await db.commit()
+        return self.catalog.get(row[0]), user_id
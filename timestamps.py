@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import time
+from datetime import datetime
+
+from changes import record_changes
+
+# Epoch Timestamps (INTEGER seconds – Indexed, compared as ints, no date parsing on reads)
+# is_premium is a stored flag: writes set it, the bot's sweeper clears it in bulk at expiry, so
+# the bot's loaders just read a column. The dashboard can't rely on the sweeper (the bot may be
+# down) and derives it from premium_until_ts instead. Legacy ISO columns are converted once and
+# then dropped (SQLite 3.35+, which RETURNING already needs).
+EPOCH_COLUMNS = {
+    'users': {'premium_until': 'premium_until_ts', 'last_daily': 'last_daily_ts'},
+    'guilds': {'premium_until': 'premium_until_ts'},
+    'bans': {'timestamp': 'banned_at'},
+    'global_events': {'start_time': 'start_ts', 'end_time': 'end_ts'},
+}
+PREMIUM_TABLES = {'users': ('user_id', 'user'), 'guilds': ('guild_id', 'guild')}  # table -> (key, change kind)
+EPOCH_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_users_premium_expiry ON users (premium_until_ts) WHERE is_premium = 1',
+    'CREATE INDEX IF NOT EXISTS idx_guilds_premium_expiry ON guilds (premium_until_ts) WHERE is_premium = 1',
+    'CREATE INDEX IF NOT EXISTS idx_users_last_daily ON users (last_daily_ts)',
+    'CREATE INDEX IF NOT EXISTS idx_bans_banned_at ON bans (banned_at)',
+    'CREATE INDEX IF NOT EXISTS idx_global_events_end ON global_events (end_ts)',
+)
+SWEEP_MAX_SLEEP = 300  # Re-check at least this often (grants made while the sweeper sleeps)
+
+
+def to_epoch(value):
+    # datetime / ISO string / number -> int seconds (None and unparseable strings -> None)
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value).timestamp())
+        except ValueError:
+            return None
+    return int(value)
+
+def epoch_iso(ts) -> str:
+    return datetime.fromtimestamp(ts).isoformat() if ts is not None else None
+
+def epoch_fields(fields: dict, now: float = None) -> dict:
+    # Maps premium_until/last_daily kwargs onto their epoch columns (+ the is_premium flag)
+    now = time.time() if now is None else now
+    mapped = {}
+    for k, v in fields.items():
+        if k == 'premium_until':
+            mapped['premium_until_ts'] = to_epoch(v)
+            mapped['is_premium'] = int(premium_active(mapped['premium_until_ts'], now))
+        elif k == 'last_daily':
+            mapped['last_daily_ts'] = to_epoch(v)
+        else:
+            mapped[k] = v
+    return mapped
+
+def premium_active(premium_until, now: float = None) -> bool:
+    return premium_until is not None and premium_until > (time.time() if now is None else now)
+
+def live_premium(record, now: float = None):
+    # Recomputes a loaded record's is_premium from its expiry (not marked dirty – nothing to save)
+    object.__setattr__(record, 'is_premium', premium_active(record.premium_until, now))
+    return record
+
+def migrate_timestamps_sync(db_file: str, batch: int = 1000):
+    # Idempotent: adds the INTEGER columns, converts legacy values and drops the legacy columns
+    conn = sqlite3.connect(db_file)
+    try:
+        cursor = conn.cursor()
+        now = time.time()
+        converted = 0
+        for table, columns in EPOCH_COLUMNS.items():
+            existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+            for column in columns.values():
+                if column not in existing:
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} INTEGER DEFAULT NULL')
+            if table in PREMIUM_TABLES and 'is_premium' not in existing:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN is_premium INTEGER DEFAULT 0')
+            for legacy, column in columns.items():
+                if legacy not in existing:
+                    continue
+                flag = ', is_premium = ?' if column == 'premium_until_ts' else ''
+                while True:
+                    rows = cursor.execute(f'SELECT rowid, {legacy} FROM {table} WHERE {legacy} IS NOT NULL LIMIT ?', (batch,)).fetchall()
+                    if not rows:
+                        break
+                    params = []
+                    for rowid, value in rows:
+                        ts = to_epoch(value)
+                        params.append((ts, int(ts is not None and ts > now), rowid) if flag else (ts, rowid))
+                    cursor.executemany(f'UPDATE {table} SET {column} = ?{flag}, {legacy} = NULL WHERE rowid = ?', params)
+                    converted += len(rows)
+                cursor.execute(f'ALTER TABLE {table} DROP COLUMN {legacy}')
+        for statement in EPOCH_INDEXES:
+            cursor.execute(statement)
+        conn.commit()
+        if converted:
+            print(f"✅ Migrated {converted} ISO timestamps to epoch columns")
+    finally:
+        conn.close()
+
+def sweep_premium_sync(db_file: str, now: float = None):
+    # Bulk-flips expired premium off (partial index – only premium rows are touched) and returns
+    # ({table: [ids]}, next expiry or None) so the caller can sleep exactly until then
+    now = int(time.time() if now is None else now)
+    conn = sqlite3.connect(db_file)
+    try:
+        cursor = conn.cursor()
+        expired, next_expiry = {}, None
+        for table, (key, kind) in PREMIUM_TABLES.items():
+            cursor.execute(f'UPDATE {table} SET is_premium = 0 WHERE is_premium = 1 AND premium_until_ts <= ? RETURNING {key}', (now,))
+            expired[table] = [row[0] for row in cursor.fetchall()]
+            record_changes(cursor, kind, expired[table])  # The bot's change listener drops the cached flags
+            upcoming = cursor.execute(f'SELECT MIN(premium_until_ts) FROM {table} WHERE is_premium = 1').fetchone()[0]
+            if upcoming is not None and (next_expiry is None or upcoming < next_expiry):
+                next_expiry = upcoming
+        conn.commit()
+        return expired, next_expiry
+    finally:
+        conn.close()
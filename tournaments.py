@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import random
+import time
+from itertools import groupby
+
+import aiosqlite
+
+from battle import simulate
+from inventory import decode_ids, encode_ids
+
+# PvP Tournaments (pvp_tournament event – Sign-up, Seeded Bracket, One Batched Resolve per Round)
+# Entrants snapshot their team at sign-up, so a round is pure CPU over in-memory teams (run in a
+# worker thread) followed by one executemany. Slot numbers encode the bracket: in round r,
+# entrants with the same (slot >> r) meet – a lone entrant in a group has a bye.
+SIGNUP_MINUTES = 30
+ROUND_INTERVAL = 120            # Seconds between rounds – gives the announcement queue room
+TICK_SECONDS = 15
+FLUSH_SECONDS = 1.0             # Sign-ups are batched for this long before one executemany
+ROUND_REWARD = 25               # Credits per match won
+PRIZES = (5000, 2500, 1000)     # Champion, runner-up, each semifinal loser
+EVENT_COOLDOWN = 30 * 60        # During pvp_tournament, the next auto sign-up opens this long after the last one ended
+
+TOURNAMENT_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS tournaments (
+        tournament_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        status TEXT NOT NULL,                -- signup / running / finished / cancelled
+        channel_id INTEGER,
+        seed INTEGER NOT NULL,
+        round INTEGER DEFAULT 0,
+        total_rounds INTEGER DEFAULT 0,
+        created_at REAL NOT NULL,
+        starts_at REAL NOT NULL,
+        next_round_at REAL,
+        finished_at REAL,
+        champion_id INTEGER
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_tournaments_status ON tournaments (status)',
+    '''
+    CREATE TABLE IF NOT EXISTS tournament_entries (
+        tournament_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        team BLOB NOT NULL,                  -- uint16 entity IDs, strongest first
+        boost REAL DEFAULT 1.0,
+        power INTEGER DEFAULT 0,
+        slot INTEGER,
+        wins INTEGER DEFAULT 0,
+        eliminated_round INTEGER,
+        joined_at REAL NOT NULL,
+        PRIMARY KEY (tournament_id, user_id)
+    ) WITHOUT ROWID
+    ''',
+)
+
+def bracket_order(size: int) -> list:
+    # Seeds 1..size in slot order so seed 1 and 2 can only meet in the final (1 v size, 2 v size-1, ...)
+    order = [1]
+    while len(order) < size:
+        mirror = len(order) * 2 + 1
+        order = [seed for s in order for seed in (s, mirror - s)]
+    return order
+
+def seed_bracket(entrants: list) -> tuple:
+    # entrants: (user_id, power) – strongest seeds get the byes. Returns ([(slot, user_id)], total_rounds)
+    ranked = sorted(entrants, key=lambda e: (-e[1], e[0]))
+    size = 1 << max(1, (len(ranked) - 1).bit_length())
+    slot_of_seed = {seed: slot for slot, seed in enumerate(bracket_order(size))}
+    return [(slot_of_seed[i + 1], user_id) for i, (user_id, _) in enumerate(ranked)], size.bit_length() - 1
+
+def match_seed(seed: int, round_no: int, group: int) -> int:
+    return (seed * 1_000_003 + round_no) * 1_000_003 + group
+
+def resolve_round(alive: list, round_no: int, seed: int, catalog) -> tuple:
+    # alive: (user_id, slot, team, boost) sorted by slot -> (advancing, losers, match winners, featured match or None)
+    advancing, losers, match_winners, featured, featured_power = [], [], [], None, -1
+    for group, members in groupby(alive, key=lambda e: e[1] >> round_no):
+        members = list(members)
+        if len(members) == 1:
+            advancing.append(members[0][0])  # Bye
+            continue
+        (user1, _, team1, boost1), (user2, _, team2, boost2) = members
+        result = simulate(team1, team2, catalog, boost1, boost2, seed=match_seed(seed, round_no, group))
+        winner, loser = (user1, user2) if result.winner != 2 else (user2, user1)  # Draw -> lower slot advances
+        advancing.append(winner)
+        match_winners.append(winner)
+        losers.append(loser)
+        if result.power1 + result.power2 > featured_power:
+            featured_power = result.power1 + result.power2
+            featured = (user1, user2, winner, result)
+    return advancing, losers, match_winners, featured
+
+
+class TournamentManager:
+    def __init__(self, db_file: str, catalog, notify, on_users_changed):
+        self.db_file = db_file
+        self.catalog = catalog
+        self.notify = notify                      # notify(channel_id, title, description) – queue, don't await
+        self.on_users_changed = on_users_changed  # on_users_changed(user_ids) – cache invalidation
+        self._lock = asyncio.Lock()               # One tick at a time (rounds must not overlap)
+        self._signup = None
+        self._closed_id = None
+        self._pending = []
+        self._flush_task = None
+
+    async def ensure_schema(self):
+        async with aiosqlite.connect(self.db_file) as db:
+            for statement in TOURNAMENT_SCHEMA:
+                await db.execute(statement)
+            await db.commit()
+
+    async def current(self):
+        async with aiosqlite.connect(self.db_file) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM tournaments WHERE status IN ('signup', 'running') ORDER BY tournament_id DESC LIMIT 1")
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+            tournament = dict(row)
+            cursor = await db.execute('SELECT COUNT(*), SUM(eliminated_round IS NULL) FROM tournament_entries WHERE tournament_id = ?', (tournament['tournament_id'],))
+            tournament['entrants'], tournament['alive'] = await cursor.fetchone()
+            return tournament
+
+    async def create(self, signup_minutes: int = SIGNUP_MINUTES, channel_id: int = None):
+        existing = await self.current()
+        if existing:
+            return existing
+        now = time.time()
+        async with aiosqlite.connect(self.db_file) as db:
+            await db.execute('INSERT INTO tournaments (status, channel_id, seed, created_at, starts_at) VALUES (?, ?, ?, ?, ?)',
+                             ('signup', channel_id, random.getrandbits(31), now, now + signup_minutes * 60))
+            await db.commit()
+        tournament = await self.current()
+        self.notify(channel_id, "🏆 Tournament Sign-ups Open!", f"Join with `/tournament join` in the next {signup_minutes} minutes – your strongest team is locked in at sign-up.")
+        return tournament
+
+    async def _signup_state(self):
+        # (tournament_id, joined user IDs) – loaded once per tournament, then kept in memory
+        if self._signup is None:
+            tournament = await self.current()
+            if tournament is None or tournament['status'] != 'signup' or tournament['tournament_id'] == self._closed_id:
+                return None
+            async with aiosqlite.connect(self.db_file) as db:
+                cursor = await db.execute('SELECT user_id FROM tournament_entries WHERE tournament_id = ?', (tournament['tournament_id'],))
+                joined = {row[0] for row in await cursor.fetchall()}
+            if self._signup is None and tournament['tournament_id'] != self._closed_id:
+                self._signup = (tournament['tournament_id'], joined)
+        return self._signup
+
+    async def join(self, user_id: int, channel_id: int, team: tuple, boost: float) -> tuple:
+        # Sign-up bursts are buffered and written once a second with executemany, not one commit each
+        signup = await self._signup_state()
+        if signup is None:
+            return False, "No tournament is taking sign-ups right now."
+        tid, joined = signup
+        if user_id in joined:
+            return False, "You're already signed up – your team is locked in."
+        joined.add(user_id)
+        self._pending.append((tid, user_id, encode_ids(team), boost, round(sum(self.catalog.powers[i] for i in team) * boost), time.time(), channel_id))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_soon())
+        return True, f"Signed up for tournament #{tid} ({len(joined)} entrants so far)."
+
+    async def _flush_soon(self):
+        await asyncio.sleep(FLUSH_SECONDS)
+        await self.flush()
+
+    async def flush(self):
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        async with aiosqlite.connect(self.db_file) as db:
+            await db.executemany('INSERT OR IGNORE INTO tournament_entries (tournament_id, user_id, team, boost, power, joined_at) VALUES (?, ?, ?, ?, ?, ?)',
+                                 [row[:6] for row in rows])
+            # First channel that sees a sign-up becomes the results channel for auto-created tournaments
+            await db.execute('UPDATE tournaments SET channel_id = COALESCE(channel_id, ?) WHERE tournament_id = ?', (rows[0][6], rows[0][0]))
+            await db.commit()
+
+    async def tick(self, active_event: str = None):
+        async with self._lock:
+            tournament = await self.current()
+            now = time.time()
+            if tournament is None:
+                if active_event == 'pvp_tournament' and now - await self._last_finished_at() >= EVENT_COOLDOWN:
+                    await self.create()
+                return
+            if tournament['status'] == 'signup' and tournament['starts_at'] <= now:
+                await self._start(tournament)
+            elif tournament['status'] == 'running' and (tournament['next_round_at'] or 0) <= now:
+                await self._play_round(tournament)
+
+    async def _last_finished_at(self) -> float:
+        async with aiosqlite.connect(self.db_file) as db:
+            cursor = await db.execute("SELECT MAX(finished_at) FROM tournaments WHERE status IN ('finished', 'cancelled')")
+            row = await cursor.fetchone()
+        return row[0] or 0.0
+
+    async def _start(self, tournament: dict):
+        tid = tournament['tournament_id']
+        self._closed_id, self._signup = tid, None  # Refuse new joins before the last flush
+        await self.flush()
+        tournament = await self.current()
+        async with aiosqlite.connect(self.db_file) as db:
+            cursor = await db.execute('SELECT user_id, power FROM tournament_entries WHERE tournament_id = ?', (tid,))
+            entrants = await cursor.fetchall()
+            if len(entrants) < 2:
+                await db.execute("UPDATE tournaments SET status = 'cancelled', finished_at = ? WHERE tournament_id = ?", (time.time(), tid))
+                await db.commit()
+                self.notify(tournament['channel_id'], "🏆 Tournament Cancelled", "Not enough entrants – at least 2 are needed.")
+                return
+            slots, total_rounds = seed_bracket(entrants)
+            await db.executemany('UPDATE tournament_entries SET slot = ? WHERE tournament_id = ? AND user_id = ?', [(slot, tid, user_id) for slot, user_id in slots])
+            await db.execute("UPDATE tournaments SET status = 'running', total_rounds = ?, next_round_at = ? WHERE tournament_id = ?",
+                             (total_rounds, time.time(), tid))
+            await db.commit()
+        self.notify(tournament['channel_id'], "🏆 Tournament Started!", f"**{len(entrants)} entrants**, {total_rounds} rounds. Top seeds get byes – round results every {ROUND_INTERVAL // 60} minutes.")
+
+    async def _play_round(self, tournament: dict):
+        tid, round_no = tournament['tournament_id'], tournament['round'] + 1
+        async with aiosqlite.connect(self.db_file) as db:
+            cursor = await db.execute('SELECT user_id, slot, team, boost FROM tournament_entries WHERE tournament_id = ? AND eliminated_round IS NULL AND slot IS NOT NULL ORDER BY slot', (tid,))
+            alive = [(user_id, slot, tuple(decode_ids(team)), boost) for user_id, slot, team, boost in await cursor.fetchall()]
+        # All matches of the round in one worker-thread batch – the event loop keeps serving commands
+        advancing, losers, winners, featured = await asyncio.to_thread(resolve_round, alive, round_no, tournament['seed'], self.catalog)
+        async with aiosqlite.connect(self.db_file) as db:
+            await db.executemany('UPDATE tournament_entries SET eliminated_round = ? WHERE tournament_id = ? AND user_id = ?', [(round_no, tid, u) for u in losers])
+            await db.executemany('UPDATE tournament_entries SET wins = wins + 1 WHERE tournament_id = ? AND user_id = ?', [(tid, u) for u in winners])
+            await db.execute('UPDATE tournaments SET round = ?, next_round_at = ? WHERE tournament_id = ?', (round_no, time.time() + ROUND_INTERVAL, tid))
+            await db.commit()
+        if len(advancing) == 1:
+            await self._finish(tournament, advancing[0])
+            return
+        summary = f"**Round {round_no}/{tournament['total_rounds']}** – {len(losers)} matches, {len(advancing)} advance."
+        if featured:
+            user1, user2, winner, result = featured
+            summary += f"\n\n⭐ Featured: <@{user1}> ({result.power1} ⚡) vs <@{user2}> ({result.power2} ⚡) → <@{winner}> wins {max(result.wins1, result.wins2)}–{min(result.wins1, result.wins2)}"
+        self.notify(tournament['channel_id'], f"⚔️ Tournament #{tid} – Round {round_no}", summary)
+
+    async def _finish(self, tournament: dict, champion_id: int):
+        tid, total_rounds = tournament['tournament_id'], tournament['total_rounds']
+        async with aiosqlite.connect(self.db_file) as db:
+            # Placement comes from eliminated_round, not wins – a bye then a loss still reaches the final/semis
+            cursor = await db.execute('SELECT user_id, wins, eliminated_round FROM tournament_entries WHERE tournament_id = ? AND slot IS NOT NULL', (tid,))
+            payouts, runner_up = {}, None
+            for user_id, wins, eliminated in await cursor.fetchall():
+                prize = wins * ROUND_REWARD
+                if user_id == champion_id:
+                    prize += PRIZES[0]
+                elif eliminated == total_rounds:
+                    prize += PRIZES[1]
+                    runner_up = user_id
+                elif eliminated == total_rounds - 1:
+                    prize += PRIZES[2]
+                if prize:
+                    payouts[user_id] = prize
+            # One transaction: status flip is guarded, so a crash/retry can never pay twice
+            cursor = await db.execute("UPDATE tournaments SET status = 'finished', finished_at = ?, champion_id = ? WHERE tournament_id = ? AND status = 'running'",
+                                      (time.time(), champion_id, tid))
+            if cursor.rowcount == 0:
+                await db.rollback()
+                return
+            await db.executemany('INSERT OR IGNORE INTO users (user_id, credits, level) VALUES (?, 100, 1)', [(u,) for u in payouts])
+            await db.executemany('UPDATE users SET credits = credits + ? WHERE user_id = ?', [(prize, u) for u, prize in payouts.items()])
+            await db.commit()
+        self.on_users_changed(list(payouts))
+        self.notify(tournament['channel_id'], f"🏆 Tournament #{tid} Champion!",
+                    f"👑 <@{champion_id}> wins **{payouts.get(champion_id, 0)} credits**!" + (f"\n🥈 Runner-up: <@{runner_up}>" if runner_up else "") +
+                    f"\n💰 {len(payouts)} players paid out ({sum(payouts.values())} credits total).")